@@ -7,19 +7,36 @@ import os
 import json
 import asyncio
 from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
-import threading
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from flask_socketio import SocketIO, emit, join_room
 import pytz
 import logging
 import re
 import traceback
 from functools import wraps
 from script.anomalyDetect import check_current_anomalies
+from services.baseline_engine import baseline_engine
+from services.online_detector import online_detector
+from services.live_poller import LivePoller
+from services.emission_coalescer import EmissionCoalescer, BATCHED_ROOM, protocol_room
+from services.state_log import StateLog
+from services.response_cache import ResponseCache, VersionedState
+from services.sse_stream import event_stream
+from services.shared_state import create_backend, StateReplicator
+from services.scanner_ipc import ScannerLink
+from services.index_history import index_history
+from services.compression import compress_response, socketio_options
+from services.assets import AssetManifest
+from services.connection_tracker import ConnectionTracker, SERVER_FULL, format_rollup
+from services.scan_executor import ScanExecutor, IDLE, STARTED, JOINED, FRESH
+from services.tracing import tracer
+from services.profiler import profiler, install_signal_handler
+from services.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE, instrument_cycle, socket_events_total, validation_errors_total
+from config import LIVE_POLL_CONFIG, SOCKETIO_MESSAGE_QUEUE, SCANNER_MODE, SCANNER_IPC_CONFIG
 from scraping.gmapsScrape import scrape_current_hour
 from validation import (
     ValidationError, validate_index_value, validate_activity_item,
-    validate_batch_data, sanitize_string
+    validate_batch_data, sanitize_string, validate_api_input, is_admin_request, client_address
 )
 # Twitter fetcher removed - using simple link instead
 
@@ -35,7 +52,14 @@ app = Flask(__name__)
 # Auto-generate secret key - no configuration needed
 app.config['SECRET_KEY'] = 'signalslice-' + os.urandom(24).hex()
 # Allow all origins for easy deployment (restrict in production if needed)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# With a message queue, broadcasts from any web process reach clients connected to every process
+# Long-polling payloads are compressed above a threshold; events may be sent as MessagePack
+socketio_transport = socketio_options()
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=SOCKETIO_MESSAGE_QUEUE, **socketio_transport)
+# Broadcasts go through the coalescer: one batched frame per tick instead of a frame per event.
+# Each broadcast is also logged with a sequence number so reconnecting clients can catch up.
+state_log = StateLog()
+emission_coalescer = EmissionCoalescer(socketio, state_log=state_log)
 
 @app.after_request
 def add_security_headers(response):
@@ -47,12 +71,25 @@ def add_security_headers(response):
     response.headers['Content-Security-Policy'] = "default-src 'self'; script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net https://unpkg.com; style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://unpkg.com; img-src 'self' data: https:; font-src 'self' https://cdn.jsdelivr.net; connect-src 'self' ws: wss: http://localhost:* http://127.0.0.1:* http://0.0.0.0:*;"
     return response
 
+# Templates reference assets through the build manifest so fingerprinted files can be cached for a year
+asset_manifest = AssetManifest(app.static_folder)
+app.after_request(asset_manifest.cache_headers)
+
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': asset_manifest.url}
+
+@app.after_request
+def compress_payload(response):
+    """gzip/brotli-encode JSON and HTML responses for clients that accept it"""
+    return compress_response(response)
+
 # No API key authentication required
 
 # No authentication or rate limiting - simplified for easier deployment
 
-# Global state for dashboard
-dashboard_state = {
+# Global state for dashboard; every write advances its version, which keys the API response cache
+dashboard_state = VersionedState({
     'pizza_index': 3.42,
     'gay_bar_index': 6.58,  # Inverse of pizza - starts higher
     'active_locations': 127,
@@ -62,13 +99,19 @@ dashboard_state = {
     'scanning': False,
     'activity_feed': [],
     'scanner_running': False
-}
+})
+api_cache = ResponseCache()
+# Connections are counted and summarized periodically rather than announced one by one
+connection_tracker = ConnectionTracker()
 
 EST = pytz.timezone('US/Eastern')
 
 # Scanner scheduling variables
-scanner_loop = None
 scanner_task = None
+live_poller = None
+live_poller_task = None
+# Connection to the standalone scanner daemon when SCANNER_MODE=external
+scanner_link = None
 def add_activity_item(activity_type, message, level='normal'):
     """Add an item to the activity feed and emit to clients"""
     try:
@@ -89,7 +132,7 @@ def add_activity_item(activity_type, message, level='normal'):
         dashboard_state['activity_feed'] = dashboard_state['activity_feed'][:10]
         
         # Emit to all connected clients
-        socketio.emit('activity_update', activity)
+        emission_coalescer.emit('activity_update', activity)
         
         # Log activity
         logger.info(f"[{timestamp}] {activity['type']}: {activity['message']}")
@@ -113,7 +156,8 @@ def update_pizza_index(new_value, change_percent=0):
         }
         
         # logger.debug(f"Emitting pizza_index_update: {data}")
-        socketio.emit('pizza_index_update', data)
+        emission_coalescer.emit('pizza_index_update', data)
+        record_index_history('pizza_index', validated_value)
     except (ValidationError, ValueError) as e:
         logger.error(f"Pizza index update error: {e}")
         add_activity_item('ERROR', f'Failed to update pizza index: {str(e)}', 'critical')
@@ -135,10 +179,18 @@ def update_gay_bar_index(new_value, change_percent=0):
         }
         
         # logger.debug(f"Emitting gay_bar_index_update: {data}")
-        socketio.emit('gay_bar_index_update', data)
+        emission_coalescer.emit('gay_bar_index_update', data)
+        record_index_history('gay_bar_index', validated_value)
     except (ValidationError, ValueError) as e:
         logger.error(f"Gay bar index update error: {e}")
         add_activity_item('ERROR', f'Failed to update gay bar index: {str(e)}', 'critical')
+def record_index_history(series, value):
+    """Persist an index update for /api/index_history; a storage failure never blocks the update"""
+    try:
+        index_history.record(series, value)
+    except Exception as e:
+        logger.error(f"Index history write failed: {e}")
+
 def update_scan_stats():
     """Update scan statistics"""
     dashboard_state['scan_count'] += 1
@@ -149,7 +201,111 @@ def update_scan_stats():
         'last_scan_time': dashboard_state['last_scan_time'].strftime('%H:%M:%S')
     }
     
-    socketio.emit('scan_stats_update', stats)
+    emission_coalescer.emit('scan_stats_update', stats)
+
+def handle_streamed_reading(reading):
+    """Score a venue reading as soon as the scraper produces it and alert immediately"""
+    try:
+        anomaly = online_detector.observe_reading(reading)
+    except Exception as e:
+        logger.error(f"Streaming detection error: {e}", exc_info=True)
+        return
+    if not anomaly:
+        return
+    
+    reasons = ', '.join(anomaly['reasons'])
+    expected = f"{anomaly['expected']:.0f}%" if anomaly['expected'] is not None else 'n/a'
+    message = f"{anomaly['restaurant_url']} at {anomaly['current']:.0f}% (expected {expected}; {reasons})"
+    logger.warning(f"🚨 Streaming anomaly: {message}")
+    add_activity_item('ANOMALY', f'🚨 Streaming alert: {message}', 'critical')
+    emission_coalescer.emit('anomaly_detected', {
+        'title': 'STREAMING ALERT',
+        'message': sanitize_string(message, 200),
+        'timestamp': datetime.now(EST).strftime('%H:%M:%S'),
+        'anomaly_count': dashboard_state['anomaly_count'],
+        'source': reading.get('source', 'stream')
+    })
+
+def export_dashboard_state():
+    """JSON-safe copy of the dashboard state for other web processes"""
+    state = dict(dashboard_state)
+    state['last_scan_time'] = state['last_scan_time'].isoformat() if state['last_scan_time'] else None
+    return state
+
+def import_dashboard_state(state):
+    """Apply dashboard state published by the leader process"""
+    state = dict(state)
+    state['last_scan_time'] = datetime.fromisoformat(state['last_scan_time']) if state.get('last_scan_time') else None
+    dashboard_state.update(state)
+
+def handle_promotion():
+    """New leader: the imported state describes the previous leader's scanner, so take it over"""
+    if SCANNER_MODE == 'external':
+        # The daemon keeps scanning; this process now relays its updates
+        return
+    if scan_executor.state == IDLE:
+        dashboard_state['scanning'] = False
+    if dashboard_state['scanner_running']:
+        add_activity_item('SYSTEM', '👑 Taking over the scanner from the previous leader process', 'warning')
+        start_scanner()
+
+def handle_replicated_command(message):
+    """Leader: run a command forwarded by a follower web process"""
+    command = message.get('command')
+    if command == 'emit':
+        if message['event'] == 'activity_update':
+            # Keep the leader's feed (and so every mirror of it) in step with the forwarded item
+            dashboard_state['activity_feed'] = [message['data']] + dashboard_state['activity_feed'][:9]
+        emission_coalescer.emit(message['event'], message.get('data'))
+    elif command == 'manual_scan':
+        run_scanner_command('manual_scan')
+    elif command == 'start_scanner' and not dashboard_state['scanner_running']:
+        run_scanner_command('start_scanner')
+    elif command == 'stop_scanner' and dashboard_state['scanner_running']:
+        run_scanner_command('stop_scanner')
+    elif command == 'profile':
+        try:
+            run_scanner_command('profile', mode=message.get('mode'), seconds=message.get('seconds'))
+        except RuntimeError as e:
+            logger.warning(f"Profile request ignored: {e}")
+
+def request_manual_scan():
+    """Start a manual scan, join the one in flight or reuse a fresh one; None if another process runs it"""
+    # Followers hand the scan to the leader, which owns the scanner
+    if replicator.send_command('manual_scan'):
+        return None
+    return run_scanner_command('manual_scan')
+
+def run_scanner_command(command, **params):
+    """
+    Run a scanner command where the scanner lives: the external daemon, or the scan executor in this process
+    A local manual scan returns its future and how it was served (started, joined or fresh);
+    a local profile request returns the profiler status (RuntimeError if one is already recording)
+    """
+    if scanner_link is not None:
+        if not scanner_link.send_command(command, **params):
+            add_activity_item('ERROR', '❌ Scanner daemon is not reachable', 'critical')
+        return None
+    if command == 'manual_scan':
+        return scan_executor.submit()
+    elif command == 'start_scanner':
+        start_scanner()
+    elif command == 'stop_scanner':
+        stop_scanner()
+    elif command == 'profile':
+        if params.get('mode') == 'window':
+            return profiler.start_window(params['seconds'])
+        return profiler.arm_next_cycle()
+
+def handle_scanner_message(message):
+    """Apply state and events published by the scanner daemon"""
+    # Followers already mirror the leader, which is the one process that relays the daemon
+    if not replicator.is_leader:
+        return
+    if message.get('state'):
+        import_dashboard_state(message['state'])
+    if message.get('type') == 'event':
+        emission_coalescer.emit(message['event'], message.get('data'))
 
 def get_next_hour_start():
     """Calculate seconds until the next hour starts"""
@@ -157,11 +313,14 @@ def get_next_hour_start():
     next_hour = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
     return (next_hour - now).total_seconds()
 
+@instrument_cycle
+@tracer.traced('scan_cycle')
+@profiler.around_cycle
 async def run_scanner_cycle():
-    """Run one complete scanner cycle and emit updates"""
+    """Run one complete scanner cycle, emit updates and return a summary of the result (None on failure)"""
     try:
         dashboard_state['scanning'] = True
-        socketio.emit('scanning_start')
+        emission_coalescer.emit('scanning_start')
         current_time = datetime.now(EST)
         add_activity_item('SCAN', f'🕐 Starting hourly scan at {current_time.strftime("%Y-%m-%d %H:%M:%S EST")}', 'normal')
         
@@ -171,8 +330,11 @@ async def run_scanner_cycle():
         add_activity_item('SCRAPE', '🎯 Priority: LIVE data > Historical data > No data', 'normal')
         
         # Run the actual scraping
+        scraped_data = []
+        scrape_failed = False
         try:
-            scraped_data = await scrape_current_hour()
+            with tracer.span('scrape'):
+                scraped_data = await scrape_current_hour(on_reading=handle_streamed_reading)
             # logger.debug(f"Scraped {len(scraped_data)} data points")
             
             # Validate scraped data
@@ -181,6 +343,7 @@ async def run_scanner_cycle():
                 # logger.debug(f"Validated {len(validated_data)} data points")
                 scraped_data = validated_data
             except Exception as e:
+                validation_errors_total.inc(stage='batch')
                 logger.error(f"Data validation error: {e}")
                 add_activity_item('WARNING', f'Some data validation errors occurred - continuing with valid data', 'warning')
             
@@ -261,6 +424,7 @@ async def run_scanner_cycle():
                 add_activity_item('GAYBAR', '⚠️ No gay bar data available this scan', 'warning')
                 
         except Exception as e:
+            scrape_failed = True
             error_msg = sanitize_string(str(e), 200)
             add_activity_item('ERROR', f'❌ Scraping failed: {error_msg}', 'critical')
             logger.error(f"Error in scraping: {e}", exc_info=True)
@@ -273,11 +437,18 @@ async def run_scanner_cycle():
         
         # Capture the real anomaly detection results
         try:
-            anomalies_found = check_current_anomalies()
+            with tracer.span('anomaly_check', readings=len(scraped_data)):
+                anomalies_found = check_current_anomalies(scraped_data)
         except Exception as e:
             logger.error(f"Anomaly detection error: {e}", exc_info=True)
             add_activity_item('ERROR', 'Failed to check for anomalies', 'critical')
             anomalies_found = False
+
+        # Fold this cycle's readings into the per-venue learned baselines
+        try:
+            baseline_engine.update_from_cycle(scraped_data)
+        except Exception as e:
+            logger.error(f"Baseline learning error: {e}", exc_info=True)
         
         # Update statistics
         update_scan_stats()
@@ -292,7 +463,7 @@ async def run_scanner_cycle():
             change_percent = ((new_index - dashboard_state['pizza_index']) / dashboard_state['pizza_index']) * 100
             update_pizza_index(new_index, change_percent)
             # Emit anomaly alert
-            socketio.emit('anomaly_detected', {
+            emission_coalescer.emit('anomaly_detected', {
                 'title': 'ANOMALY DETECTED',
                 'message': 'Unusual pizza activity patterns detected - check logs for details',
                 'timestamp': datetime.now(EST).strftime('%H:%M:%S'),
@@ -313,20 +484,21 @@ async def run_scanner_cycle():
         # Always emit current state after scan completes
         logger.info(f"Scan complete. Current indices - Pizza: {dashboard_state['pizza_index']:.2f}, Gay Bar: {dashboard_state['gay_bar_index']:.2f}")
         
-        # Emit the current indices to all clients
-        socketio.emit('pizza_index_update', {
-            'value': dashboard_state['pizza_index'],
-            'change': 0,
-            'old_value': dashboard_state['pizza_index']
-        })
+        with tracer.span('emit'):
+            # Emit the current indices to all clients
+            emission_coalescer.emit('pizza_index_update', {
+                'value': dashboard_state['pizza_index'],
+                'change': 0,
+                'old_value': dashboard_state['pizza_index']
+            })
         
-        socketio.emit('gay_bar_index_update', {
-            'value': dashboard_state['gay_bar_index'],
-            'change': 0,
-            'old_value': dashboard_state['gay_bar_index']
-        })
+            emission_coalescer.emit('gay_bar_index_update', {
+                'value': dashboard_state['gay_bar_index'],
+                'change': 0,
+                'old_value': dashboard_state['gay_bar_index']
+            })
         
-        socketio.emit('scanning_complete')
+            emission_coalescer.emit('scanning_complete')
         
         completion_time = datetime.now(EST)
         add_activity_item('SYSTEM', f'✅ Scan completed at {completion_time.strftime("%H:%M:%S EST")}', 'success')
@@ -334,20 +506,34 @@ async def run_scanner_cycle():
         next_scan_seconds = get_next_hour_start()
         next_scan_time = datetime.now(EST) + timedelta(seconds=next_scan_seconds)
         add_activity_item('SYSTEM', f'⏰ Next scan scheduled for {next_scan_time.strftime("%H:%M:%S EST")} ({next_scan_seconds/60:.0f} minutes)', 'normal')
+        if scrape_failed:
+            # Nothing was sampled: a failed cycle, never reused as a fresh manual scan
+            return None
+        return {
+            'pizza_index': dashboard_state['pizza_index'],
+            'gay_bar_index': dashboard_state['gay_bar_index'],
+            'anomaly_detected': bool(anomalies_found),
+            'completed_at': completion_time.isoformat()
+        }
     except Exception as e:
         dashboard_state['scanning'] = False
         error_msg = sanitize_string(str(e), 200)
         add_activity_item('ERROR', f'❌ Scanner error: {error_msg}', 'critical')
-        socketio.emit('scanning_complete')
+        emission_coalescer.emit('scanning_complete')
         logger.error(f"Scanner error: {e}", exc_info=True)
+        return None
+
+# Every scan runs on this executor's loop thread: one at a time, with concurrent requests joining it
+scan_executor = ScanExecutor(run_scanner_cycle)
+
 async def hourly_scanner():
     """Main scanner loop that runs hourly"""
     logger.info("🛰️ SignalSlice Integrated Scanner Starting...")
     add_activity_item('INIT', '🛰️ SignalSlice integrated scanner starting...', 'normal')
     add_activity_item('INIT', '🔄 Running initial scan, then switching to hourly schedule', 'normal')
     
-    # Run initial scan
-    await run_scanner_cycle()
+    # Run initial scan; scheduled scans always sample anew (max_age=0) but join one already in flight
+    await scan_executor.run(max_age=0)
     
     while dashboard_state['scanner_running']:
         try:
@@ -363,7 +549,7 @@ async def hourly_scanner():
             # Check if scanner is still running
             if dashboard_state['scanner_running']:
                 add_activity_item('SYSTEM', 'Hourly scan interval reached - initiating new scan cycle', 'normal')
-                await run_scanner_cycle()
+                await scan_executor.run(max_age=0)
         except asyncio.CancelledError:
             add_activity_item('SYSTEM', '🛑 Scanner stopped by user request', 'warning')
             break
@@ -374,51 +560,67 @@ async def hourly_scanner():
             add_activity_item('SYSTEM', 'Waiting 5 minutes before retry to avoid rapid failures', 'warning')
             await asyncio.sleep(300)
 def start_scanner():
-    """Start the scanner in a separate thread"""
-    global scanner_loop, scanner_task
-    
-    def run_scanner_loop():
-        global scanner_loop, scanner_task
-        scanner_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(scanner_loop)
-        
-        dashboard_state['scanner_running'] = True
-        scanner_task = scanner_loop.create_task(hourly_scanner())
-        
-        try:
-            scanner_loop.run_until_complete(scanner_task)
-        except Exception as e:
-            logger.error(f"Scanner thread error: {e}", exc_info=True)
-        finally:
-            scanner_loop.close()
+    """Start the hourly schedule (and the live poller) on the scan executor's loop"""
+    global scanner_task, live_poller, live_poller_task
     
-    scanner_thread = threading.Thread(target=run_scanner_loop)
-    scanner_thread.daemon = True
-    scanner_thread.start()
-    return scanner_thread
+    dashboard_state['scanner_running'] = True
+    if scanner_task and not scanner_task.done():
+        return scanner_task
+    scanner_task = scan_executor.spawn(hourly_scanner())
+    if LIVE_POLL_CONFIG['enabled']:
+        # Live-only re-checks between hourly scans; paused while a full scan is running
+        live_poller = LivePoller(on_reading=handle_streamed_reading,
+                                 is_paused=lambda: dashboard_state['scanning'])
+        live_poller_task = scan_executor.spawn(live_poller.run())
+    return scanner_task
 
 def stop_scanner():
     """Stop the scanner"""
-    global scanner_loop, scanner_task
-    
     dashboard_state['scanner_running'] = False
     
+    if live_poller:
+        live_poller.stop()
+    # The loop itself keeps running for manual scans; a scan in flight finishes
+    if live_poller_task and not live_poller_task.done():
+        live_poller_task.cancel()
     if scanner_task and not scanner_task.done():
         scanner_task.cancel()
-    
-    if scanner_loop:
-        scanner_loop.call_soon_threadsafe(scanner_loop.stop)
 
 @app.route('/')
 def index():
     """Serve the main dashboard"""
-    return render_template('index.html')
+    return render_template('index.html', socket_serializer=socketio_transport['serializer'])
+
+@app.route('/api/stream')
+def stream_events():
+    """Server-Sent Events stream of dashboard updates for clients without WebSockets"""
+    stream_id = f"sse-{os.urandom(6).hex()}"
+    rejected, retry_after = connection_tracker.admit(stream_id, client_ip())
+    if rejected:
+        response = jsonify({'error': rejected, 'retry_after': round(retry_after, 1)})
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response, 503 if rejected == SERVER_FULL else 429
+    ensure_connection_rollup()
+    
+    # EventSource sends Last-Event-ID on reconnect; first connections may pass it as a query parameter
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    def frames():
+        try:
+            yield from event_stream(state_log, build_initial_state, last_event_id)
+        finally:
+            connection_tracker.release(stream_id)
+    
+    return Response(
+        stream_with_context(frames()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/activity_feed')
 def get_activity_feed():
     """API endpoint to get current activity feed"""
     try:
-        return jsonify({
+        return api_cache.respond('activity_feed', dashboard_state.key_version('activity_feed'), lambda: {
             'activity_feed': dashboard_state['activity_feed'],
             'timestamp': datetime.now(EST).isoformat()
         })
@@ -430,7 +632,7 @@ def get_activity_feed():
 def get_status():
     """API endpoint to get current status"""
     try:
-        return jsonify({
+        return api_cache.respond('status', dashboard_state.version, lambda: {
             'pizza_index': dashboard_state['pizza_index'],
             'gay_bar_index': dashboard_state['gay_bar_index'],
             'active_locations': dashboard_state['active_locations'],
@@ -445,27 +647,73 @@ def get_status():
         logger.error(f"API error in /api/status: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Scan pipeline and delivery metrics in the Prometheus text format"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/index_history')
+def get_index_history():
+    """Downsampled pizza and gay bar index history: ?from=&to= (Unix seconds or ISO) and ?points="""
+    try:
+        params = validate_api_input('/api/index_history', request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({'error': e.message, 'field': e.field}), 400
+    try:
+        return jsonify({
+            'from': params['from'],
+            'to': params['to'],
+            'points': params['points'],
+            'series': index_history.history(params['from'], params['to'], params['points'])
+        })
+    except Exception as e:
+        logger.error(f"API error in /api/index_history: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+def profile_scanner():
+    """
+    Sample the scanner thread: POST mode=cycle (the next scan cycle) or mode=window&seconds=N
+    Profiles are written to data/profiles/ where the scanner runs; GET shows this process's profiler
+    """
+    token = request.headers.get('X-Admin-Token') or request.headers.get('Authorization', '').replace('Bearer ', '', 1)
+    if not is_admin_request(token, request.remote_addr, request.headers.get('X-Real-IP')):
+        return jsonify({'error': 'Forbidden'}), 403
+    if request.method == 'GET':
+        return jsonify(profiler.status())
+    try:
+        params = validate_api_input('/api/admin/profile', request.values.to_dict())
+    except ValidationError as e:
+        return jsonify({'error': e.message, 'field': e.field}), 400
+    try:
+        # Followers hand the request to the leader, which owns the scanner
+        status = None if replicator.send_command('profile', **params) else run_scanner_command('profile', **params)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    if status is None:
+        return jsonify({'status': 'profile_requested', 'mode': params['mode']}), 202
+    return jsonify(status)
+
+@app.route('/api/traces/slowest')
+def get_slowest_spans():
+    """Slowest spans of the last ?traces= scan cycles in this process (?limit=, optional ?name= span name)"""
+    try:
+        params = validate_api_input('/api/traces/slowest', request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({'error': e.message, 'field': e.field}), 400
+    return jsonify(tracer.slowest(params['traces'], params['limit'], params['name']))
+
 @app.route('/api/trigger_scan', methods=['GET', 'POST'])
 def trigger_manual_scan():
     """Trigger a manual scan"""
     try:
-        # Check if scanner is already running
-        if dashboard_state['scanning']:
-            return jsonify({'status': 'scan_already_running', 'message': 'A scan is already in progress'}), 409
-        
-        def run_async_scan():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(run_scanner_cycle())
-                loop.close()
-            except Exception as e:
-                logger.error(f"Manual scan thread error: {e}", exc_info=True)
-        
-        # Run in separate thread to avoid blocking
-        scan_thread = threading.Thread(target=run_async_scan)
-        scan_thread.daemon = True
-        scan_thread.start()
+        requested = request_manual_scan()
+        served = requested[1] if requested else None
+        if served == JOINED:
+            return jsonify({'status': 'scan_joined', 'message': 'A scan is already in progress; its results will be broadcast'}), 202
+        if served == FRESH:
+            return jsonify({'status': 'scan_fresh', 'message': f'Latest scan completed {scan_executor.last_age():.0f}s ago',
+                            'result': requested[0].result()})
         
         return jsonify({'status': 'scan_triggered', 'message': 'Manual scan started'})
     except Exception as e:
@@ -477,7 +725,8 @@ def start_scanner_endpoint():
     """Start the automated scanner"""
     try:
         if not dashboard_state['scanner_running']:
-            start_scanner()
+            if not replicator.send_command('start_scanner'):
+                run_scanner_command('start_scanner')
             return jsonify({'status': 'scanner_started', 'message': 'Automated scanner started successfully'})
         else:
             return jsonify({'status': 'scanner_already_running', 'message': 'Scanner is already running'}), 409
@@ -490,7 +739,8 @@ def stop_scanner_endpoint():
     """Stop the automated scanner"""
     try:
         if dashboard_state['scanner_running']:
-            stop_scanner()
+            if not replicator.send_command('stop_scanner'):
+                run_scanner_command('stop_scanner')
             return jsonify({'status': 'scanner_stopped', 'message': 'Automated scanner stopped successfully'})
         else:
             return jsonify({'status': 'scanner_not_running', 'message': 'Scanner is not running'}), 409
@@ -500,67 +750,127 @@ def stop_scanner_endpoint():
 
 # Twitter API endpoint removed - using simple link instead
 
+def build_initial_state():
+    """Full dashboard snapshot sent to clients that cannot catch up from the state log"""
+    return {
+        'pizza_index': dashboard_state['pizza_index'],
+        'gay_bar_index': dashboard_state['gay_bar_index'],
+        'active_locations': dashboard_state['active_locations'],
+        'scan_count': dashboard_state['scan_count'],
+        'anomaly_count': dashboard_state['anomaly_count'],
+        'last_scan_time': dashboard_state['last_scan_time'].strftime('%H:%M:%S') if dashboard_state['last_scan_time'] else 'Never',
+        'activity_feed': dashboard_state['activity_feed'],
+        'scanner_running': dashboard_state['scanner_running']
+    }
+
+def client_ip():
+    """Client address; X-Real-IP is only believed from TRUSTED_PROXIES (nginx)"""
+    return client_address(request.remote_addr, request.headers.get('X-Real-IP'))
+
+def ensure_connection_rollup():
+    """Start the periodic connection roll-up on the first connection"""
+    if connection_tracker.claim_rollup_task():
+        socketio.start_background_task(connection_rollup_loop)
+
+def connection_rollup_loop():
+    """Background task: one activity item per interval summarizing connection changes"""
+    while True:
+        socketio.sleep(connection_tracker.rollup_interval)
+        try:
+            summary = connection_tracker.rollup()
+            if summary:
+                add_activity_item('CONNECT', format_rollup(summary), 'normal')
+        except Exception as e:
+            logger.error(f"Connection roll-up failed: {e}")
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
+    socket_events_total.inc(event='connect')
+    # Admission control: cap concurrent clients and per-IP connect rate so reconnect waves back off
+    rejected, retry_after = connection_tracker.admit(request.sid, client_ip())
+    if rejected:
+        logger.warning(f"🚫 Refused connection from {client_ip()}: {rejected}")
+        raise ConnectionRefusedError(rejected, {'retry_after': round(retry_after, 1)})
+    ensure_connection_rollup()
     try:
         logger.info(f"🔗 Client connected: {request.sid}")
-        initial_state = {
-            'pizza_index': dashboard_state['pizza_index'],
-            'gay_bar_index': dashboard_state['gay_bar_index'],
-            'active_locations': dashboard_state['active_locations'],
-            'scan_count': dashboard_state['scan_count'],
-            'anomaly_count': dashboard_state['anomaly_count'],
-            'last_scan_time': dashboard_state['last_scan_time'].strftime('%H:%M:%S') if dashboard_state['last_scan_time'] else 'Never',
-            'activity_feed': dashboard_state['activity_feed'],
-            'scanner_running': dashboard_state['scanner_running']
-        }
-        # logger.debug(f"Sending initial_state: {initial_state}")
-        emit('initial_state', initial_state)
-        add_activity_item('CONNECT', f'Dashboard client connected ({request.sid[:8]})', 'normal')
+        # Clients announce ?protocol=2 to receive batched frames; older clients get single events
+        room = protocol_room(request.args.get('protocol'))
+        join_room(room)
+        
+        # Batched clients may resume from the last sequence number they saw
+        last_seq = request.args.get('last_seq') if room == BATCHED_ROOM else None
+        resume = state_log.resume(request.args.get('epoch'), last_seq, build_initial_state)
+        if resume['type'] == 'delta':
+            emit('state_resume', resume)
+        else:
+            initial_state = resume['state']
+            initial_state.update({'epoch': resume['epoch'], 'seq': resume['seq']})
+            emit('initial_state', initial_state)
     except Exception as e:
         logger.error(f"WebSocket connection error: {e}")
         emit('error', {'message': 'Failed to initialize connection'})
 
+@socketio.on('disconnect')
+def handle_disconnect():
+    """Handle client disconnection"""
+    socket_events_total.inc(event='disconnect')
+    connection_tracker.release(request.sid)
+
 @socketio.on('manual_scan')
 def handle_manual_scan():
     """Handle manual scan request from client"""
+    socket_events_total.inc(event='manual_scan')
     try:
-        if dashboard_state['scanning']:
-            emit('scan_error', {'message': 'A scan is already in progress'})
-            return
-        
-        def run_async_scan():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(run_scanner_cycle())
-                loop.close()
-            except Exception as e:
-                logger.error(f"WebSocket manual scan error: {e}", exc_info=True)
-        
-        scan_thread = threading.Thread(target=run_async_scan)
-        scan_thread.daemon = True
-        scan_thread.start()
+        requested = request_manual_scan()
+        if requested and requested[1] != STARTED:
+            future, served = requested
+            emit('scan_status', {'status': served, 'age': scan_executor.last_age() if served == FRESH else None,
+                                 'result': future.result() if served == FRESH else None})
     except Exception as e:
         logger.error(f"WebSocket manual scan handler error: {e}")
         emit('scan_error', {'message': 'Failed to start manual scan'})
 
-# Initialize with some activity
-add_activity_item('INIT', 'SignalSlice dashboard initialized', 'normal')
-add_activity_item('SYSTEM', 'Monitoring 127 pizza locations in 50-mile radius', 'normal')
-add_activity_item('GAYBAR', '🏳️‍🌈 Gay Bar Index monitoring active', 'normal')
+# Shared state: one leader process owns the state log and scanner; followers mirror it.
+# Without a message queue, followers re-broadcast the leader's frames to their own clients.
+replicator = StateReplicator(
+    create_backend(), state_log,
+    export_state=export_dashboard_state,
+    import_state=import_dashboard_state,
+    on_command=handle_replicated_command,
+    on_frame=None if SOCKETIO_MESSAGE_QUEUE else emission_coalescer.broadcast,
+    on_promote=handle_promotion
+)
+emission_coalescer.on_flush = replicator.publish_frame
+emission_coalescer.forward = lambda event, data: replicator.send_command('emit', event=event, data=data)
+replicator.start()
+
+if SCANNER_MODE == 'external':
+    # Playwright, parsing and CSV I/O stay in the daemon; this process only relays its updates
+    scanner_link = ScannerLink(SCANNER_IPC_CONFIG['socket_path'], on_message=handle_scanner_message)
+    scanner_link.start()
+
+# Initialize with some activity; followers mirror the leader's feed, which already has these
+if replicator.is_leader:
+    add_activity_item('INIT', 'SignalSlice dashboard initialized', 'normal')
+    add_activity_item('SYSTEM', 'Monitoring 127 pizza locations in 50-mile radius', 'normal')
+    add_activity_item('GAYBAR', '🏳️‍🌈 Gay Bar Index monitoring active', 'normal')
 
 if __name__ == '__main__':
     logger.info("🛰️ SignalSlice Dashboard Starting...")
     logger.info("🌐 Access the dashboard at: http://localhost:5000")
     logger.info("📡 Real-time data will appear when scanner runs")
     
-    # Start the scanner automatically
-    start_scanner()
+    # Start the scanner automatically (the external daemon starts its own)
+    if SCANNER_MODE != 'external':
+        start_scanner()
+        # kill -USR1 <pid> profiles the next scan cycle
+        install_signal_handler(profiler)
     try:
         socketio.run(app, debug=False, host='0.0.0.0', port=6003)
     except KeyboardInterrupt:
         logger.info("\n🛑 Shutting down...")
-        stop_scanner()
+        if scanner_link is None:
+            stop_scanner()
         logger.info("SignalSlice stopped. Stay vigilant! 🍕")
\ No newline at end of file
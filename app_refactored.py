@@ -3,11 +3,10 @@
 SignalSlice Web Application - Refactored Version
 Real-time dashboard for Pentagon Pizza Index monitoring
 """
-import asyncio
-import threading
+import os
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from flask_socketio import SocketIO, emit, join_room
 
 from config import (
     FLASK_SECRET_KEY, FLASK_HOST, FLASK_PORT, FLASK_DEBUG,
@@ -15,28 +14,41 @@ from config import (
 )
 from state_manager import state_manager
 from services.scanner_service import ScannerService
+from services.emission_coalescer import BATCHED_ROOM, protocol_room
+from services.response_cache import ResponseCache
+from services.sse_stream import event_stream
+from services.index_history import index_history
+from services.compression import compress_response, socketio_options
+from services.assets import AssetManifest
+from services.connection_tracker import ConnectionTracker, SERVER_FULL, format_rollup
+from services.scan_executor import STARTED, JOINED, FRESH
+from services.tracing import tracer
+from services.profiler import profiler
+from services.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE, socket_events_total
+from validation import ValidationError, validate_api_input, is_admin_request, client_address
 
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = FLASK_SECRET_KEY
-socketio = SocketIO(app, **SOCKETIO_CONFIG)
+socketio_transport = socketio_options()
+socketio = SocketIO(app, **SOCKETIO_CONFIG, **socketio_transport)
+app.after_request(compress_response)
+asset_manifest = AssetManifest(app.static_folder)
+app.after_request(asset_manifest.cache_headers)
+app.context_processor(lambda: {'asset_url': asset_manifest.url})
 
 # Initialize scanner service
 scanner_service = ScannerService(socketio)
+api_cache = ResponseCache()
+connection_tracker = ConnectionTracker()
 
 
 # WebSocket event handlers
-@socketio.on('connect')
-def handle_connect():
-    """Handle client connection"""
-    print(f"🔗 Client connected: {request.sid}")
-    
-    # Get current state
+def build_initial_state():
+    """Full dashboard snapshot sent to clients that cannot catch up from the state log"""
     current_state = state_manager.get_state()
-    
-    # Format for client
-    initial_state = {
+    return {
         'pizza_index': current_state.get('pizza_index', 0),
         'gay_bar_index': current_state.get('gay_bar_index', 0),
         'active_locations': current_state.get('active_locations', 0),
@@ -46,77 +58,192 @@ def handle_connect():
         'activity_feed': current_state.get('activity_feed', []),
         'scanner_running': current_state.get('scanner_running', False)
     }
+
+
+def client_ip():
+    """Client address; X-Real-IP is only believed from TRUSTED_PROXIES (nginx)"""
+    return client_address(request.remote_addr, request.headers.get('X-Real-IP'))
+
+
+def ensure_connection_rollup():
+    """Start the periodic connection roll-up on the first connection"""
+    if connection_tracker.claim_rollup_task():
+        socketio.start_background_task(connection_rollup_loop)
+
+
+def connection_rollup_loop():
+    """Background task: one activity item per interval summarizing connection changes"""
+    while True:
+        socketio.sleep(connection_tracker.rollup_interval)
+        summary = connection_tracker.rollup()
+        if summary:
+            scanner_service.add_activity('CONNECT', format_rollup(summary), 'normal')
+
+
+@socketio.on('connect')
+def handle_connect():
+    """Handle client connection"""
+    socket_events_total.inc(event='connect')
+    rejected, retry_after = connection_tracker.admit(request.sid, client_ip())
+    if rejected:
+        raise ConnectionRefusedError(rejected, {'retry_after': round(retry_after, 1)})
+    ensure_connection_rollup()
+    print(f"🔗 Client connected: {request.sid}")
+    room = protocol_room(request.args.get('protocol'))
+    join_room(room)
     
-    print(f"DEBUG: Sending initial_state: {initial_state}")
-    emit('initial_state', initial_state)
-    
-    scanner_service.add_activity('CONNECT', f'Dashboard client connected ({request.sid[:8]})', 'normal')
+    # Batched clients may resume from the last sequence number they saw
+    last_seq = request.args.get('last_seq') if room == BATCHED_ROOM else None
+    resume = scanner_service.state_log.resume(request.args.get('epoch'), last_seq, build_initial_state)
+    if resume['type'] == 'delta':
+        emit('state_resume', resume)
+    else:
+        initial_state = resume['state']
+        initial_state.update({'epoch': resume['epoch'], 'seq': resume['seq']})
+        emit('initial_state', initial_state)
+
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    socket_events_total.inc(event='disconnect')
     print(f"🔌 Client disconnected: {request.sid}")
-    scanner_service.add_activity('DISCONNECT', f'Dashboard client disconnected ({request.sid[:8]})', 'normal')
+    connection_tracker.release(request.sid)
 
 
 @socketio.on('manual_scan')
 def handle_manual_scan():
     """Handle manual scan request from client"""
-    def run_async_scan():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(scanner_service.run_manual_scan())
-        loop.close()
-    
-    threading.Thread(target=run_async_scan).start()
+    socket_events_total.inc(event='manual_scan')
+    future, served = scanner_service.request_manual_scan()
+    if served != STARTED:
+        emit('scan_status', {'status': served,
+                             'age': scanner_service.executor.last_age() if served == FRESH else None,
+                             'result': future.result() if served == FRESH else None})
 
 
 # Flask routes
 @app.route('/')
 def index():
     """Serve the main dashboard"""
-    return render_template('index.html')
+    return render_template('index.html', socket_serializer=socketio_transport['serializer'])
 
 
 @app.route('/api/status')
 def get_status():
     """API endpoint to get current status"""
-    current_state = state_manager.get_state()
+    def build_status():
+        current_state = state_manager.get_state()
+        return {
+            'pizza_index': current_state.get('pizza_index', 0),
+            'gay_bar_index': current_state.get('gay_bar_index', 0),
+            'active_locations': current_state.get('active_locations', 0),
+            'scan_count': current_state.get('scan_count', 0),
+            'anomaly_count': current_state.get('anomaly_count', 0),
+            'last_scan_time': current_state['last_scan_time'].isoformat() if current_state.get('last_scan_time') else None,
+            'scanning': current_state.get('scanning', False),
+            'scanner_running': current_state.get('scanner_running', False),
+            'activity_feed': current_state.get('activity_feed', [])
+        }
     
-    return jsonify({
-        'pizza_index': current_state.get('pizza_index', 0),
-        'gay_bar_index': current_state.get('gay_bar_index', 0),
-        'active_locations': current_state.get('active_locations', 0),
-        'scan_count': current_state.get('scan_count', 0),
-        'anomaly_count': current_state.get('anomaly_count', 0),
-        'last_scan_time': current_state['last_scan_time'].isoformat() if current_state.get('last_scan_time') else None,
-        'scanning': current_state.get('scanning', False),
-        'scanner_running': current_state.get('scanner_running', False),
-        'activity_feed': current_state.get('activity_feed', [])
-    })
+    # Serialized once per state version; unchanged polls get 304 Not Modified
+    return api_cache.respond('status', state_manager.version, build_status)
+
 
+@app.route('/api/stream')
+def stream_events():
+    """Server-Sent Events stream of dashboard updates for clients without WebSockets"""
+    # Streams count against the same per-IP rate and client cap as Socket.IO connections
+    stream_id = f"sse-{os.urandom(6).hex()}"
+    rejected, retry_after = connection_tracker.admit(stream_id, client_ip())
+    if rejected:
+        response = jsonify({'error': rejected, 'retry_after': round(retry_after, 1)})
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response, 503 if rejected == SERVER_FULL else 429
+    ensure_connection_rollup()
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    def frames():
+        try:
+            yield from event_stream(scanner_service.state_log, build_initial_state, last_event_id)
+        finally:
+            connection_tracker.release(stream_id)
+
+    return Response(
+        stream_with_context(frames()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/activity_feed')
 def get_activity_feed():
     """API endpoint to get current activity feed"""
-    return jsonify({
+    return api_cache.respond('activity_feed', state_manager.version, lambda: {
         'activity_feed': state_manager.get('activity_feed', []),
         'timestamp': datetime.now(TIMEZONE).isoformat()
     })
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Scan pipeline and delivery metrics in the Prometheus text format"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route('/api/index_history')
+def get_index_history():
+    """Downsampled pizza and gay bar index history"""
+    try:
+        params = validate_api_input('/api/index_history', request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({'error': e.message, 'field': e.field}), 400
+    return jsonify({
+        'from': params['from'],
+        'to': params['to'],
+        'points': params['points'],
+        'series': index_history.history(params['from'], params['to'], params['points'])
+    })
+
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+def profile_scanner():
+    """Sample the scanner thread: POST mode=cycle (the next scan cycle) or mode=window&seconds=N"""
+    token = request.headers.get('X-Admin-Token') or request.headers.get('Authorization', '').replace('Bearer ', '', 1)
+    if not is_admin_request(token, request.remote_addr, request.headers.get('X-Real-IP')):
+        return jsonify({'error': 'Forbidden'}), 403
+    if request.method == 'GET':
+        return jsonify(profiler.status())
+    try:
+        params = validate_api_input('/api/admin/profile', request.values.to_dict())
+    except ValidationError as e:
+        return jsonify({'error': e.message, 'field': e.field}), 400
+    try:
+        if params['mode'] == 'window':
+            return jsonify(profiler.start_window(params['seconds']))
+        return jsonify(profiler.arm_next_cycle())
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+@app.route('/api/traces/slowest')
+def get_slowest_spans():
+    """Slowest spans of the last scan cycles"""
+    try:
+        params = validate_api_input('/api/traces/slowest', request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({'error': e.message, 'field': e.field}), 400
+    return jsonify(tracer.slowest(params['traces'], params['limit'], params['name']))
+
+
 @app.route('/api/trigger_scan')
 def trigger_manual_scan():
-    """Trigger a manual scan"""
-    def run_async_scan():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(scanner_service.run_manual_scan())
-        loop.close()
-    
-    # Run in separate thread to avoid blocking
-    threading.Thread(target=run_async_scan).start()
+    """Trigger a manual scan, or join/reuse one instead of scraping twice"""
+    future, served = scanner_service.request_manual_scan()
+    if served == JOINED:
+        return jsonify({'status': 'scan_joined'}), 202
+    if served == FRESH:
+        return jsonify({'status': 'scan_fresh', 'result': future.result()})
     
     return jsonify({'status': 'scan_triggered'})
 
@@ -73,6 +73,47 @@ DATA_FILE_PATTERNS = {
     'current_hour': 'current_hour_{timestamp}.csv'
 }
 
+# Baseline Configuration
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+BASELINE_RELOAD_CHECK_INTERVAL = 5  # seconds between baseline file mtime checks
+BASELINE_STATS_FILE = os.path.join(DATA_DIR, 'baseline_stats.bin')  # learned per-venue statistics
+BASELINE_MIN_SAMPLES = 4  # readings needed before a learned slot replaces the global baseline
+BASELINE_ARTIFACT_FILE = os.path.join(DATA_DIR, 'baseline_artifact.bin')  # compiled by script/compile_baselines.py
+
+# Live Polling Configuration (sub-hourly re-checks of live indicators only)
+LIVE_POLL_CONFIG = {
+    'enabled': os.getenv('LIVE_POLL_ENABLED', 'True').lower() == 'true',
+    'interval': int(os.getenv('LIVE_POLL_INTERVAL', 300)),  # seconds between polling rounds
+    'page_timeout': 30000,     # milliseconds for a warm page reload
+    'page_settle_time': 1500,  # milliseconds; live widgets render before the histogram
+    'delay_between_urls': 1,   # seconds
+    'max_warm_pages': 12       # pages kept open between rounds; extra venues share one page
+}
+
+# Streaming Anomaly Detection Configuration
+ONLINE_DETECTOR_CONFIG = {
+    'alpha': 0.3,          # EWMA weight of the newest reading
+    'z_threshold': 3.0,    # standard deviations above the EWMA mean to alert
+    'cusum_k': 0.5,        # CUSUM slack in standard deviations
+    'cusum_h': 4.0,        # CUSUM decision interval in standard deviations
+    'min_std': 5.0,        # floor on the EWMA std (busyness points) for sparse slots
+    'global_seed_margin': 25  # points above a global-baseline seed that first alarm (THRESHOLD in anomalyDetect)
+}
+
+# Venue Location Configuration
+VENUES_FILE = os.path.join(DATA_DIR, 'venues.json')  # coordinates captured from resolved Google Maps URLs
+VENUE_GRID_CELL_DEGREES = 0.25  # spatial index cell size (~28 km of latitude)
+
+# Cluster Detection Configuration (venues near a target scored together)
+CLUSTER_TARGETS = {
+    'pentagon': {'lat': 38.8719, 'lng': -77.0563, 'radius_km': 80.5}  # 50-mile radius
+}
+CLUSTER_CONFIG = {
+    'min_venues': 2,               # anomalous venues needed for a coordinated spike
+    'min_anomaly_fraction': 0.3,   # share of scored venues in the cluster that must be anomalous
+    'combined_z_threshold': 3.0    # Stouffer-combined z-score across the cluster
+}
+
 # Venue URLs Configuration
 RESTAURANT_URLS = [
     "https://maps.app.goo.gl/KqSr8hH5GV4ZGJP27",
@@ -110,4 +151,144 @@ LOGGING_CONFIG = {
 SOCKETIO_CONFIG = {
     'cors_allowed_origins': "*",
     'async_mode': 'threading'
-}
\ No newline at end of file
+}
+
+# Emission Coalescing Configuration
+EMISSION_COALESCE_WINDOW = 0.25  # seconds of dashboard events buffered into one batched frame
+
+# State Log Configuration
+STATE_LOG_CAPACITY = 500  # recent events kept for reconnecting clients; older clients get a snapshot
+
+# API Cache Configuration
+API_CACHE_MAX_AGE = 2  # seconds shared caches may serve /api/status and /api/activity_feed before revalidating
+
+# Server-Sent Events Configuration
+SSE_HEARTBEAT_INTERVAL = 15  # seconds between comment frames on an idle /api/stream connection
+SSE_RETRY_MS = 5000  # reconnect delay suggested to EventSource clients
+
+# Shared State Configuration
+# Backend for running several web processes behind one scanner:
+# memory:// keeps everything in-process (single worker); sqlite:///data/shared_state.db
+# shares one host without extra services; redis://host:6379/0 spans hosts (needs the redis package)
+SHARED_STATE_CONFIG = {
+    'url': os.getenv('STATE_BACKEND_URL', 'memory://'),
+    'lease_ttl': 15,  # seconds a leader keeps the state log and scanner without renewing
+    'poll_interval': 0.2,  # seconds between message polls for the SQLite backend
+    'message_retention': 300  # seconds published messages stay in the SQLite table
+}
+
+# Flask-SocketIO message queue; with it any process's broadcast reaches every connected client
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or (
+    SHARED_STATE_CONFIG['url'] if SHARED_STATE_CONFIG['url'].startswith(('redis://', 'rediss://')) else None)
+
+# Scanner Daemon Configuration
+# Scanner placement: 'embedded' runs it on a thread in the web process; 'external' expects
+# the standalone daemon (python run_scanner.py --serve) and talks to it over a Unix socket
+SCANNER_MODE = os.getenv('SCANNER_MODE', 'embedded').lower()
+SCANNER_IPC_CONFIG = {
+    'socket_path': os.getenv('SCANNER_SOCKET_PATH', os.path.join(DATA_DIR, 'scanner.sock')),
+    'reconnect_delay': 2,  # seconds between attempts to reach the daemon
+    'max_pending': 1000  # messages queued per web process before the daemon drops it as too slow
+}
+
+# Index History Configuration
+# Every pizza / gay bar index update, served downsampled by /api/index_history
+INDEX_HISTORY_CONFIG = {
+    'file': os.path.join(DATA_DIR, 'index_history.db'),
+    'resolutions': (60, 900, 3600),  # seconds per pre-aggregated bucket
+    'raw_retention_hours': 48,  # raw points older than this are only kept as buckets
+    'oversample': 4,  # read at most this many source points per returned point
+    'default_points': 300,
+    'max_points': 2000,
+    'default_range_hours': 24,
+    'max_range_days': 90
+}
+
+# Compression Configuration
+# gzip/brotli for HTTP responses (brotli when the package is installed)
+COMPRESSION_CONFIG = {
+    'min_size': 512,  # bytes; smaller bodies are not worth the CPU or the header
+    'gzip_level': 6,
+    'brotli_quality': 5,
+    'mimetypes': ('application/json', 'text/html', 'text/css', 'text/plain',
+                  'application/javascript', 'text/javascript', 'image/svg+xml')
+}
+
+# Engine.IO compresses long-polling payloads above the threshold; websocket frames use
+# permessage-deflate when the server and browser negotiate it
+SOCKETIO_TRANSPORT_CONFIG = {
+    'http_compression': True,
+    'compression_threshold': 1024
+}
+
+# 'msgpack' sends socket events as MessagePack (needs the msgpack package; the dashboard then
+# loads the msgpack build of the Socket.IO client); 'default' keeps JSON text frames
+SOCKETIO_SERIALIZER = os.getenv('SOCKETIO_SERIALIZER', 'default').lower()
+
+# Static Asset Configuration
+# Build pipeline (python script/build_assets.py): fingerprinted files under static/<dist_subdir>/
+ASSET_CONFIG = {
+    'assets': ('script.js', 'style.css'),
+    'dist_subdir': 'dist',
+    'max_age': 31536000  # one year; fingerprinted names change whenever the content does
+}
+
+# Connection Limits Configuration
+# Dashboard connections over Socket.IO and the SSE stream
+CONNECTION_LIMITS = {
+    'max_clients': int(os.getenv('MAX_CLIENTS', 1000)),  # per web process
+    'connects_per_minute': 20,  # sustained connects allowed per client IP
+    'burst': 10,  # connects an IP may make back to back
+    'full_retry_after': 15,  # seconds clients wait before retrying a full server
+    'rollup_interval': 60  # seconds between "N clients connected" activity items
+}
+
+# Reverse proxies whose X-Real-IP header is believed (comma-separated IPs/CIDRs, e.g. 127.0.0.1 behind nginx);
+# requests from any other peer are identified by their socket address
+TRUSTED_PROXIES = tuple(proxy.strip() for proxy in os.getenv('TRUSTED_PROXIES', '').split(',') if proxy.strip())
+
+# Scan Executor Configuration
+# One scan at a time; concurrent requests join it, recent results are reused
+SCAN_EXECUTOR_CONFIG = {
+    'freshness_window': float(os.getenv('SCAN_FRESHNESS_SECONDS', 120))  # seconds a completed manual scan is reused
+}
+
+# Metrics Configuration
+# Prometheus metrics served at /metrics
+METRICS_CONFIG = {
+    'namespace': 'signalslice',
+    'latency_buckets': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),  # seconds
+    'cycle_buckets': (10, 30, 60, 120, 300, 600, 1200, 1800, 3600),  # seconds per full scan cycle
+    'emit_buckets': (10, 25, 50, 100, 250, 500, 1000),  # events per cycle
+    # The scanner daemon has no web app; it serves /metrics on this local port (0 disables)
+    'daemon_port': int(os.getenv('SCANNER_METRICS_PORT', 9108))
+}
+
+# Tracing Configuration
+# Scan cycle spans per cycle, venue and phase
+TRACING_CONFIG = {
+    # 'jsonl' (file below), 'jsonl:<path>', an OTLP/HTTP endpoint such as http://localhost:4318/v1/traces, or 'none'
+    'exporter': os.getenv('TRACE_EXPORTER', 'jsonl'),
+    'file': os.path.join(DATA_DIR, 'traces.jsonl'),
+    'max_file_bytes': 50 * 1024 * 1024,  # rotated to traces.jsonl.1 beyond this
+    'service_name': 'signalslice-scanner',
+    'recent_traces': 24,  # complete cycles kept in memory for /api/traces/slowest
+    'max_spans_per_trace': 5000,
+    'default_view_traces': 5,
+    'default_view_limit': 20
+}
+
+# Profiler Configuration
+# On-demand sampling of scan cycles (admin endpoint or SIGUSR1); folded stacks under data/profiles/
+PROFILER_CONFIG = {
+    'directory': os.path.join(DATA_DIR, 'profiles'),
+    'interval': 0.01,  # seconds between stack samples (100 Hz)
+    'default_window': 30,  # seconds profiled when a window is requested without a length
+    'max_window': 600,
+    'keep': 20  # newest profiles kept; older ones are deleted
+}
+
+# Admin Configuration
+# Required by /api/admin/* when set; without it those endpoints only answer loopback clients
+# reached through TRUSTED_PROXIES, and refuse everything when neither is configured
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
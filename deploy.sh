@@ -16,7 +16,13 @@ playwright install chromium
 # Create required directories
 mkdir -p logs data
 
+# Minify and fingerprint static assets (templates pick them up from the manifest)
+echo "Building static assets..."
+python script/build_assets.py
+
 # Start Gunicorn with eventlet worker for WebSocket support
+# nginx on this host sets X-Real-IP; only then is the header believed
+export TRUSTED_PROXIES="${TRUSTED_PROXIES:-127.0.0.1}"
 echo "Starting Gunicorn with Socket.IO support..."
 gunicorn --worker-class eventlet \
          --workers 1 \
@@ -3,10 +3,13 @@
 SignalSlice Real-time Scanner
 Runs continuous hourly monitoring of pizza activity around the Pentagon
 """
+import argparse
 import asyncio
 import sys
 import os
 import logging
+import signal
+import threading
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,12 +20,86 @@ logger = logging.getLogger(__name__)
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from scheduler import main
+
+
+def serve(socket_path, metrics_port=0):
+    """Run the scanner as a daemon that feeds web processes (SCANNER_MODE=external) over a Unix socket"""
+    from state_manager import state_manager
+    from services.scanner_service import ScannerService
+    from services.scanner_ipc import ScannerIpcServer, IpcEmitter
+    from services.metrics import serve_metrics
+    from services.profiler import profiler, install_signal_handler
+
+    def snapshot():
+        state = dict(state_manager.get_state())
+        if state.get('last_scan_time'):
+            state['last_scan_time'] = state['last_scan_time'].isoformat()
+        return state
+
+    def handle_command(message):
+        command = message.get('command')
+        logger.info(f"📨 Command from web tier: {command}")
+        if command == 'manual_scan':
+            # Joins a scan already in flight, or reuses one that just completed
+            scanner.request_manual_scan()
+        elif command == 'start_scanner' and not state_manager.get('scanner_running', False):
+            scanner.start()
+        elif command == 'stop_scanner' and state_manager.get('scanner_running', False):
+            scanner.stop()
+        elif command == 'profile':
+            try:
+                if message.get('mode') == 'window':
+                    profiler.start_window(message['seconds'])
+                else:
+                    profiler.arm_next_cycle()
+            except (KeyError, TypeError, RuntimeError) as e:
+                logger.warning(f"Profile request ignored: {e}")
+        emitter.publish_state()
+
+    server = ScannerIpcServer(socket_path, on_command=handle_command, snapshot=snapshot)
+    emitter = IpcEmitter(server)
+    scanner = ScannerService(emitter=emitter)
+    server.start()
+    metrics_server = None
+    if metrics_port:
+        # Scrape timings live in this process, so Prometheus scrapes the daemon directly
+        metrics_server = serve_metrics(metrics_port)
+        logger.info(f"📈 Metrics at http://127.0.0.1:{metrics_port}/metrics")
+    scanner.start()
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    # kill -USR1 <daemon pid> profiles the next scan cycle
+    install_signal_handler(profiler)
+    try:
+        stopped.wait()
+    finally:
+        scanner.stop()
+        server.stop()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+
 if __name__ == "__main__":
+    from config import SCANNER_IPC_CONFIG, METRICS_CONFIG
+
+    parser = argparse.ArgumentParser(description="SignalSlice real-time scanner")
+    parser.add_argument('--serve', action='store_true',
+                        help="run as a daemon publishing to web processes over a Unix socket")
+    parser.add_argument('--socket', default=SCANNER_IPC_CONFIG['socket_path'],
+                        help="Unix socket path for --serve (default: %(default)s)")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_CONFIG['daemon_port'],
+                        help="local port for the daemon's /metrics, 0 to disable (default: %(default)s)")
+    args = parser.parse_args()
+
     logger.info("🛰️ SignalSlice Real-time Scanner")
     logger.info("Press Ctrl+C to stop")
     logger.info("-" * 50)
     try:
-        asyncio.run(main())  # Starts the scheduler
+        if args.serve:
+            serve(args.socket, args.metrics_port)
+        else:
+            asyncio.run(main())  # Starts the scheduler
     except KeyboardInterrupt:
         logger.info("\n🛑 Scanner stopped. Stay vigilant! 🍕")
     except Exception as e:
@@ -7,6 +7,8 @@ from datetime import datetime, timedelta
 import pytz
 from scraping.gmapsScrape import scrape_current_hour
 from script.anomalyDetect import check_current_anomalies
+from services.baseline_engine import baseline_engine
+from services.online_detector import online_detector
 import re
 import requests
 import threading
@@ -56,6 +58,13 @@ def clean_log_message(message):
                               "]+", flags=re.UNICODE)
     return emoji_pattern.sub('', message).strip()
 
+def log_streamed_reading(reading):
+    """Score a venue reading as soon as the scraper produces it"""
+    anomaly = online_detector.observe_reading(reading)
+    if anomaly:
+        logger.warning(f"🚨 Streaming anomaly at {anomaly['restaurant_url']}: "
+                       f"{anomaly['current']:.0f}% ({', '.join(anomaly['reasons'])})")
+
 async def hourly_scan():
     """Perform one complete scan cycle"""
     try:
@@ -64,11 +73,14 @@ async def hourly_scan():
         logger.info(clean_log_message(f"Starting hourly scan at {current_time.strftime('%Y-%m-%d %H:%M:%S EST')}"))
         # Step 1: Scrape current hour data
         logger.info("📡 Scraping current hour data...")
-        await scrape_current_hour()
+        results = await scrape_current_hour(on_reading=log_streamed_reading)
         
         # Step 2: Check for anomalies
         logger.info("🔍 Checking for anomalies...")
-        anomalies_found = check_current_anomalies()
+        anomalies_found = check_current_anomalies(results)
+        
+        # Step 3: Learn per-venue baselines from this cycle's readings
+        baseline_engine.update_from_cycle(results)
         
         if anomalies_found:
             logger.warning("🚨 ANOMALIES DETECTED! Check the output above.")
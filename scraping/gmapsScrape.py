@@ -11,6 +11,13 @@ from datetime import datetime, timedelta
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from validation import validate_busyness_percent, validate_url, ValidationError
+from scraping.records import ScrapedRowTable, SCRAPED_DATA_FIELDNAMES
+from services.venue_index import venue_registry
+from services.metrics import (
+    page_load_seconds, settle_seconds, extraction_seconds, readings_total,
+    scrape_errors_total, validation_errors_total
+)
+from services.tracing import tracer
 import logging
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -101,8 +108,11 @@ async def scrape_popular_times(page, restaurant_url, index_offset):
             logger.warning(f"   Raw bytes: {repr(label)}")
     return structured
 
-async def scrape_current_hour():
-    """Scrape only the current hour's data for all restaurants"""
+async def scrape_current_hour(on_reading=None):
+    """
+    Scrape only the current hour's data for all restaurants
+    on_reading, if given, is called with each venue's result as soon as it is scraped
+    """
     # Get current time in EST
     current_time = datetime.now(EST)
     current_weekday = current_time.strftime('%A')
@@ -123,7 +133,7 @@ async def scrape_current_hour():
     logger.info(f"🎯 Priority: LIVE data > Historical data > No data")
     
     results = []
-    all_scraped_data = []
+    all_scraped_data = ScrapedRowTable(SCRAPED_DATA_FIELDNAMES)
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         page = await browser.new_page()
@@ -134,6 +144,7 @@ async def scrape_current_hour():
                 validated_url = validate_url(url)
                 all_urls.append((validated_url, "restaurant"))
             except ValidationError as e:
+                validation_errors_total.inc(stage='url')
                 print(f"⚠️ Invalid restaurant URL: {e}")
         
         for url in GAY_BAR_URLS:
@@ -141,15 +152,24 @@ async def scrape_current_hour():
                 validated_url = validate_url(url)
                 all_urls.append((validated_url, "gay_bar"))
             except ValidationError as e:
+                validation_errors_total.inc(stage='url')
                 print(f"⚠️ Invalid gay bar URL: {e}")
         for url, venue_type in all_urls:
+            venue_span = tracer.span('venue', venue=url, venue_type=venue_type)
+            phase_span = None
             try:
                 logger.info(f"\n🔍 Checking current hour for: {url} (Type: {venue_type})")
-                await page.goto(url, timeout=60000)
-                await page.wait_for_timeout(4000)
+                with page_load_seconds.time(venue_type=venue_type, venue=url), tracer.span('goto'):
+                    await page.goto(url, timeout=60000)
+                with settle_seconds.time(venue_type=venue_type), tracer.span('settle'):
+                    await page.wait_for_timeout(4000)
+                # The short link has resolved to a full Maps URL carrying the venue's coordinates
+                venue_registry.record(url, page.url, venue_type)
 
                 # STEP 1: Look for LIVE data first
                 logger.info(f"  🔴 Step 1: Searching for LIVE data...")
+                extraction_started = time.perf_counter()
+                phase_span = tracer.span('live_check')
                 live_data = None
                 
                 # Look for live text indicators first
@@ -200,6 +220,7 @@ async def scrape_current_hour():
                                     try:
                                         live_percentage = validate_busyness_percent(int(percent_match.group(1)))
                                     except ValidationError as e:
+                                        validation_errors_total.inc(stage='live')
                                         print(f"⚠️ Invalid live busyness value: {e}")
                                         continue
                                     
@@ -235,9 +256,13 @@ async def scrape_current_hour():
                         "confidence": live_text_indicator["confidence"],
                         "venue_type": venue_type
                     }
+                extraction_seconds.observe(time.perf_counter() - extraction_started, venue_type=venue_type, source='live')
+                phase_span.finish()
                 # STEP 2: If no live data, get historical data (your existing logic)
                 historical_data = None
                 if not live_data:
+                    extraction_started = time.perf_counter()
+                    phase_span = tracer.span('historical_extraction')
                     logger.info(f"  📊 Step 2: No live data found, using historical data...")
                     
                     elements = await page.query_selector_all('div[aria-label*="Popular times"] [aria-label*="at"]')
@@ -266,6 +291,7 @@ async def scrape_current_hour():
                                 try:
                                     busyness_percent = validate_busyness_percent(int(percent_match.group(1)))
                                 except ValidationError as e:
+                                    validation_errors_total.inc(stage='historical')
                                     print(f"⚠️ Invalid busyness value: {e}")
                                     busyness_percent = None
                             else:
@@ -287,7 +313,6 @@ async def scrape_current_hour():
                             }
                             
                             all_time_data.append(data_entry)
-                            all_scraped_data.append(data_entry)
                     if all_time_data:
                         # Detect day cycles based on hour patterns
                         hour_sequence = [d["display_hour"] for d in all_time_data]
@@ -353,6 +378,9 @@ async def scrape_current_hour():
                             logger.info(f"    Cycle {cycle_idx} = {day_names[cycle_idx]} (today + {day_offset} days)")
                             logger.info(f"       Hours: {cycle_hours}")
 
+                        # Move the per-venue rows into the compact table once cycles are assigned
+                        all_scraped_data.extend(all_time_data)
+
                         # Find target historical data
                         for cycle_idx, cycle in enumerate(day_cycles):
                             cycle_day_name = day_names.get(cycle_idx, "Unknown")
@@ -374,6 +402,8 @@ async def scrape_current_hour():
                                         logger.info(f"    📊 Found historical data: {data['busyness_percent']}% at {data['hour_12']} {data['meridiem']}")
                                         break
                                 break
+                    extraction_seconds.observe(time.perf_counter() - extraction_started, venue_type=venue_type, source='historical')
+                    phase_span.finish()
                 # STEP 3: Determine final data to use
                 if live_data:
                     final_data = live_data
@@ -398,43 +428,49 @@ async def scrape_current_hour():
                     }
                     logger.info(f"  ❌ No data available for {target_weekday} at hour {target_hour}")
                 results.append(final_data)
+                readings_total.inc(data_type=final_data['data_type'])
+                venue_span.set_attribute('data_type', final_data['data_type'])
+                if on_reading:
+                    try:
+                        on_reading(final_data)
+                    except Exception as e:
+                        logger.error(f"❌ Reading callback failed for {url}: {e}")
                             
             except Exception as e:
+                scrape_errors_total.inc(venue_type=venue_type)
+                if phase_span is not None and phase_span.end is None:
+                    # The phase that raised (often a timeout) is the one worth seeing in the trace
+                    phase_span.set_error(e)
+                venue_span.set_error(e)
                 logger.info(f"❌ Error scraping {url}: {e}")
+            finally:
+                if phase_span is not None:
+                    phase_span.finish()
+                venue_span.finish()
             await asyncio.sleep(2)
         await browser.close()
-    # Save all scraped data to CSV
-    if all_scraped_data:
-        scraped_data_file = f"data/all_scraped_data_{current_time.strftime('%Y%m%d_%H%M%S')}.csv"
+    try:
+        venue_registry.save()
+    except OSError as e:
+        logger.error(f"❌ Could not save venue locations: {e}")
+    with tracer.span('csv_write', rows=len(results)):
+        # Save all scraped data to CSV
+        if all_scraped_data:
+            scraped_data_file = f"data/all_scraped_data_{current_time.strftime('%Y%m%d_%H%M%S')}.csv"
+            os.makedirs("data", exist_ok=True)
+            all_scraped_data.write_csv(scraped_data_file)
+            logger.info(f"📊 All scraped data saved to {scraped_data_file}")
+        # Save current hour results with data_type field
+        current_hour_file = f"data/current_hour_{current_time.strftime('%Y%m%d_%H')}.csv"
         os.makedirs("data", exist_ok=True)
-        scraped_fieldnames = [
-            "scrape_timestamp", "restaurant_url", "element_index", "hour_24", "display_hour",
-            "hour_12", "meridiem", "hour_label", "busyness_percent", "raw_aria_label",
-            "is_target_hour", "target_weekday", "target_hour", "detected_cycle",
-            "cycle_hours_count", "cycle_start_hour", "cycle_end_hour", "assigned_weekday",
-            "day_offset", "is_today_cycle", "is_target_cycle", "selected_as_target"
-        ]
-        with open(scraped_data_file, "w", newline='', encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=scraped_fieldnames)
-            writer.writeheader()
-            for data in all_scraped_data:
-                # Fill in missing fields with default values
-                for field in scraped_fieldnames:
-                    if field not in data:
-                        data[field] = None
-                writer.writerow(data)
-        logger.info(f"📊 All scraped data saved to {scraped_data_file}")
-    # Save current hour results with data_type field
-    current_hour_file = f"data/current_hour_{current_time.strftime('%Y%m%d_%H')}.csv"
-    os.makedirs("data", exist_ok=True)
     
-    fieldnames = ["restaurant_url", "weekday", "hour_24", "hour_label", "timestamp", "value", "busyness_percent", "data_type", "venue_type"]
-    with open(current_hour_file, "w", newline='', encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
+        fieldnames = ["restaurant_url", "weekday", "hour_24", "hour_label", "timestamp", "value", "busyness_percent", "data_type", "venue_type"]
+        with open(current_hour_file, "w", newline='', encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(results)
 
-    logger.info(f"✅ Current hour data saved to {current_hour_file}")
+        logger.info(f"✅ Current hour data saved to {current_hour_file}")
     return results
 
 async def main():
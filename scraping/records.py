@@ -0,0 +1,125 @@
+"""
+Compact record storage for raw scraped rows
+Stores per-element scrape data column-wise with dictionary-encoded strings
+"""
+import csv
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Full column layout of the all_scraped_data_*.csv files
+SCRAPED_DATA_FIELDNAMES = [
+    "scrape_timestamp", "restaurant_url", "element_index", "hour_24", "display_hour",
+    "hour_12", "meridiem", "hour_label", "busyness_percent", "raw_aria_label",
+    "is_target_hour", "target_weekday", "target_hour", "detected_cycle",
+    "cycle_hours_count", "cycle_start_hour", "cycle_end_hour", "assigned_weekday",
+    "day_offset", "is_today_cycle", "is_target_cycle", "selected_as_target"
+]
+
+# String columns that repeat heavily across rows and venues
+ENCODED_FIELDS = frozenset([
+    "scrape_timestamp", "restaurant_url", "meridiem", "hour_label",
+    "raw_aria_label", "target_weekday", "assigned_weekday"
+])
+
+# Code used for missing values in encoded columns
+NULL_CODE = -1
+
+
+class StringDictionary:
+    """Maps repeated strings to small integer codes"""
+
+    __slots__ = ('_codes', '_values')
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def encode(self, value: Optional[str]) -> int:
+        """Return the code for a value, adding it to the dictionary if new"""
+        if value is None:
+            return NULL_CODE
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def decode(self, code: int) -> Optional[str]:
+        """Return the value for a code"""
+        if code == NULL_CODE:
+            return None
+        return self._values[code]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class ScrapedRowTable:
+    """
+    Struct-of-arrays table for raw scraped rows
+    String columns are dictionary-encoded, other columns are stored as plain lists
+    """
+
+    def __init__(self, fieldnames: Optional[List[str]] = None):
+        self.fieldnames = list(fieldnames or SCRAPED_DATA_FIELDNAMES)
+        self._dictionaries: Dict[str, StringDictionary] = {}
+        self._columns: Dict[str, Any] = {}
+        for field in self.fieldnames:
+            if field in ENCODED_FIELDS:
+                self._dictionaries[field] = StringDictionary()
+                self._columns[field] = array('l')
+            else:
+                self._columns[field] = []
+        self._length = 0
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Append one row; fields missing from the row are stored as None"""
+        for field in self.fieldnames:
+            value = row.get(field)
+            dictionary = self._dictionaries.get(field)
+            if dictionary is not None:
+                self._columns[field].append(dictionary.encode(value))
+            else:
+                self._columns[field].append(value)
+        self._length += 1
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Append many rows"""
+        for row in rows:
+            self.append(row)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def column(self, field: str) -> List[Any]:
+        """Return the decoded values of a single column"""
+        dictionary = self._dictionaries.get(field)
+        if dictionary is None:
+            return list(self._columns[field])
+        return [dictionary.decode(code) for code in self._columns[field]]
+
+    def iter_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Yield rows as tuples in fieldname order without building dicts"""
+        decoders = []
+        for field in self.fieldnames:
+            dictionary = self._dictionaries.get(field)
+            decoders.append((self._columns[field], dictionary.decode if dictionary is not None else None))
+
+        for i in range(self._length):
+            yield tuple(
+                decode(values[i]) if decode is not None else values[i]
+                for values, decode in decoders
+            )
+
+    def write_csv(self, path: str) -> int:
+        """Stream the table to a CSV file and return the number of rows written"""
+        with open(path, "w", newline='', encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.fieldnames)
+            # None is written as an empty cell, matching csv.DictWriter
+            writer.writerows(self.iter_rows())
+        return self._length
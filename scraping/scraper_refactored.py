@@ -7,7 +7,7 @@ import csv
 import os
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from playwright.async_api import async_playwright, Page
 
 from config import (
@@ -15,16 +15,27 @@ from config import (
     LIVE_TEXT_PATTERNS, LIVE_PERCENTAGE_SELECTORS, DATA_DIR,
     DATA_FILE_PATTERNS
 )
+from scraping.records import ScrapedRowTable
+from services.venue_index import venue_registry
+from services.metrics import (
+    page_load_seconds, settle_seconds, extraction_seconds, readings_total, scrape_errors_total
+)
+from services.tracing import tracer
 
 
 class GoogleMapsScraper:
     """Handles Google Maps scraping operations"""
     
-    def __init__(self):
+    def __init__(self, on_reading: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.on_reading = on_reading
+        self.refresh_time()
+    
+    def refresh_time(self, verbose: bool = True) -> None:
+        """Re-read the clock so a long-lived scraper targets the current hour"""
         self.current_time = datetime.now(TIMEZONE)
-        self.target_weekday, self.target_hour = self._calculate_target_time()
+        self.target_weekday, self.target_hour = self._calculate_target_time(verbose)
     
-    def _calculate_target_time(self) -> Tuple[str, int]:
+    def _calculate_target_time(self, verbose: bool = True) -> Tuple[str, int]:
         """Calculate the target weekday and hour based on current time"""
         current_weekday = self.current_time.strftime('%A')
         current_hour_24 = self.current_time.hour
@@ -33,22 +44,25 @@ class GoogleMapsScraper:
         if current_hour_24 == 0:
             target_weekday = (self.current_time - timedelta(days=1)).strftime('%A')
             target_hour = 24
-            print(f"🕐 Current EST time: {self.current_time.strftime('%A %I:%M %p')} (Hour {current_hour_24})")
-            print(f"📅 Looking for PREVIOUS day's ({target_weekday}) data at hour 24 (12 AM)")
-            print(f"🔍 Logic: 12 AM on {current_weekday} = Hour 24 of {target_weekday}")
+            if verbose:
+                print(f"🕐 Current EST time: {self.current_time.strftime('%A %I:%M %p')} (Hour {current_hour_24})")
+                print(f"📅 Looking for PREVIOUS day's ({target_weekday}) data at hour 24 (12 AM)")
+                print(f"🔍 Logic: 12 AM on {current_weekday} = Hour 24 of {target_weekday}")
         else:
             target_weekday = current_weekday
             target_hour = current_hour_24
-            print(f"🕐 Current EST time: {self.current_time.strftime('%A %I:%M %p')} (Hour {current_hour_24})")
-            print(f"📅 Looking for TODAY's ({target_weekday}) data at hour {target_hour}")
+            if verbose:
+                print(f"🕐 Current EST time: {self.current_time.strftime('%A %I:%M %p')} (Hour {current_hour_24})")
+                print(f"📅 Looking for TODAY's ({target_weekday}) data at hour {target_hour}")
         
-        print(f"🎯 Priority: LIVE data > Historical data > No data")
+        if verbose:
+            print(f"🎯 Priority: LIVE data > Historical data > No data")
         return target_weekday, target_hour
     
     async def scrape_all_venues(self) -> List[Dict[str, Any]]:
         """Main entry point to scrape all venues"""
         results = []
-        all_scraped_data = []
+        all_scraped_data = ScrapedRowTable()
         
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=SCRAPING_CONFIG['headless'])
@@ -64,13 +78,23 @@ class GoogleMapsScraper:
             # Scrape each venue
             for url, venue_type in all_urls:
                 try:
-                    venue_data = await self._scrape_venue(page, url, venue_type)
+                    with tracer.span('venue', venue=url, venue_type=venue_type) as venue_span:
+                        venue_data = await self._scrape_venue(page, url, venue_type)
+                        venue_span.set_attribute('data_type', venue_data['final_data']['data_type'])
                     results.append(venue_data['final_data'])
+                    readings_total.inc(data_type=venue_data['final_data']['data_type'])
+                    if self.on_reading:
+                        try:
+                            self.on_reading(venue_data['final_data'])
+                        except Exception as e:
+                            # A detector/callback failure is not a scrape error; keep this venue's data
+                            print(f"❌ Reading callback failed for {url}: {e}")
                     
                     if venue_data.get('all_time_data'):
                         all_scraped_data.extend(venue_data['all_time_data'])
                         
                 except Exception as e:
+                    scrape_errors_total.inc(venue_type=venue_type)
                     print(f"❌ Error scraping {url}: {e}")
                 
                 await asyncio.sleep(SCRAPING_CONFIG['delay_between_urls'])
@@ -78,8 +102,10 @@ class GoogleMapsScraper:
             await browser.close()
         
         # Save scraped data
-        self._save_scraped_data(all_scraped_data)
-        self._save_current_hour_data(results)
+        venue_registry.save()
+        with tracer.span('csv_write', rows=len(results)):
+            self._save_scraped_data(all_scraped_data)
+            self._save_current_hour_data(results)
         
         return results
     
@@ -87,18 +113,23 @@ class GoogleMapsScraper:
         """Scrape a single venue"""
         print(f"\n🔍 Checking current hour for: {url} (Type: {venue_type})")
         
-        await page.goto(url, timeout=SCRAPING_CONFIG['page_timeout'])
-        await page.wait_for_timeout(SCRAPING_CONFIG['page_settle_time'])
+        with page_load_seconds.time(venue_type=venue_type, venue=url), tracer.span('goto'):
+            await page.goto(url, timeout=SCRAPING_CONFIG['page_timeout'])
+        with settle_seconds.time(venue_type=venue_type), tracer.span('settle'):
+            await page.wait_for_timeout(SCRAPING_CONFIG['page_settle_time'])
+        venue_registry.record(url, page.url, venue_type)
         
         # Try to get live data first
-        live_data = await self._extract_live_data(page, url, venue_type)
+        with extraction_seconds.time(venue_type=venue_type, source='live'), tracer.span('live_check'):
+            live_data = await self._extract_live_data(page, url, venue_type)
         
         # If no live data, get historical data
         historical_data = None
         all_time_data = []
         
         if not live_data:
-            historical_result = await self._extract_historical_data(page, url, venue_type)
+            with extraction_seconds.time(venue_type=venue_type, source='historical'), tracer.span('historical_extraction'):
+                historical_result = await self._extract_historical_data(page, url, venue_type)
             historical_data = historical_result['target_data']
             all_time_data = historical_result['all_data']
         
@@ -110,6 +141,10 @@ class GoogleMapsScraper:
             'all_time_data': all_time_data
         }
     
+    async def extract_live_data(self, page: Page, url: str, venue_type: str) -> Optional[Dict[str, Any]]:
+        """Live indicators only, from a venue page that is already loaded (used by the live poller)"""
+        return await self._extract_live_data(page, url, venue_type)
+    
     async def _extract_live_data(self, page: Page, url: str, venue_type: str) -> Optional[Dict[str, Any]]:
         """Extract live data from the page"""
         print(f"  🔴 Step 1: Searching for LIVE data...")
@@ -384,8 +419,8 @@ class GoogleMapsScraper:
                 "venue_type": venue_type
             }
     
-    def _save_scraped_data(self, all_scraped_data: List[Dict[str, Any]]) -> None:
-        """Save all scraped data to CSV"""
+    def _save_scraped_data(self, all_scraped_data: ScrapedRowTable) -> None:
+        """Stream all scraped data to CSV"""
         if not all_scraped_data:
             return
         
@@ -393,24 +428,7 @@ class GoogleMapsScraper:
         scraped_data_file = os.path.join(DATA_DIR, DATA_FILE_PATTERNS['scraped_data'].format(timestamp=timestamp))
         
         os.makedirs(DATA_DIR, exist_ok=True)
-        
-        fieldnames = [
-            "scrape_timestamp", "restaurant_url", "element_index", "hour_24", "display_hour",
-            "hour_12", "meridiem", "hour_label", "busyness_percent", "raw_aria_label",
-            "is_target_hour", "target_weekday", "target_hour", "detected_cycle",
-            "cycle_hours_count", "cycle_start_hour", "cycle_end_hour", "assigned_weekday",
-            "day_offset", "is_today_cycle"
-        ]
-        
-        with open(scraped_data_file, "w", newline='', encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for data in all_scraped_data:
-                # Fill in missing fields with default values
-                for field in fieldnames:
-                    if field not in data:
-                        data[field] = None
-                writer.writerow(data)
+        all_scraped_data.write_csv(scraped_data_file)
         
         print(f"📊 All scraped data saved to {scraped_data_file}")
     
@@ -433,7 +451,7 @@ class GoogleMapsScraper:
 
 
 # Backward compatibility function
-async def scrape_current_hour() -> List[Dict[str, Any]]:
+async def scrape_current_hour(on_reading: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
     """Backward compatible wrapper for the refactored scraper"""
-    scraper = GoogleMapsScraper()
+    scraper = GoogleMapsScraper(on_reading)
     return await scraper.scrape_all_venues()
\ No newline at end of file
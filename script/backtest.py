@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+SignalSlice Detector Backtest
+Replays stored readings through the anomaly detection rule for many parameter sets
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.baseline_service import WEEKDAY_INDEX, baseline_hour, baseline_service
+from services.baseline_engine import BaselineEngine
+from services.batch_detector import BatchAnomalyDetector, anomaly_masks, batch_detector
+from services.stored_readings import ReplayReadings, load_readings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+# Label keys: (venue, weekday index, baseline hour, date or None for every date)
+LabelKey = Tuple[str, int, int, Optional[str]]
+
+
+def load_labels(path: str) -> Set[LabelKey]:
+    """
+    Load labelled anomaly events from a CSV with columns
+    restaurant_url, weekday, hour and an optional date (YYYY-MM-DD)
+    """
+    labels: Set[LabelKey] = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            weekday_idx = WEEKDAY_INDEX.get(row.get("weekday", ""))
+            if weekday_idx is None or not row.get("hour"):
+                logger.warning(f"Skipping invalid label row: {row}")
+                continue
+            labels.add((row["restaurant_url"], weekday_idx, baseline_hour(row["hour"]), row.get("date") or None))
+    return labels
+
+
+def train_detector(readings: ReplayReadings) -> BatchAnomalyDetector:
+    """
+    Detector whose learned baselines come only from these readings
+    The compiled artifact is left out: it is built from all stored history, replay window included
+    """
+    # The engine only touches its file on save(); the directory just keeps it off the live stats
+    with tempfile.TemporaryDirectory() as directory:
+        engine = BaselineEngine(os.path.join(directory, "stats.bin"))
+    for venue, weekday, hour, current in zip(readings.venues, readings.weekdays, readings.hours, readings.current):
+        engine.observe(venue, weekday, hour, current)
+    return BatchAnomalyDetector(baseline_service, engine, artifacts=None)
+
+
+def label_readings(readings: ReplayReadings, labels: Set[LabelKey]) -> np.ndarray:
+    """Boolean array marking readings that fall on a labelled event"""
+    truth = np.zeros(len(readings), dtype=np.bool_)
+    for i, key in enumerate(zip(readings.venues, readings.weekdays, readings.hours, readings.dates)):
+        if key in labels or (key[0], key[1], key[2], None) in labels:
+            truth[i] = True
+    return truth
+
+
+# Arrays shared with worker processes, set once per process by _init_worker
+_worker_arrays: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(arrays: Dict[str, np.ndarray]) -> None:
+    """Receive the replay arrays once per worker instead of once per task"""
+    _worker_arrays.update(arrays)
+
+
+def _evaluate(params: Tuple[float, Optional[float], bool]) -> Dict[str, object]:
+    """Score every replayed reading for one parameter set"""
+    threshold, z_threshold, use_live_flags = params
+    arrays = _worker_arrays
+    live = arrays["live_flags"] if use_live_flags else np.zeros_like(arrays["live_flags"])
+    _, _, _, flagged = anomaly_masks(arrays["current"], arrays["expected"], arrays["zscore"],
+                                     live, threshold, z_threshold)
+
+    result: Dict[str, object] = {
+        "threshold": threshold,
+        "z_threshold": z_threshold,
+        "live_flags": use_live_flags,
+        "flagged": int(flagged.sum()),
+    }
+    truth = arrays.get("truth")
+    if truth is not None:
+        tp = int((flagged & truth).sum())
+        fp = int((flagged & ~truth).sum())
+        fn = int((~flagged & truth).sum())
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        result.update({"tp": tp, "fp": fp, "fn": fn,
+                       "precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)})
+    return result
+
+
+def run_backtest(readings: ReplayReadings, param_sets: List[Tuple[float, Optional[float], bool]],
+                 labels: Optional[Set[LabelKey]] = None, workers: Optional[int] = None,
+                 detector: Optional[BatchAnomalyDetector] = None) -> Tuple[List[Dict[str, object]], float]:
+    """Run all parameter sets in parallel; returns (results, seconds elapsed)"""
+    started = time.perf_counter()
+    detector = detector or batch_detector
+    workers = workers or os.cpu_count() or 1
+
+    # Baseline lookups do not depend on the parameters, so resolve them once for all readings
+    matrix = detector.baseline_matrix(set(readings.venues))
+    rows = np.fromiter((matrix.venue_index.get(v, matrix.fallback_row) for v in readings.venues),
+                       dtype=np.intp, count=len(readings))
+    weekdays = np.asarray(readings.weekdays, dtype=np.intp)
+    hours = np.asarray(readings.hours, dtype=np.intp)
+    current = np.asarray(readings.current, dtype=np.float64)
+    expected = matrix.mean[rows, weekdays, hours]
+    std = matrix.std[rows, weekdays, hours]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zscore = np.where(std > 0, (current - expected) / std, np.nan)
+
+    arrays = {
+        "current": current,
+        "expected": expected,
+        "zscore": zscore,
+        "live_flags": np.asarray(readings.live_flags, dtype=np.bool_),
+    }
+    if labels is not None:
+        arrays["truth"] = label_readings(readings, labels)
+
+    if workers == 1:
+        _init_worker(arrays)
+        results = [_evaluate(params) for params in param_sets]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+            chunksize = max(1, len(param_sets) // (4 * workers))
+            results = list(pool.map(_evaluate, param_sets, chunksize=chunksize))
+    return results, time.perf_counter() - started
+
+
+def parse_float_list(value: str) -> List[float]:
+    """Parse a comma-separated list of numbers"""
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay stored readings through the anomaly detector")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory with stored scrape CSVs")
+    parser.add_argument("--source", choices=["cycles", "profiles"], default="profiles",
+                        help="replay one reading per scan (cycles) or every profile row (profiles)")
+    parser.add_argument("--labels", help="CSV of labelled events (restaurant_url, weekday, hour[, date])")
+    parser.add_argument("--thresholds", type=parse_float_list, default=parse_float_list("10,15,20,25,30,35,40"),
+                        help="comma-separated percentage-point thresholds")
+    parser.add_argument("--z-thresholds", type=parse_float_list, default=[],
+                        help="comma-separated z-score thresholds (learned baselines only)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--train-until", metavar="YYYY-MM-DD",
+                        help="learn baselines from readings before this date and replay only the rest; "
+                             "without it the live baselines, trained on the replayed readings, are used")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    readings = load_readings(args.data_dir, args.source)
+    if not len(readings):
+        logger.error(f"No readings found in {args.data_dir}")
+        return 1
+    labels = load_labels(args.labels) if args.labels else None
+
+    detector = None
+    if args.train_until:
+        training, readings = readings.split(args.train_until)
+        if not len(readings):
+            logger.error(f"No readings on or after {args.train_until} to replay")
+            return 1
+        detector = train_detector(training)
+        logger.info(f"📚 Baselines learned from {len(training)} readings before {args.train_until}")
+    else:
+        logger.warning("⚠️ Scoring against the live learned baselines, which were trained on the replayed "
+                       "readings; results are optimistic. Use --train-until for an out-of-sample replay")
+
+    z_options: List[Optional[float]] = [None] + list(args.z_thresholds)
+    param_sets = list(itertools.product(args.thresholds, z_options, [True, False]))
+    results, elapsed = run_backtest(readings, param_sets, labels, args.workers, detector)
+
+    throughput = len(readings) * len(param_sets) / elapsed if elapsed > 0 else float("inf")
+    logger.info(f"📊 Replayed {len(readings)} readings × {len(param_sets)} parameter sets in {elapsed:.2f}s "
+                f"({throughput:,.0f} readings/second)")
+
+    ranked = sorted(results, key=lambda r: (r.get("f1", 0), -r["flagged"]), reverse=True)
+    for result in ranked:
+        line = (f"threshold={result['threshold']:>5} z={str(result['z_threshold']):>5} "
+                f"live={str(result['live_flags']):>5} flagged={result['flagged']:>6}")
+        if labels is not None:
+            line += f" precision={result['precision']:.3f} recall={result['recall']:.3f} f1={result['f1']:.3f}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"readings": len(readings), "parameter_sets": len(param_sets),
+                       "train_until": args.train_until, "in_sample_baselines": not args.train_until,
+                       "seconds": elapsed, "readings_per_second": throughput, "results": ranked}, f, indent=2)
+        logger.info(f"✅ Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
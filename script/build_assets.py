@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+SignalSlice Asset Builder
+Minifies static assets, fingerprints their names and writes precompressed variants and a manifest
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ASSET_CONFIG
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without the optional brotli package
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+MANIFEST_NAME = 'manifest.json'
+
+
+def minify_css(source: str) -> str:
+    """Strip comments and collapse whitespace around CSS punctuation"""
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    css = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservative JavaScript minification without a parser: drops indentation, blank lines and
+    comments that cannot be inside a string. Line breaks stay, so automatic semicolons still apply.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        comment = line.find('//')
+        # Only cut a trailing comment when nothing before it could open a string or regex
+        if comment > 0 and not re.search(r'[\'"`/]', line[:comment]):
+            line = line[:comment].rstrip()
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprint(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def write_variants(path: str, content: bytes) -> List[str]:
+    """Write the file plus .gz (and .br) siblings for servers that send precompressed files"""
+    written = [path]
+    with open(path, 'wb') as f:
+        f.write(content)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    written.append(path + '.gz')
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+        written.append(path + '.br')
+    return written
+
+
+def load_manifest(dist_dir: str) -> Dict[str, str]:
+    path = os.path.join(dist_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_assets(static_dir: str, assets=ASSET_CONFIG['assets'], keep_previous: bool = True) -> Dict[str, str]:
+    """
+    Build every asset into static/<dist>/ and return the manifest (source name -> static path)
+    Files from the previous build are kept so pages already loaded can finish fetching them
+    """
+    dist_dir = os.path.join(static_dir, ASSET_CONFIG['dist_subdir'])
+    os.makedirs(dist_dir, exist_ok=True)
+    previous = load_manifest(dist_dir)
+
+    manifest = {}
+    for name in assets:
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            source = f.read()
+        base, ext = os.path.splitext(name)
+        minify = MINIFIERS.get(ext)
+        content = (minify(source) if minify else source).encode('utf-8')
+        hashed = f"{base}.{fingerprint(content)}{ext}"
+        write_variants(os.path.join(dist_dir, hashed), content)
+        manifest[name] = f"{ASSET_CONFIG['dist_subdir']}/{hashed}"
+        logger.info(f"📦 {name}: {len(source.encode('utf-8'))} -> {len(content)} bytes as {hashed}")
+
+    keep = set(manifest.values()) | (set(previous.values()) if keep_previous else set())
+    keep = {os.path.basename(path) for path in keep}
+    for filename in os.listdir(dist_dir):
+        if filename == MANIFEST_NAME:
+            continue
+        stem = filename[:-3] if filename.endswith(('.gz', '.br')) else filename
+        if stem not in keep:
+            os.remove(os.path.join(dist_dir, filename))
+
+    # Manifest last: the app only switches to the new names once every file exists
+    tmp_path = os.path.join(dist_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(dist_dir, MANIFEST_NAME))
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build fingerprinted, minified and precompressed static assets")
+    parser.add_argument("--static-dir", default=STATIC_DIR, help="directory with the source assets")
+    parser.add_argument("--prune", action="store_true", help="also delete files from the previous build")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    manifest = build_assets(args.static_dir, keep_previous=not args.prune)
+    logger.info(f"✅ Wrote {len(manifest)} assets to {os.path.join(args.static_dir, ASSET_CONFIG['dist_subdir'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
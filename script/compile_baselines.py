@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+SignalSlice Baseline Compiler
+Computes robust per-venue weekday/hour baselines from stored history in parallel
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import BASELINE_ARTIFACT_FILE, DATA_DIR
+from services.baseline_artifact import (
+    ARTIFACT_HOURS, ARTIFACT_STATS, ARTIFACT_WEEKDAYS, STAT_INDEX, BaselineArtifact, write_artifact
+)
+from services.stored_readings import load_readings
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def compile_venue(slots: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Robust statistics for one venue
+    slots are flat weekday * ARTIFACT_HOURS + hour indexes aligned with values
+    Returns a (ARTIFACT_WEEKDAYS, ARTIFACT_HOURS, len(ARTIFACT_STATS)) float32 array
+    """
+    out = np.full((ARTIFACT_WEEKDAYS * ARTIFACT_HOURS, len(ARTIFACT_STATS)), np.nan, dtype=np.float32)
+    out[:, STAT_INDEX['count']] = 0
+
+    order = np.argsort(slots, kind='stable')
+    slots = slots[order]
+    values = values[order]
+    unique_slots, starts, counts = np.unique(slots, return_index=True, return_counts=True)
+    for slot, group in zip(unique_slots, np.split(values, starts[1:])):
+        p10, p25, median, p75, p90 = np.percentile(group, PERCENTILES)
+        out[slot, STAT_INDEX['median']] = median
+        out[slot, STAT_INDEX['mad']] = np.median(np.abs(group - median))
+        out[slot, STAT_INDEX['p10']] = p10
+        out[slot, STAT_INDEX['p25']] = p25
+        out[slot, STAT_INDEX['p75']] = p75
+        out[slot, STAT_INDEX['p90']] = p90
+    out[unique_slots, STAT_INDEX['count']] = counts
+    return out.reshape(ARTIFACT_WEEKDAYS, ARTIFACT_HOURS, len(ARTIFACT_STATS))
+
+
+def _compile_task(task: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Process pool entry point"""
+    return compile_venue(*task)
+
+
+def group_by_venue(venues: List[str], weekdays: List[int], hours: List[int],
+                   values: List[float]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Split readings into per-venue (flat slot, value) arrays"""
+    venue_names, venue_ids = np.unique(np.asarray(venues, dtype=object), return_inverse=True)
+    slots = np.asarray(weekdays, dtype=np.intp) * ARTIFACT_HOURS + np.asarray(hours, dtype=np.intp)
+    values_array = np.asarray(values, dtype=np.float64)
+
+    order = np.argsort(venue_ids, kind='stable')
+    boundaries = np.flatnonzero(np.diff(venue_ids[order])) + 1
+    return {
+        venue_names[venue_ids[idx[0]]]: (slots[idx], values_array[idx])
+        for idx in np.split(order, boundaries) if len(idx)
+    }
+
+
+def compile_baselines(grouped: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                      workers: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+    """Compile every venue, fanning out across a process pool; returns (venues, artifact data)"""
+    venues = sorted(grouped)
+    tasks = [grouped[venue] for venue in venues]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        results = [_compile_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            results = list(pool.map(_compile_task, tasks, chunksize=chunksize))
+
+    data = np.stack(results) if results else np.zeros(
+        (0, ARTIFACT_WEEKDAYS, ARTIFACT_HOURS, len(ARTIFACT_STATS)), dtype=np.float32)
+    return venues, data
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile robust baselines into a binary artifact")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory with stored scrape CSVs")
+    parser.add_argument("--source", choices=["cycles", "profiles"], default="profiles",
+                        help="compile from one reading per scan (cycles) or every profile row (profiles)")
+    parser.add_argument("--output", default=BASELINE_ARTIFACT_FILE, help="artifact file to write")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    started = time.perf_counter()
+    readings = load_readings(args.data_dir, args.source)
+    if not len(readings):
+        logger.error(f"No readings found in {args.data_dir}")
+        return 1
+    loaded = time.perf_counter()
+
+    grouped = group_by_venue(readings.venues, readings.weekdays, readings.hours, readings.current)
+    venues, data = compile_baselines(grouped, args.workers)
+    write_artifact(args.output, venues, data)
+    finished = time.perf_counter()
+
+    artifact = BaselineArtifact.load(args.output)
+    slots = int(np.count_nonzero(artifact.stat('count')))
+    logger.info(f"📦 Compiled {len(readings)} readings into {len(venues)} venues / {slots} slots "
+                f"(load {loaded - started:.2f}s, compile+write {finished - loaded:.2f}s) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+SignalSlice Assets
+Resolves static asset names to the fingerprinted files listed in the build manifest
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from flask import Response, request, url_for
+
+from config import ASSET_CONFIG
+
+
+class AssetManifest:
+    """
+    Manifest written by script/build_assets.py, reloaded when the file changes
+    Without a manifest (no build yet) assets resolve to their unversioned source files
+    """
+
+    def __init__(self, static_folder: str, dist_subdir: str = ASSET_CONFIG['dist_subdir']):
+        self.path = os.path.join(static_folder, dist_subdir, 'manifest.json')
+        self.prefix = f"/{dist_subdir}/"
+        self._entries: Dict[str, str] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def entries(self) -> Dict[str, str]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {}
+        if mtime != self._mtime:
+            with self._lock:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        self._entries = json.load(f)
+                    self._mtime = mtime
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Could not read asset manifest {self.path}: {e}")
+        return self._entries
+
+    def url(self, name: str) -> str:
+        """URL for a static asset, fingerprinted when it has been built"""
+        return url_for('static', filename=self.entries().get(name, name))
+
+    def cache_headers(self, response: Response) -> Response:
+        """after_request hook: fingerprinted files never change, so browsers may keep them for a year"""
+        if response.status_code == 200 and request.path.startswith('/static' + self.prefix):
+            response.cache_control.public = True
+            response.cache_control.max_age = ASSET_CONFIG['max_age']
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
@@ -0,0 +1,167 @@
+"""
+SignalSlice Baseline Artifact
+Compiled robust baselines stored as a memory-mappable binary file
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config import BASELINE_ARTIFACT_FILE, BASELINE_RELOAD_CHECK_INTERVAL
+from services.baseline_service import normalize_weekday
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b'SSBA'
+ARTIFACT_VERSION = 1
+# magic, format version, venue count, weekdays, hours, stat count, venue table bytes, data offset, compiled at
+HEADER_FORMAT = struct.Struct('<4sHIBBBIQd')
+DATA_ALIGNMENT = 64
+
+ARTIFACT_WEEKDAYS = 7
+ARTIFACT_HOURS = 25  # hours 0-24 (24 is 12 AM of the previous day)
+# Last axis of the data array; slots without readings are NaN with count 0
+ARTIFACT_STATS = ('median', 'mad', 'p10', 'p25', 'p75', 'p90', 'count')
+STAT_INDEX = {name: i for i, name in enumerate(ARTIFACT_STATS)}
+ARTIFACT_DTYPE = np.dtype('<f4')
+
+# Scale factor that makes the MAD a consistent estimator of the standard deviation
+MAD_TO_STD = 1.4826
+
+
+def write_artifact(path: str, venues: Sequence[str], data: np.ndarray) -> None:
+    """
+    Write compiled baselines atomically
+    data has shape (len(venues), ARTIFACT_WEEKDAYS, ARTIFACT_HOURS, len(ARTIFACT_STATS))
+    """
+    expected_shape = (len(venues), ARTIFACT_WEEKDAYS, ARTIFACT_HOURS, len(ARTIFACT_STATS))
+    if data.shape != expected_shape:
+        raise ValueError(f"artifact data has shape {data.shape}, expected {expected_shape}")
+
+    venue_table = json.dumps(list(venues)).encode('utf-8')
+    unaligned = HEADER_FORMAT.size + len(venue_table)
+    data_offset = -(-unaligned // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    header = HEADER_FORMAT.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(venues), ARTIFACT_WEEKDAYS,
+                                ARTIFACT_HOURS, len(ARTIFACT_STATS), len(venue_table), data_offset, time.time())
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(venue_table)
+        f.write(b'\0' * (data_offset - unaligned))
+        f.write(np.ascontiguousarray(data, dtype=ARTIFACT_DTYPE).tobytes())
+    os.replace(tmp_path, path)
+
+
+class BaselineArtifact:
+    """A loaded artifact; the data array is a read-only memory map of the file"""
+
+    def __init__(self, venues: List[str], data: np.ndarray, compiled_at: float):
+        self.venues = venues
+        self.venue_index = {venue: i for i, venue in enumerate(venues)}
+        self.data = data
+        self.compiled_at = compiled_at
+
+    @classmethod
+    def load(cls, path: str) -> 'BaselineArtifact':
+        """Map an artifact file; only the header and venue table are read eagerly"""
+        with open(path, "rb") as f:
+            header = f.read(HEADER_FORMAT.size)
+            try:
+                (magic, version, venue_count, weekdays, hours, stat_count,
+                 table_size, data_offset, compiled_at) = HEADER_FORMAT.unpack(header)
+            except struct.error as e:
+                raise ValueError(f"truncated baseline artifact: {e}") from e
+            if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+                raise ValueError(f"unsupported baseline artifact (magic={magic!r}, version={version})")
+            if (weekdays, hours, stat_count) != (ARTIFACT_WEEKDAYS, ARTIFACT_HOURS, len(ARTIFACT_STATS)):
+                raise ValueError(f"unexpected artifact layout {(weekdays, hours, stat_count)}")
+            venues = json.loads(f.read(table_size).decode('utf-8'))
+        if len(venues) != venue_count:
+            raise ValueError(f"artifact lists {len(venues)} venues, header says {venue_count}")
+
+        shape = (venue_count, weekdays, hours, stat_count)
+        if venue_count:
+            data = np.memmap(path, dtype=ARTIFACT_DTYPE, mode='r', offset=data_offset, shape=shape)
+        else:
+            data = np.zeros(shape, dtype=ARTIFACT_DTYPE)
+        return cls(venues, data, compiled_at)
+
+    def stat(self, name: str) -> np.ndarray:
+        """(venue, weekday, hour) view of one statistic"""
+        return self.data[..., STAT_INDEX[name]]
+
+    def robust_std(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(venue, weekday, hour) standard deviation estimated from the MAD, optionally for some venue rows"""
+        mad = self.stat('mad') if rows is None else self.stat('mad')[rows]
+        return mad.astype(np.float64) * MAD_TO_STD
+
+    def lookup(self, venue: str, weekday: Union[str, int], hour: Union[str, int]) -> Optional[Dict[str, float]]:
+        """All statistics for one slot, or None if the venue/slot has no compiled history"""
+        row = self.venue_index.get(venue)
+        if row is None:
+            return None
+        values = self.data[row, normalize_weekday(weekday), int(hour)]
+        if not values[STAT_INDEX['count']]:
+            return None
+        return {name: float(values[i]) for i, name in enumerate(ARTIFACT_STATS)}
+
+    def __len__(self) -> int:
+        return len(self.venues)
+
+
+class BaselineArtifactStore:
+    """Serves the current artifact, re-mapping it when the file is replaced"""
+
+    def __init__(self, path: str = BASELINE_ARTIFACT_FILE, check_interval: float = BASELINE_RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._snapshot: Tuple[Optional[int], Optional[BaselineArtifact]] = (None, None)
+        self._last_check: Optional[float] = None
+
+    def reload(self) -> Optional[BaselineArtifact]:
+        """Map the artifact again if the file changed; returns the current artifact"""
+        with self._reload_lock:
+            self._last_check = time.monotonic()
+            current_mtime, current = self._snapshot
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                # Optional source: detection runs on baseline.json and learned baselines without it
+                return current
+            if mtime == current_mtime:
+                return current
+
+            try:
+                artifact = BaselineArtifact.load(self.path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load baseline artifact from {self.path}: {e}")
+                return current
+
+            self._snapshot = (mtime, artifact)
+            logger.info(f"📦 Baseline artifact mapped from {self.path} ({len(artifact)} venues)")
+            return artifact
+
+    def current(self) -> Optional[BaselineArtifact]:
+        """The loaded artifact (None if none has been compiled), re-checking the file periodically"""
+        if self._last_check is None or time.monotonic() - self._last_check >= self.check_interval:
+            return self.reload()
+        return self._snapshot[1]
+
+    @property
+    def version(self) -> Optional[int]:
+        """Identifies the mapped artifact (file mtime); None until one is loaded"""
+        return self._snapshot[0]
+
+
+# Global baseline artifact store instance
+baseline_artifact_store = BaselineArtifactStore()
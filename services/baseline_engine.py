@@ -0,0 +1,239 @@
+"""
+SignalSlice Baseline Engine
+Learns per-venue weekday/hour baselines incrementally from scan readings
+"""
+import logging
+import math
+import os
+import struct
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from config import BASELINE_STATS_FILE, BASELINE_MIN_SAMPLES
+from services.baseline_service import normalize_weekday, baseline_hour
+
+logger = logging.getLogger(__name__)
+
+# Busyness histogram used as a quantile sketch: 5-point bins over 0-100
+HISTOGRAM_BIN_WIDTH = 5
+HISTOGRAM_BINS = 100 // HISTOGRAM_BIN_WIDTH + 1
+HISTOGRAM_MAX_COUNT = 0xFFFF
+
+# Slot changes remembered for incremental consumers; past this they rebuild from scratch
+CHANGE_LOG_LIMIT = 100_000
+
+# Binary layout of the persisted statistics
+STATS_MAGIC = b'SSBE'
+STATS_VERSION = 1
+HEADER_FORMAT = struct.Struct('<4sHII')
+VENUE_LENGTH_FORMAT = struct.Struct('<H')
+SLOT_FORMAT = struct.Struct(f'<IBBIdd{HISTOGRAM_BINS}H')
+
+SlotKey = Tuple[str, int, int]
+
+
+class SlotStats:
+    """Running statistics for one venue/weekday/hour slot"""
+
+    __slots__ = ('count', 'mean', 'm2', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.histogram = array('H', bytes(2 * HISTOGRAM_BINS))
+
+    def update(self, value: float) -> None:
+        """Add one reading (Welford's algorithm plus a histogram bump)"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        bucket = min(int(value) // HISTOGRAM_BIN_WIDTH, HISTOGRAM_BINS - 1)
+        if self.histogram[bucket] == HISTOGRAM_MAX_COUNT:
+            # Halve every bin so the sketch keeps its shape without overflowing
+            for i in range(HISTOGRAM_BINS):
+                self.histogram[i] >>= 1
+        self.histogram[bucket] += 1
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the readings seen so far"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of the readings seen so far"""
+        return math.sqrt(self.variance)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile from the histogram sketch"""
+        total = sum(self.histogram)
+        if total == 0:
+            return None
+        target = q * total
+        cumulative = 0
+        for i, count in enumerate(self.histogram):
+            if count and cumulative + count >= target:
+                # Interpolate linearly within the bin
+                fraction = (target - cumulative) / count
+                return min(100.0, (i + fraction) * HISTOGRAM_BIN_WIDTH)
+            cumulative += count
+        return 100.0
+
+
+class BaselineEngine:
+    """Per-venue running baselines keyed by (venue, weekday, hour)"""
+
+    def __init__(self, path: str = BASELINE_STATS_FILE, min_samples: int = BASELINE_MIN_SAMPLES):
+        self.path = path
+        self.min_samples = min_samples
+        self._slots: Dict[SlotKey, SlotStats] = {}
+        self._lock = threading.Lock()
+        # Bumped on every change; derived structures catch up via changes_since(version)
+        self.version = 0
+        # Bumped when the slots are replaced wholesale (load) and the change log no longer covers them
+        self.generation = 0
+        self._change_log: List[Tuple[int, SlotKey]] = []
+        if os.path.exists(path):
+            self.load()
+
+    def observe(self, venue: str, weekday: Union[str, int], hour: Union[str, int], value: float) -> SlotStats:
+        """Fold a single reading into its slot in O(1)"""
+        key = (venue, normalize_weekday(weekday), int(hour))
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = SlotStats()
+            slot.update(float(value))
+            self.version += 1
+            if len(self._change_log) >= CHANGE_LOG_LIMIT:
+                self._change_log = []
+                self.generation += 1
+            self._change_log.append((self.version, key))
+        return slot
+
+    def observe_batch(self, readings: Iterable[Dict[str, Any]]) -> int:
+        """Fold a cycle's scraped results into the baselines; returns readings used"""
+        used = 0
+        for reading in readings:
+            value = reading.get('busyness_percent')
+            if value is None or reading.get('weekday') is None or reading.get('hour_24') is None:
+                continue
+            try:
+                self.observe(reading['restaurant_url'], reading['weekday'],
+                             baseline_hour(reading['hour_24']), float(value))
+                used += 1
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping reading for baseline update: {e}")
+        return used
+
+    def update_from_cycle(self, readings: Iterable[Dict[str, Any]]) -> int:
+        """Learn from one scan cycle and persist the updated statistics"""
+        used = self.observe_batch(readings)
+        if used:
+            self.save()
+            logger.info(f"📈 Learned baselines updated from {used} readings ({len(self._slots)} slots)")
+        return used
+
+    def stats(self, venue: str, weekday: Union[str, int], hour: Union[str, int]) -> Optional[SlotStats]:
+        """Running statistics for a slot, if any readings were seen"""
+        return self._slots.get((venue, normalize_weekday(weekday), int(hour)))
+
+    def expected(self, venue: str, weekday: Union[str, int], hour: Union[str, int]) -> Optional[float]:
+        """Learned mean for a slot once it has at least min_samples readings"""
+        slot = self.stats(venue, weekday, hour)
+        if slot is None or slot.count < self.min_samples:
+            return None
+        return slot.mean
+
+    def slots(self) -> List[Tuple[SlotKey, SlotStats]]:
+        """Snapshot of all (key, stats) pairs"""
+        with self._lock:
+            return list(self._slots.items())
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[SlotKey, SlotStats]]]:
+        """Slots updated after `version` of this generation, or None if the change log does not reach back"""
+        with self._lock:
+            log = self._change_log
+            # Versions in the log are consecutive, ending at self.version
+            first = log[0][0] if log else self.version + 1
+            if not first - 1 <= version <= self.version:
+                return None
+            keys = {key for _, key in log[version + 1 - first:]}
+            return [(key, self._slots[key]) for key in keys]
+
+    def venues(self) -> List[str]:
+        """Venues with learned statistics"""
+        return sorted({key[0] for key in self._slots})
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def save(self) -> None:
+        """Persist all slots to the compact binary stats file"""
+        items = self.slots()
+
+        venue_ids: Dict[str, int] = {}
+        for (venue, _, _), _ in items:
+            venue_ids.setdefault(venue, len(venue_ids))
+
+        parts = [HEADER_FORMAT.pack(STATS_MAGIC, STATS_VERSION, len(venue_ids), len(items))]
+        for venue in venue_ids:
+            encoded = venue.encode('utf-8')
+            parts.append(VENUE_LENGTH_FORMAT.pack(len(encoded)))
+            parts.append(encoded)
+        for (venue, weekday, hour), slot in items:
+            parts.append(SLOT_FORMAT.pack(venue_ids[venue], weekday, hour, slot.count,
+                                          slot.mean, slot.m2, *slot.histogram))
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b''.join(parts))
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> None:
+        """Load slots from the binary stats file, replacing in-memory state"""
+        with open(self.path, "rb") as f:
+            payload = f.read()
+
+        try:
+            magic, version, venue_count, slot_count = HEADER_FORMAT.unpack_from(payload, 0)
+            if magic != STATS_MAGIC or version != STATS_VERSION:
+                raise ValueError(f"unsupported stats file (magic={magic!r}, version={version})")
+            offset = HEADER_FORMAT.size
+
+            venues = []
+            for _ in range(venue_count):
+                (length,) = VENUE_LENGTH_FORMAT.unpack_from(payload, offset)
+                offset += VENUE_LENGTH_FORMAT.size
+                venues.append(payload[offset:offset + length].decode('utf-8'))
+                offset += length
+
+            slots: Dict[SlotKey, SlotStats] = {}
+            for _ in range(slot_count):
+                venue_id, weekday, hour, count, mean, m2, *histogram = SLOT_FORMAT.unpack_from(payload, offset)
+                offset += SLOT_FORMAT.size
+                slot = SlotStats()
+                slot.count, slot.mean, slot.m2 = count, mean, m2
+                slot.histogram = array('H', histogram)
+                slots[(venues[venue_id], weekday, hour)] = slot
+        except (struct.error, ValueError, IndexError, UnicodeDecodeError) as e:
+            logger.error(f"Could not load learned baselines from {self.path}: {e}")
+            return
+
+        with self._lock:
+            self._slots = slots
+            self.version += 1
+            self.generation += 1
+            self._change_log = []
+        logger.info(f"📈 Loaded {len(slots)} learned baseline slots from {self.path}")
+
+
+# Global baseline engine instance
+baseline_engine = BaselineEngine()
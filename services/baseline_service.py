@@ -0,0 +1,139 @@
+"""
+SignalSlice Baseline Service
+Keeps baseline.json indexed in memory and reloads it when the file changes
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from config import BASELINE_FILE, BASELINE_RELOAD_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_INDEX = {
+    name: i for i, name in enumerate(
+        ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+    )
+}
+
+# (venue, weekday index, hour) -> expected busyness; venue None is the global profile
+BaselineKey = Tuple[Optional[str], int, int]
+
+
+def normalize_weekday(weekday: Union[str, int]) -> int:
+    """Convert a weekday name or index (0 = Sunday) to an index"""
+    if isinstance(weekday, int):
+        return weekday % 7
+    return WEEKDAY_INDEX[weekday]
+
+
+def baseline_hour(hour_24: Union[str, int]) -> int:
+    """Convert a clock hour to a baseline hour (12 AM is hour 24 of the previous day)"""
+    hour = int(hour_24)
+    return 24 if hour == 0 else hour
+
+
+class BaselineService:
+    """In-memory baseline index with mtime-based hot reload"""
+
+    def __init__(self, path: str = BASELINE_FILE, check_interval: float = BASELINE_RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        # Swapped as a single reference so readers never see a half-built index
+        self._snapshot: Tuple[Optional[int], Dict[BaselineKey, float]] = (None, {})
+        self._last_check = 0.0
+
+    @staticmethod
+    def _index_profile(index: Dict[BaselineKey, float], venue: Optional[str], profile: dict) -> None:
+        """Add a weekday -> hour -> value profile to the index"""
+        for weekday, hours in profile.items():
+            weekday_idx = WEEKDAY_INDEX.get(weekday)
+            if weekday_idx is None or not isinstance(hours, dict):
+                continue
+            for hour, value in hours.items():
+                try:
+                    index[(venue, weekday_idx, int(hour))] = float(value)
+                except (TypeError, ValueError):
+                    logger.error(f"Invalid baseline value for {weekday} {hour}: {value}")
+
+    def _build_index(self, raw: dict) -> Dict[BaselineKey, float]:
+        """Build the lookup index from parsed baseline JSON"""
+        index: Dict[BaselineKey, float] = {}
+        self._index_profile(index, None, {k: v for k, v in raw.items() if k != 'venues'})
+        # Optional per-venue overrides: {"venues": {url: {weekday: {hour: value}}}}
+        for venue, profile in raw.get('venues', {}).items():
+            if isinstance(profile, dict):
+                self._index_profile(index, venue, profile)
+        return index
+
+    def reload(self) -> bool:
+        """Reload the baseline file if it changed; returns True if a baseline is available"""
+        with self._reload_lock:
+            self._last_check = time.monotonic()
+            current_mtime = self._snapshot[0]
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                logger.error(f"Baseline file not found at {self.path}")
+                return current_mtime is not None
+
+            if mtime == current_mtime:
+                return True
+
+            try:
+                with open(self.path, "r") as f:
+                    raw = json.load(f)
+            except json.JSONDecodeError as e:
+                # Keep serving the previous baseline until the file is fixed
+                logger.error(f"Invalid JSON in baseline file: {e}")
+                return current_mtime is not None
+
+            self._snapshot = (mtime, self._build_index(raw))
+            logger.info(f"📈 Baseline loaded from {self.path} ({len(self._snapshot[1])} entries)")
+            return True
+
+    def ensure_loaded(self) -> bool:
+        """Load the baseline on first use and re-check the file's mtime periodically"""
+        if self._snapshot[0] is None or time.monotonic() - self._last_check >= self.check_interval:
+            return self.reload()
+        return True
+
+    @property
+    def version(self) -> Optional[int]:
+        """Identifies the loaded baseline (file mtime); None until loaded"""
+        return self._snapshot[0]
+
+    def profile(self, venue: Optional[str] = None) -> Dict[Tuple[int, int], float]:
+        """All (weekday index, hour) -> value entries for a venue (None for the global profile)"""
+        self.ensure_loaded()
+        return {(weekday, hour): value
+                for (key_venue, weekday, hour), value in self._snapshot[1].items()
+                if key_venue == venue}
+
+    def venue_overrides(self) -> List[str]:
+        """Venues with their own entries in baseline.json"""
+        self.ensure_loaded()
+        return sorted({key[0] for key in self._snapshot[1] if key[0] is not None})
+
+    def expected(self, venue: Optional[str], weekday: Union[str, int], hour: Union[str, int]) -> Optional[float]:
+        """
+        Expected busyness for a venue at a weekday/hour
+        Falls back to the global profile when the venue has no override
+        """
+        if not self.ensure_loaded():
+            return None
+        index = self._snapshot[1]
+        key_weekday = normalize_weekday(weekday)
+        key_hour = int(hour)
+        value = index.get((venue, key_weekday, key_hour))
+        if value is None:
+            value = index.get((None, key_weekday, key_hour))
+        return value
+
+
+# Global baseline service instance
+baseline_service = BaselineService()
@@ -0,0 +1,252 @@
+"""
+SignalSlice Batch Anomaly Detector
+Scores every venue's reading for a cycle in one vectorized NumPy pass
+"""
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from services.baseline_service import BaselineService, baseline_service, normalize_weekday
+from services.baseline_engine import BaselineEngine, baseline_engine
+from services.baseline_artifact import BaselineArtifact, BaselineArtifactStore, baseline_artifact_store
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS_IN_MATRIX = 7
+HOURS_IN_MATRIX = 25  # hours 0-24 (24 is 12 AM of the previous day)
+
+LIVE_TEXT_FLAGS = ("busier than usual", "as busy as it gets")
+
+# Where a slot's baseline came from, stored per slot as a uint8 code (index into BASELINE_SOURCES)
+SOURCE_GLOBAL = 0
+SOURCE_OVERRIDE = 1
+SOURCE_COMPILED = 2
+SOURCE_LEARNED = 3
+BASELINE_SOURCES = ('global', 'override', 'compiled', 'learned')
+
+# One row per venue reading in the returned anomaly table
+ANOMALY_TABLE_DTYPE = np.dtype([
+    ('restaurant_url', object),
+    ('data_type', object),
+    ('current', np.float64),
+    ('expected', np.float64),
+    ('std', np.float64),
+    ('diff', np.float64),
+    ('zscore', np.float64),
+    ('learned', np.bool_),
+    ('baseline_source', np.uint8),
+    ('threshold_flag', np.bool_),
+    ('zscore_flag', np.bool_),
+    ('live_flag', np.bool_),
+    ('is_anomaly', np.bool_),
+])
+
+
+def anomaly_masks(current: np.ndarray, expected: np.ndarray, zscore: np.ndarray, live_flags: np.ndarray,
+                  threshold: float, z_threshold: Optional[float] = None
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The detection rule shared by live scoring and backtests
+    Returns (scorable, threshold_flag, zscore_flag, is_anomaly) boolean arrays
+    """
+    scorable = ~np.isnan(current) & ~np.isnan(expected)
+    with np.errstate(invalid='ignore'):
+        threshold_flag = scorable & (current - expected >= threshold)
+        if z_threshold is not None:
+            zscore_flag = scorable & (zscore >= z_threshold)
+        else:
+            zscore_flag = np.zeros(current.shape, dtype=np.bool_)
+    is_anomaly = scorable & (threshold_flag | zscore_flag | live_flags)
+    return scorable, threshold_flag, zscore_flag, is_anomaly
+
+
+class BaselineMatrix:
+    """
+    Dense venue x weekday x hour matrices of expected busyness and spread
+    One extra last row (fallback_row) holds the global profile for readings without a known venue
+    """
+
+    def __init__(self, venues: Sequence[str], mean: np.ndarray, std: np.ndarray, source: np.ndarray,
+                 engine_version: int = 0):
+        self.venues = list(venues)
+        self.venue_index = {venue: i for i, venue in enumerate(self.venues)}
+        self.fallback_row = len(self.venues)
+        self.mean = mean
+        self.std = std
+        self.source = source
+        # Learned-baseline version these matrices reflect
+        self.engine_version = engine_version
+
+    def apply_learned(self, slots: Iterable[Tuple[Tuple[str, int, int], Any]], min_samples: int) -> None:
+        """Write learned slots into the matrices in place"""
+        for (venue, weekday, hour), slot in slots:
+            row = self.venue_index.get(venue)
+            if row is None or slot.count < min_samples or not 0 <= hour < HOURS_IN_MATRIX:
+                continue
+            self.mean[row, weekday, hour] = slot.mean
+            self.std[row, weekday, hour] = slot.std
+            self.source[row, weekday, hour] = SOURCE_LEARNED
+
+    @property
+    def learned(self) -> np.ndarray:
+        """Slots backed by the running learned baselines"""
+        return self.source == SOURCE_LEARNED
+
+    @classmethod
+    def build(cls, venues: Sequence[str], service: BaselineService, engine: BaselineEngine,
+              artifact: Optional[BaselineArtifact] = None) -> 'BaselineMatrix':
+        """
+        Build from the global/override baseline, the compiled artifact and the learned baselines
+        Precedence per slot: learned > compiled artifact > venue override > global profile
+        """
+        shape = (len(venues) + 1, WEEKDAYS_IN_MATRIX, HOURS_IN_MATRIX)
+
+        global_profile = np.full((WEEKDAYS_IN_MATRIX, HOURS_IN_MATRIX), np.nan)
+        for (weekday, hour), value in service.profile(None).items():
+            if 0 <= hour < HOURS_IN_MATRIX:
+                global_profile[weekday, hour] = value
+        mean = np.broadcast_to(global_profile, shape).copy()
+        std = np.full(shape, np.nan)
+        source = np.full(shape, SOURCE_GLOBAL, dtype=np.uint8)
+
+        venue_index = {venue: i for i, venue in enumerate(venues)}
+        for venue in service.venue_overrides():
+            row = venue_index.get(venue)
+            if row is None:
+                continue
+            for (weekday, hour), value in service.profile(venue).items():
+                if 0 <= hour < HOURS_IN_MATRIX:
+                    mean[row, weekday, hour] = value
+                    source[row, weekday, hour] = SOURCE_OVERRIDE
+
+        if artifact is not None:
+            rows = [(i, artifact.venue_index[venue]) for i, venue in enumerate(venues) if venue in artifact.venue_index]
+            if rows:
+                matrix_rows, artifact_rows = (np.asarray(r, dtype=np.intp) for r in zip(*rows))
+                compiled = artifact.stat('count')[artifact_rows] >= engine.min_samples
+                mean[matrix_rows] = np.where(compiled, artifact.stat('median')[artifact_rows], mean[matrix_rows])
+                std[matrix_rows] = np.where(compiled, artifact.robust_std(artifact_rows), std[matrix_rows])
+                source[matrix_rows] = np.where(compiled, SOURCE_COMPILED, source[matrix_rows])
+
+        engine_version = engine.version
+        matrix = cls(venues, mean, std, source, engine_version)
+        matrix.apply_learned(engine.slots(), engine.min_samples)
+        return matrix
+
+
+class BatchAnomalyDetector:
+    """Vectorized threshold / z-score / live-flag detector over a cycle's readings"""
+
+    def __init__(self, service: BaselineService = baseline_service, engine: BaselineEngine = baseline_engine,
+                 artifacts: Optional[BaselineArtifactStore] = baseline_artifact_store):
+        self.service = service
+        self.engine = engine
+        self.artifacts = artifacts
+        self._matrix: Optional[BaselineMatrix] = None
+        self._matrix_key: Optional[Tuple[Any, ...]] = None
+        self._lock = threading.Lock()
+
+    def baseline_matrix(self, venues: Iterable[str]) -> BaselineMatrix:
+        """
+        Cached baseline matrix; rebuilt only when venues or the baseline file/artifact change
+        Learned updates (every cycle) are patched in from the engine's change log instead
+        """
+        self.service.ensure_loaded()
+        artifact = self.artifacts.current() if self.artifacts else None
+        venue_set = frozenset(venue for venue in venues if venue)
+        with self._lock:
+            key = (self.service.version, self.engine.generation, self.artifacts.version if self.artifacts else None)
+            matrix = self._matrix
+            if matrix is not None and self._matrix_key == key and venue_set.issubset(matrix.venue_index):
+                engine_version = self.engine.version
+                changes = self.engine.changes_since(matrix.engine_version)
+                if changes is not None:
+                    matrix.apply_learned(changes, self.engine.min_samples)
+                    matrix.engine_version = engine_version
+                    return matrix
+            known = set(matrix.venues) if matrix is not None and self._matrix_key == key else set()
+            matrix = BaselineMatrix.build(sorted(known | venue_set), self.service, self.engine, artifact)
+            self._matrix = matrix
+            self._matrix_key = key
+            return matrix
+
+    @staticmethod
+    def load_readings(readings: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+        """Columnize readings into venue/data type lists plus busyness and live-flag arrays"""
+        venues: List[str] = []
+        data_types: List[str] = []
+        current: List[float] = []
+        live_flags: List[bool] = []
+        invalid = 0
+        for reading in readings:
+            venues.append(reading.get('restaurant_url'))
+            data_types.append(reading.get('data_type') or 'UNKNOWN')
+            value_text = str(reading.get('value') or '').lower()
+            live_flags.append(any(flag in value_text for flag in LIVE_TEXT_FLAGS))
+
+            raw = reading.get('busyness_percent')
+            if raw is None or raw == "" or raw == "None":
+                current.append(np.nan)
+                continue
+            try:
+                current.append(float(int(raw)))
+            except (TypeError, ValueError):
+                invalid += 1
+                current.append(np.nan)
+
+        current_array = np.asarray(current, dtype=np.float64)
+        # Same bounds as validate_busyness_percent, applied to the whole column at once
+        out_of_range = (current_array < 0) | (current_array > 100)
+        invalid += int(np.count_nonzero(out_of_range))
+        current_array[out_of_range] = np.nan
+        if invalid:
+            logger.error(f"Invalid busyness data in {invalid} readings")
+        return venues, data_types, current_array, np.asarray(live_flags, dtype=np.bool_)
+
+    def score(self, readings: Iterable[Dict[str, Any]], weekday: Union[str, int], hour: Union[str, int],
+              threshold: float, z_threshold: Optional[float] = None) -> np.ndarray:
+        """
+        Score all readings for one weekday/hour slot
+        Returns a structured array with ANOMALY_TABLE_DTYPE, one row per reading
+        """
+        venues, data_types, current, live_flags = self.load_readings(readings)
+        table = np.zeros(len(venues), dtype=ANOMALY_TABLE_DTYPE)
+        if not venues:
+            return table
+
+        matrix = self.baseline_matrix(venues)
+        rows = np.fromiter((matrix.venue_index.get(v, matrix.fallback_row) for v in venues),
+                           dtype=np.intp, count=len(venues))
+        weekday_idx = normalize_weekday(weekday)
+        hour_idx = int(hour)
+
+        expected = matrix.mean[rows, weekday_idx, hour_idx]
+        std = matrix.std[rows, weekday_idx, hour_idx]
+        diff = current - expected
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = np.where(std > 0, diff / std, np.nan)
+
+        scorable, threshold_flag, zscore_flag, is_anomaly = anomaly_masks(
+            current, expected, zscore, live_flags, threshold, z_threshold
+        )
+
+        table['restaurant_url'] = venues
+        table['data_type'] = data_types
+        table['current'] = current
+        table['expected'] = expected
+        table['std'] = std
+        table['diff'] = diff
+        table['zscore'] = zscore
+        table['baseline_source'] = matrix.source[rows, weekday_idx, hour_idx]
+        table['learned'] = table['baseline_source'] == SOURCE_LEARNED
+        table['threshold_flag'] = threshold_flag
+        table['zscore_flag'] = zscore_flag
+        table['live_flag'] = live_flags
+        table['is_anomaly'] = is_anomaly
+        return table
+
+
+# Global batch detector instance
+batch_detector = BatchAnomalyDetector()
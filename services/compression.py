@@ -0,0 +1,71 @@
+"""
+SignalSlice Compression
+Negotiated gzip/brotli encoding for HTTP responses and Socket.IO transport options
+"""
+import gzip
+from typing import Any, Dict, Optional
+
+from flask import Response, request
+
+from config import COMPRESSION_CONFIG, SOCKETIO_TRANSPORT_CONFIG, SOCKETIO_SERIALIZER
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(size: int) -> Optional[str]:
+    """Best encoding the client accepts for a body of this size, or None to send it as is"""
+    if size < COMPRESSION_CONFIG['min_size']:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_CONFIG['brotli_quality'])
+    # mtime=0 keeps the output stable, so an encoded body always matches its ETag
+    return gzip.compress(body, compresslevel=COMPRESSION_CONFIG['gzip_level'], mtime=0)
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Each encoding is a different representation, so it gets its own ETag"""
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook: encode compressible, buffered responses the client can decode"""
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300 or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSION_CONFIG['mimetypes']):
+        return response
+
+    body = response.get_data()
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(len(body))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak=weak)
+    return response
+
+
+def socketio_options() -> Dict[str, Any]:
+    """Flask-SocketIO keyword arguments for payload compression and the configured serializer"""
+    options = dict(SOCKETIO_TRANSPORT_CONFIG)
+    options['serializer'] = 'default'
+    if SOCKETIO_SERIALIZER == 'msgpack':
+        try:
+            import msgpack  # noqa: F401 - python-socketio imports it itself; checked here to fall back
+            options['serializer'] = 'msgpack'
+        except ImportError:
+            print("⚠️ SOCKETIO_SERIALIZER=msgpack needs the msgpack package; using JSON")
+    return options
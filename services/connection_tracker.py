@@ -0,0 +1,132 @@
+"""
+SignalSlice Connection Tracker
+Admission control, per-IP connect rate limiting and aggregated connection counts for dashboards
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config import CONNECTION_LIMITS
+from services.metrics import connected_clients, connections_rejected_total
+
+# Rejection reasons, also sent to clients so they can back off
+SERVER_FULL = 'server_full'
+RATE_LIMITED = 'rate_limited'
+
+
+class TokenBucket:
+    """Allows bursts up to capacity, refilled at rate tokens per second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next token is available"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class ConnectionTracker:
+    """
+    Counts live dashboard connections instead of announcing each one
+    admit() enforces the client cap and per-IP connect rate; rollup() summarizes what changed
+    since the previous roll-up, for one periodic activity item instead of one per connect
+    """
+
+    def __init__(self, max_clients: int = CONNECTION_LIMITS['max_clients'],
+                 connects_per_minute: float = CONNECTION_LIMITS['connects_per_minute'],
+                 burst: int = CONNECTION_LIMITS['burst'],
+                 rollup_interval: float = CONNECTION_LIMITS['rollup_interval']):
+        self.max_clients = max_clients
+        self.rate = connects_per_minute / 60.0
+        self.burst = burst
+        self.rollup_interval = rollup_interval
+        self._clients: Dict[str, str] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._connected = self._disconnected = self._rejected = 0
+        self._reported_count = 0
+        self.peak = 0
+        self._rollup_started = False
+
+    @property
+    def count(self) -> int:
+        return len(self._clients)
+
+    def admit(self, sid: str, ip: str) -> Tuple[Optional[str], float]:
+        """Register a connection; returns (None, 0) or (rejection reason, seconds to wait)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(ip)
+            if bucket is None:
+                bucket = self._buckets[ip] = TokenBucket(self.rate, self.burst, now)
+            if not bucket.take(now):
+                self._rejected += 1
+                connections_rejected_total.inc(reason=RATE_LIMITED)
+                return RATE_LIMITED, bucket.retry_after()
+            if len(self._clients) >= self.max_clients:
+                self._rejected += 1
+                connections_rejected_total.inc(reason=SERVER_FULL)
+                return SERVER_FULL, CONNECTION_LIMITS['full_retry_after']
+            self._clients[sid] = ip
+            self._connected += 1
+            self.peak = max(self.peak, len(self._clients))
+            connected_clients.set(len(self._clients))
+            return None, 0.0
+
+    def release(self, sid: str) -> None:
+        with self._lock:
+            if self._clients.pop(sid, None) is not None:
+                self._disconnected += 1
+                connected_clients.set(len(self._clients))
+
+    def _prune_buckets(self, now: float) -> None:
+        """Forget IPs whose bucket has refilled completely; they behave like new IPs anyway"""
+        full_after = self.burst / self.rate if self.rate > 0 else float('inf')
+        for ip in [ip for ip, bucket in self._buckets.items() if now - bucket.updated > full_after]:
+            del self._buckets[ip]
+
+    def rollup(self) -> Optional[Dict[str, int]]:
+        """Changes since the last roll-up, or None if nothing happened"""
+        with self._lock:
+            self._prune_buckets(time.monotonic())
+            if not (self._connected or self._disconnected or self._rejected) and self._reported_count == len(self._clients):
+                return None
+            summary = {
+                'clients': len(self._clients),
+                'connected': self._connected,
+                'disconnected': self._disconnected,
+                'rejected': self._rejected,
+                'peak': self.peak
+            }
+            self._connected = self._disconnected = self._rejected = 0
+            self._reported_count = len(self._clients)
+            return summary
+
+    def claim_rollup_task(self) -> bool:
+        """True exactly once, for the caller that should start the periodic roll-up"""
+        with self._lock:
+            if self._rollup_started:
+                return False
+            self._rollup_started = True
+            return True
+
+
+def format_rollup(summary: Dict[str, int]) -> str:
+    """One-line activity message for a roll-up"""
+    message = f"{summary['clients']} dashboard clients connected (+{summary['connected']} / -{summary['disconnected']}"
+    if summary['rejected']:
+        message += f", {summary['rejected']} rejected"
+    return message + ')'
@@ -0,0 +1,116 @@
+"""
+SignalSlice Emission Coalescer
+Buffers dashboard Socket.IO events and sends them as one batched frame per tick
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import EMISSION_COALESCE_WINDOW
+from services.state_log import StateLog
+from services.metrics import emits_total
+
+# Clients that announce this protocol version (or newer) receive batched frames
+PROTOCOL_VERSION = 2
+BATCH_EVENT = 'event_batch'
+BATCHED_ROOM = 'protocol_batched'
+LEGACY_ROOM = 'protocol_legacy'
+
+# Events that carry a full current value; only the newest one in a batch is sent,
+# and a re-send of the value already buffered keeps the earlier event (with its change info)
+LATEST_ONLY_EVENTS = frozenset({'pizza_index_update', 'gay_bar_index_update', 'scan_stats_update'})
+
+
+def protocol_room(protocol: Any) -> str:
+    """Room for a client given the protocol version it announced (None for legacy clients)"""
+    try:
+        version = int(protocol)
+    except (TypeError, ValueError):
+        return LEGACY_ROOM
+    return BATCHED_ROOM if version >= PROTOCOL_VERSION else LEGACY_ROOM
+
+
+class EmissionCoalescer:
+    """
+    Collects broadcast events for a short window and flushes them in order
+    Batched clients get one 'event_batch' frame; legacy clients get the same events one by one
+    With a state log, every event is logged and carries its sequence number in the batch
+    on_flush sees every sent frame; with forward set, events are handed off instead of buffered
+    """
+
+    def __init__(self, socketio, window: float = EMISSION_COALESCE_WINDOW,
+                 latest_only: frozenset = LATEST_ONLY_EVENTS, state_log: Optional[StateLog] = None,
+                 on_flush: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.socketio = socketio
+        self.window = window
+        self.latest_only = latest_only
+        self.state_log = state_log
+        self.on_flush = on_flush
+        self.forward: Optional[Callable[[str, Any], bool]] = None
+        self._buffer: List[Tuple[str, Any, Optional[int]]] = []
+        self._lock = threading.Lock()
+        self._flusher_started = False
+        self.frames_sent = 0
+        self.events_sent = 0
+
+    def emit(self, event: str, data: Optional[Any] = None) -> None:
+        """Queue a broadcast event for the next flush"""
+        emits_total.inc(event=event)
+        if self.forward is not None and self.forward(event, data):
+            return
+        with self._lock:
+            if event in self.latest_only:
+                previous = next((item[1] for item in self._buffer if item[0] == event), None)
+                if self._same_value(previous, data):
+                    return
+                self._buffer = [item for item in self._buffer if item[0] != event]
+            seq = self.state_log.append(event, data) if self.state_log is not None else None
+            self._buffer.append((event, data, seq))
+            start_flusher = not self._flusher_started
+            self._flusher_started = True
+        if start_flusher:
+            self.socketio.start_background_task(self._flush_loop)
+
+    @staticmethod
+    def _same_value(previous: Any, data: Any) -> bool:
+        """True if data only repeats the 'value' of an already buffered event"""
+        return (isinstance(previous, dict) and isinstance(data, dict) and 'value' in data
+                and previous.get('value') == data['value'])
+
+    def flush(self) -> int:
+        """Send everything buffered so far; returns the number of events sent"""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+
+        frame = {
+            'v': PROTOCOL_VERSION,
+            'events': [{'event': event, 'data': data, 'seq': seq} for event, data, seq in events]
+        }
+        if self.state_log is not None:
+            frame['epoch'] = self.state_log.epoch
+            frame['seq'] = events[-1][2]
+        self.broadcast(frame)
+        if self.on_flush is not None:
+            self.on_flush(frame)
+        return len(events)
+
+    def broadcast(self, frame: Dict[str, Any]) -> None:
+        """Send a batched frame to batched clients and its events one by one to legacy clients"""
+        self.socketio.emit(BATCH_EVENT, frame, to=BATCHED_ROOM)
+        for item in frame['events']:
+            if item['data'] is None:
+                self.socketio.emit(item['event'], to=LEGACY_ROOM)
+            else:
+                self.socketio.emit(item['event'], item['data'], to=LEGACY_ROOM)
+        self.frames_sent += 1
+        self.events_sent += len(frame['events'])
+
+    def _flush_loop(self) -> None:
+        """Background task: flush once per window for the life of the process"""
+        while True:
+            self.socketio.sleep(self.window)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Event flush failed: {e}")
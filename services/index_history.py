@@ -0,0 +1,152 @@
+"""
+SignalSlice Index History
+Time-series store for index updates with pre-aggregated buckets and LTTB downsampling
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import INDEX_HISTORY_CONFIG
+
+Point = Tuple[float, float]
+
+SERIES = ('pizza_index', 'gay_bar_index')
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """
+    Largest-Triangle-Three-Buckets downsampling of (timestamp, value) points
+    Keeps the first and last point and, per bucket, the point forming the largest triangle
+    with the previously kept point and the average of the next bucket
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket (just the last point for the final bucket)
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, count)
+        if next_start >= next_end:
+            next_start, next_end = count - 1, count
+        span = next_end - next_start
+        avg_t = sum(p[0] for p in points[next_start:next_end]) / span
+        avg_v = sum(p[1] for p in points[next_start:next_end]) / span
+
+        a_t, a_v = points[previous]
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            t, v = points[index]
+            area = abs((a_t - avg_t) * (v - a_v) - (a_t - t) * (avg_v - a_v))
+            if area > best_area:
+                best, best_area = index, area
+        sampled.append(points[best])
+        previous = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class IndexHistoryStore:
+    """
+    SQLite store of every index update
+    Raw points are kept for a retention window; each update is also folded into fixed-width
+    average buckets, so long ranges are read from a few hundred pre-aggregated rows
+    """
+
+    def __init__(self, path: str = INDEX_HISTORY_CONFIG['file'],
+                 resolutions: Sequence[int] = INDEX_HISTORY_CONFIG['resolutions'],
+                 raw_retention: float = INDEX_HISTORY_CONFIG['raw_retention_hours'] * 3600):
+        self.path = path
+        self.resolutions = tuple(sorted(resolutions))
+        self.raw_retention = raw_retention
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._initialized:
+            return sqlite3.connect(self.path, timeout=5)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        self._create_tables(connection)
+        return connection
+
+    def _create_tables(self, connection: sqlite3.Connection) -> None:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS index_points (series TEXT, ts REAL, value REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS index_points_series_ts ON index_points (series, ts)")
+        connection.execute("CREATE TABLE IF NOT EXISTS index_buckets (series TEXT, resolution INTEGER, "
+                           "bucket INTEGER, total REAL, count INTEGER, "
+                           "PRIMARY KEY (series, resolution, bucket))")
+        connection.commit()
+        self._initialized = True
+
+    def record(self, series: str, value: float, timestamp: Optional[float] = None) -> None:
+        """Store one index update and fold it into every bucket resolution"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("INSERT INTO index_points (series, ts, value) VALUES (?, ?, ?)",
+                                       (series, timestamp, value))
+                    for resolution in self.resolutions:
+                        connection.execute(
+                            "INSERT INTO index_buckets (series, resolution, bucket, total, count) "
+                            "VALUES (?, ?, ?, ?, 1) ON CONFLICT (series, resolution, bucket) "
+                            "DO UPDATE SET total = total + excluded.total, count = count + 1",
+                            (series, resolution, int(timestamp // resolution), value))
+                    connection.execute("DELETE FROM index_points WHERE series = ? AND ts < ?",
+                                       (series, timestamp - self.raw_retention))
+            finally:
+                connection.close()
+
+    def _resolution_for(self, start: float, end: float, points: int) -> int:
+        """Finest bucket width that keeps the scan near the requested point count (0 = raw points)"""
+        oversample = INDEX_HISTORY_CONFIG['oversample']
+        if end - start <= self.raw_retention and (end - start) / self.resolutions[0] <= points * oversample:
+            return 0
+        for resolution in self.resolutions:
+            if (end - start) / resolution <= points * oversample:
+                return resolution
+        return self.resolutions[-1]
+
+    def query(self, series: str, start: float, end: float, points: int) -> Tuple[List[Point], int]:
+        """(timestamp, value) points for start..end downsampled to at most points; also the resolution used"""
+        resolution = self._resolution_for(start, end, points)
+        connection = self._connect()
+        try:
+            if resolution == 0:
+                rows = connection.execute(
+                    "SELECT ts, value FROM index_points WHERE series = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                    (series, start, end)).fetchall()
+            else:
+                # Buckets are plotted at their midpoint with the average of their updates
+                rows = connection.execute(
+                    "SELECT (bucket + 0.5) * resolution, total / count FROM index_buckets "
+                    "WHERE series = ? AND resolution = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+                    (series, resolution, int(start // resolution), int(end // resolution))).fetchall()
+        finally:
+            connection.close()
+        return lttb(rows, points), resolution
+
+    def history(self, start: float, end: float, points: int,
+                series: Sequence[str] = SERIES) -> Dict[str, Dict[str, object]]:
+        """Downsampled series keyed by name, each with its points and source resolution"""
+        result = {}
+        for name in series:
+            data, resolution = self.query(name, start, end, points)
+            result[name] = {'points': [[round(t, 3), round(v, 3)] for t, v in data], 'resolution': resolution}
+        return result
+
+
+# Global index history instance
+index_history = IndexHistoryStore()
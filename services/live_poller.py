@@ -0,0 +1,141 @@
+"""
+SignalSlice Live Poller
+Re-checks only the live busyness indicators of every venue every few minutes
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright
+
+from config import LIVE_POLL_CONFIG, RESTAURANT_URLS, GAY_BAR_URLS, SCRAPING_CONFIG
+from scraping.scraper_refactored import GoogleMapsScraper
+
+ReadingCallback = Callable[[Dict[str, Any]], None]
+
+
+class LivePoller:
+    """
+    Cheap polling tier between hourly scans
+    Keeps venue pages open and reloads them instead of navigating from scratch,
+    reads only the live widgets, and passes changed live readings to on_reading
+    """
+
+    def __init__(self, on_reading: Optional[ReadingCallback] = None,
+                 is_paused: Optional[Callable[[], bool]] = None,
+                 config: Dict[str, Any] = LIVE_POLL_CONFIG,
+                 venues: Optional[List[Tuple[str, str]]] = None):
+        self.on_reading = on_reading
+        self.is_paused = is_paused
+        self.interval = config['interval']
+        self.page_timeout = config['page_timeout']
+        self.page_settle_time = config['page_settle_time']
+        self.delay_between_urls = config['delay_between_urls']
+        self.max_warm_pages = config['max_warm_pages']
+        if venues is None:
+            venues = [(url, "restaurant") for url in RESTAURANT_URLS] + [(url, "gay_bar") for url in GAY_BAR_URLS]
+        self.venues = venues
+        self.scraper = GoogleMapsScraper()
+        self.running = False
+        self.rounds = 0
+        self._pages: Dict[str, Any] = {}
+        self._last_seen: Dict[str, Tuple[Any, ...]] = {}
+
+    @staticmethod
+    def reading_key(reading: Dict[str, Any]) -> Tuple[Any, ...]:
+        """What makes a live reading different from the previous poll"""
+        return (reading.get('weekday'), reading.get('hour_24'),
+                reading.get('busyness_percent'), reading.get('live_flag'))
+
+    def is_new_reading(self, reading: Dict[str, Any]) -> bool:
+        """True if the venue's live reading changed since the last poll (unchanged ones are not re-fed)"""
+        key = self.reading_key(reading)
+        url = reading['restaurant_url']
+        if self._last_seen.get(url) == key:
+            return False
+        self._last_seen[url] = key
+        return True
+
+    def _page_key(self, url: str) -> str:
+        """Key of the page a venue is polled on: its own warm page, or '' for the shared scratch page"""
+        if url in self._pages or len(self._pages) < self.max_warm_pages:
+            return url
+        # Over budget: venues without a warm page share one scratch page
+        return ''
+
+    async def _get_page(self, browser, url: str, key: str):
+        """Return a warm page for the venue (reloaded) or the page stored under key, navigated to url"""
+        page = self._pages.get(key)
+        if key == url and page is not None and not page.is_closed():
+            await page.reload(timeout=self.page_timeout, wait_until='domcontentloaded')
+            return page
+
+        if page is None or page.is_closed():
+            page = self._pages[key] = await browser.new_page()
+        await page.goto(url, timeout=self.page_timeout, wait_until='domcontentloaded')
+        return page
+
+    async def _discard_page(self, key: str) -> None:
+        """Close and forget the page that failed, a venue's own or the scratch one; the browser stays open"""
+        page = self._pages.pop(key, None)
+        if page is None or page.is_closed():
+            return
+        try:
+            await page.close()
+        except Exception as e:
+            print(f"⚠️ Could not close live poll page {key or '(scratch)'}: {e}")
+
+    async def poll_once(self, browser) -> List[Dict[str, Any]]:
+        """Check every venue's live indicators once; returns the changed live readings"""
+        self.scraper.refresh_time(verbose=False)
+        changed = []
+        for url, venue_type in self.venues:
+            if not self.running or (self.is_paused and self.is_paused()):
+                break
+            key = self._page_key(url)
+            try:
+                page = await self._get_page(browser, url, key)
+                await page.wait_for_timeout(self.page_settle_time)
+                reading = await self.scraper.extract_live_data(page, url, venue_type)
+            except Exception as e:
+                print(f"❌ Live poll error for {url}: {e}")
+                await self._discard_page(key)
+                continue
+
+            if reading and self.is_new_reading(reading):
+                reading['source'] = 'live_poll'
+                changed.append(reading)
+                if self.on_reading:
+                    try:
+                        self.on_reading(reading)
+                    except Exception as e:
+                        print(f"❌ Live reading callback error: {e}")
+            await asyncio.sleep(self.delay_between_urls)
+        self.rounds += 1
+        return changed
+
+    async def run(self) -> None:
+        """Poll until stopped; rounds are skipped while a full scan holds the scraper"""
+        self.running = True
+        print(f"🔴 Live poller starting: {len(self.venues)} venues every {self.interval / 60:.0f} minutes")
+        try:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=SCRAPING_CONFIG['headless'])
+                try:
+                    while self.running:
+                        await asyncio.sleep(self.interval)
+                        if self.is_paused and self.is_paused():
+                            continue
+                        changed = await self.poll_once(browser)
+                        print(f"🔴 Live poll round {self.rounds}: {len(changed)} changed live readings")
+                finally:
+                    self._pages.clear()
+                    await browser.close()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.running = False
+            print("🛑 Live poller stopped")
+
+    def stop(self) -> None:
+        """Ask the polling loop to finish after the current venue"""
+        self.running = False
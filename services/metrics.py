@@ -0,0 +1,313 @@
+"""
+SignalSlice Metrics
+In-process counters, gauges and histograms rendered in the Prometheus text format at /metrics
+"""
+import abc
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import METRICS_CONFIG
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class Metric(abc.ABC):
+    """Common base: a named family of series keyed by label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines of every series, without HELP/TYPE"""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        """Sum over every label set"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Metric):
+    """Value that goes up and down"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class _Timer:
+    """Observes elapsed seconds into a histogram; usable as a context manager or a decorator"""
+
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: 'Histogram', labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(self.histogram, self.labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations over fixed upper bounds
+    Each observation costs one bisect and two additions; cumulative counts are built only when scraped
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = METRICS_CONFIG['latency_buckets']):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels) -> _Timer:
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders them for a Prometheus scrape"""
+
+    def __init__(self, namespace: str = METRICS_CONFIG['namespace']):
+        self.namespace = namespace
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-imported modules get the series they already had
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self._name(name), documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self._name(name), documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = METRICS_CONFIG['latency_buckets']) -> Histogram:
+        return self._register(Histogram(self._name(name), documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(port: int, host: str = '127.0.0.1', registry: 'MetricsRegistry' = None) -> ThreadingHTTPServer:
+    """Serve /metrics from a background thread, for processes without the Flask app (the scanner daemon)"""
+    registry = registry or metrics
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # one line per Prometheus scrape is noise
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+# Scrape pipeline
+page_load_seconds = metrics.histogram('scrape_page_load_seconds', 'Time to navigate to a venue page', ['venue_type', 'venue'])
+settle_seconds = metrics.histogram('scrape_settle_seconds', 'Time spent waiting for a venue page to settle', ['venue_type'])
+extraction_seconds = metrics.histogram('scrape_extraction_seconds', 'Time to extract busyness from a loaded page', ['venue_type', 'source'])
+readings_total = metrics.counter('scrape_readings_total', 'Venue readings produced, by data type', ['data_type'])
+scrape_errors_total = metrics.counter('scrape_errors_total', 'Venues that failed to scrape', ['venue_type'])
+validation_errors_total = metrics.counter('validation_errors_total', 'Scraped values rejected by validation', ['stage'])
+
+# Detection and cycles
+detection_seconds = metrics.histogram('detection_seconds', 'Time to run anomaly detection over a scan batch')
+anomalies_total = metrics.counter('anomalies_detected_total', 'Scan cycles that found an anomaly')
+cycle_seconds = metrics.histogram('scan_cycle_seconds', 'Duration of a full scan cycle',
+                                  buckets=METRICS_CONFIG['cycle_buckets'])
+cycles_total = metrics.counter('scan_cycles_total', 'Completed scan cycles, by outcome', ['outcome'])
+cycle_overruns_total = metrics.counter('scan_cycle_overruns_total', 'Scan cycles that ran past the hour they sampled')
+cycle_emits = metrics.histogram('scan_cycle_emits', 'Dashboard events emitted during one scan cycle',
+                                buckets=METRICS_CONFIG['emit_buckets'])
+
+# Dashboard delivery
+emits_total = metrics.counter('emits_total', 'Dashboard events emitted, by event name', ['event'])
+connected_clients = metrics.gauge('connected_clients', 'Dashboard clients currently connected to this process')
+connections_rejected_total = metrics.counter('connections_rejected_total', 'Dashboard connections refused', ['reason'])
+socket_events_total = metrics.counter('socket_events_total', 'Socket.IO events handled, by event name', ['event'])
+
+
+def instrument_cycle(func):
+    """
+    Decorator for scan cycle coroutines: records duration, outcome (a None result is a failed cycle),
+    events emitted while it ran, detected anomalies and cycles that ran into the next hour
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started, started_hour = time.perf_counter(), time.time() // 3600
+        emits_before = emits_total.total()
+        result = None
+        try:
+            result = await func(*args, **kwargs)
+            return result
+        finally:
+            cycle_seconds.observe(time.perf_counter() - started)
+            cycles_total.inc(outcome='error' if result is None else 'ok')
+            cycle_emits.observe(emits_total.total() - emits_before)
+            if result and result.get('anomaly_detected'):
+                anomalies_total.inc()
+            if time.time() // 3600 != started_hour:
+                cycle_overruns_total.inc()
+    return wrapper
@@ -0,0 +1,156 @@
+"""
+SignalSlice Online Anomaly Detector
+Scores readings as they stream out of the scraper using EWMA and CUSUM state
+"""
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from config import ONLINE_DETECTOR_CONFIG, TIMEZONE
+from services.baseline_service import baseline_service, normalize_weekday, baseline_hour
+from services.baseline_engine import baseline_engine
+from services.baseline_artifact import MAD_TO_STD, baseline_artifact_store
+from services.batch_detector import LIVE_TEXT_FLAGS
+
+logger = logging.getLogger(__name__)
+
+SlotKey = Tuple[str, int, int]
+# Returns (mean, variance) to start a new slot from, or None to start from the first reading
+SeedFunction = Callable[[str, int, int], Optional[Tuple[float, float]]]
+
+
+def baseline_seed(venue: str, weekday: int, hour: int) -> Optional[Tuple[float, float]]:
+    """Seed a slot from the learned baseline, else the compiled artifact, else the global baseline"""
+    slot = baseline_engine.stats(venue, weekday, hour)
+    if slot is not None and slot.count >= baseline_engine.min_samples:
+        return slot.mean, slot.variance
+    artifact = baseline_artifact_store.current()
+    compiled = artifact.lookup(venue, weekday, hour) if artifact is not None else None
+    if compiled is not None and compiled['count'] >= baseline_engine.min_samples:
+        return compiled['median'], (compiled['mad'] * MAD_TO_STD) ** 2
+    expected = baseline_service.expected(venue, weekday, hour)
+    if expected is not None:
+        # No spread is known for the global profile: size it so the z-score first alarms at the
+        # hourly check's fixed threshold instead of at z_threshold * min_std points
+        std = ONLINE_DETECTOR_CONFIG['global_seed_margin'] / ONLINE_DETECTOR_CONFIG['z_threshold']
+        return expected, std ** 2
+    return None
+
+
+class SlotState:
+    """O(1) streaming state for one venue/weekday/hour slot"""
+
+    __slots__ = ('count', 'mean', 'var', 'cusum')
+
+    def __init__(self, mean: float = 0.0, var: float = 0.0, count: int = 0):
+        self.count = count
+        self.mean = mean
+        self.var = var
+        self.cusum = 0.0
+
+
+class OnlineAnomalyDetector:
+    """EWMA mean/variance with a one-sided CUSUM drift statistic per slot"""
+
+    def __init__(self, config: Dict[str, float] = ONLINE_DETECTOR_CONFIG, seed: Optional[SeedFunction] = baseline_seed):
+        self.alpha = config['alpha']
+        self.z_threshold = config['z_threshold']
+        self.cusum_k = config['cusum_k']
+        self.cusum_h = config['cusum_h']
+        self.min_std = config['min_std']
+        self.seed = seed
+        self._slots: Dict[SlotKey, SlotState] = {}
+        self._lock = threading.Lock()
+
+    def _get_slot(self, key: SlotKey) -> SlotState:
+        """Return the slot state, seeding it from the baselines on first use"""
+        slot = self._slots.get(key)
+        if slot is None:
+            seeded = self.seed(*key) if self.seed else None
+            slot = SlotState(seeded[0], seeded[1], 1) if seeded else SlotState()
+            self._slots[key] = slot
+        return slot
+
+    def observe(self, venue: str, weekday: Union[str, int], hour: Union[str, int], value: float,
+                live_flag: bool = False, learn: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Fold one reading into its slot and return an anomaly dict if it alarms
+        The reading is scored against the state before it is folded in; learn=False only scores it
+        """
+        key = (venue, normalize_weekday(weekday), int(hour))
+        with self._lock:
+            slot = self._get_slot(key)
+            reasons: List[str] = []
+            zscore = None
+            expected = slot.mean if slot.count else None
+
+            cusum = slot.cusum
+            if slot.count:
+                std = max(math.sqrt(slot.var), self.min_std)
+                zscore = (value - slot.mean) / std
+                cusum = max(0.0, slot.cusum + zscore - self.cusum_k)
+                if zscore >= self.z_threshold:
+                    reasons.append('zscore')
+                if cusum >= self.cusum_h:
+                    reasons.append('cusum')
+            if live_flag:
+                reasons.append('live_flag')
+            if learn:
+                slot.cusum = cusum
+                # EWMA update of mean and variance
+                if slot.count:
+                    diff = value - slot.mean
+                    increment = self.alpha * diff
+                    slot.mean += increment
+                    slot.var = (1 - self.alpha) * (slot.var + diff * increment)
+                else:
+                    slot.mean = value
+                    slot.var = 0.0
+                slot.count += 1
+                if reasons:
+                    # Restart drift accumulation once an alarm has been raised
+                    slot.cusum = 0.0
+
+        if not reasons:
+            return None
+        return {
+            'restaurant_url': venue,
+            'weekday': weekday,
+            'hour': key[2],
+            'current': value,
+            'expected': expected,
+            'zscore': zscore,
+            'cusum': cusum,
+            'reasons': reasons,
+            'detected_at': datetime.now(TIMEZONE).isoformat()
+        }
+
+    def observe_reading(self, reading: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Score a scraper result dict as it arrives; returns an anomaly dict or None"""
+        value = reading.get('busyness_percent')
+        if value is None or reading.get('weekday') is None or reading.get('hour_24') is None:
+            return None
+        value_text = str(reading.get('value') or '').lower()
+        live_flag = reading.get('live_flag') is True or any(flag in value_text for flag in LIVE_TEXT_FLAGS)
+        # Live polls repeat every few minutes; folding them in would let one hour's readings
+        # dominate the slot, so only the hourly scan's reading updates the EWMA/CUSUM state
+        learn = reading.get('source') != 'live_poll'
+        try:
+            anomaly = self.observe(reading['restaurant_url'], reading['weekday'],
+                                   baseline_hour(reading['hour_24']), float(value), live_flag, learn)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping streamed reading: {e}")
+            return None
+        if anomaly:
+            anomaly['data_type'] = reading.get('data_type', 'UNKNOWN')
+            anomaly['venue_type'] = reading.get('venue_type')
+        return anomaly
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+# Global online detector instance
+online_detector = OnlineAnomalyDetector()
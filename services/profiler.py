@@ -0,0 +1,215 @@
+"""
+SignalSlice Profiler
+On-demand sampling profiler for live scan cycles, writing flamegraph-compatible folded stacks
+"""
+import collections
+import functools
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import PROFILER_CONFIG
+from services.scan_executor import THREAD_NAME
+
+# Profiler states
+IDLE = 'idle'
+ARMED = 'armed'
+RUNNING = 'running'
+
+
+def fold_stack(frame) -> str:
+    """Root-first 'file:function;file:function' line for one sampled stack"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack every interval from a separate thread via sys._current_frames()
+    Nothing is hooked into the profiled thread, so it runs at full speed; the cost is one
+    stack walk per sample on the sampler thread
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILER_CONFIG['interval']):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: "collections.Counter[str]" = collections.Counter()
+        self.samples = 0
+        self.started = time.time()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self) -> 'SamplingProfiler':
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.counts[fold_stack(frame)] += 1
+            self.samples += 1
+
+    def stop(self) -> "collections.Counter[str]":
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.counts
+
+
+def green_threads() -> bool:
+    """
+    Whether eventlet has monkey-patched threading (gunicorn's eventlet worker): thread idents are
+    then greenlet ids that sys._current_frames() never reports, so sampling would record nothing
+    """
+    patcher = sys.modules.get('eventlet.patcher')
+    return patcher is not None and patcher.is_monkey_patched('thread')
+
+
+def ensure_os_threads() -> None:
+    if green_threads():
+        raise RuntimeError("In-process profiling does not work under eventlet green threads; "
+                           "profile the scanner daemon instead (SCANNER_MODE=external)")
+
+
+def find_thread(name: str = THREAD_NAME) -> Optional[int]:
+    """Ident of the live thread with this name (the scanner loop by default)"""
+    return next((thread.ident for thread in threading.enumerate() if thread.name == name), None)
+
+
+class OnDemandProfiler:
+    """
+    Profiles the scanner thread only when asked: for the next scan cycle (arm_next_cycle, SIGUSR1)
+    or for a time window (start_window). One session at a time; each writes <directory>/*.folded,
+    one 'frame;frame;frame count' line per distinct stack, for flamegraph.pl or speedscope
+    """
+
+    def __init__(self, directory: str = PROFILER_CONFIG['directory'],
+                 interval: float = PROFILER_CONFIG['interval'], keep: int = PROFILER_CONFIG['keep']):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._armed = False
+        self._session: Optional[SamplingProfiler] = None
+        self._mode: Optional[str] = None
+        self.last_profile: Optional[Dict[str, Any]] = None
+
+    @property
+    def state(self) -> str:
+        if self._session is not None:
+            return RUNNING
+        return ARMED if self._armed else IDLE
+
+    def status(self) -> Dict[str, Any]:
+        return {'state': self.state, 'mode': self._mode, 'last_profile': self.last_profile}
+
+    def arm_next_cycle(self) -> Dict[str, Any]:
+        """Profile the next scan cycle from start to finish"""
+        ensure_os_threads()
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError("A profile is already being recorded")
+            self._armed = True
+            self._mode = 'cycle'
+        print("🔬 Profiler armed for the next scan cycle")
+        return self.status()
+
+    def start_window(self, seconds: float, thread_id: Optional[int] = None) -> Dict[str, Any]:
+        """Profile the scanner thread for the next `seconds`, whatever it is doing"""
+        ensure_os_threads()
+        thread_id = thread_id or find_thread()
+        if thread_id is None:
+            raise RuntimeError("The scanner is not running in this process")
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError("A profile is already being recorded")
+            self._armed = False
+            self._mode = 'window'
+            session = self._session = SamplingProfiler(thread_id, self.interval).start()
+        timer = threading.Timer(seconds, self._finish, args=(session,))
+        timer.daemon = True
+        timer.start()
+        print(f"🔬 Profiling the scanner thread for {seconds:.0f}s")
+        return self.status()
+
+    def around_cycle(self, func):
+        """Decorator for scan cycle coroutines: records the cycle if the profiler is armed"""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            session = None
+            with self._lock:
+                if self._armed and self._session is None:
+                    self._armed = False
+                    # The cycle coroutine runs on the scanner loop thread; sample that thread
+                    session = self._session = SamplingProfiler(threading.get_ident(), self.interval).start()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                if session is not None:
+                    self._finish(session)
+        return wrapper
+
+    def _finish(self, session: SamplingProfiler) -> Optional[str]:
+        counts = session.stop()
+        with self._lock:
+            if self._session is not session:
+                return None
+            self._session = None
+            mode, self._mode = self._mode, None
+        duration = time.time() - session.started
+        name = f"scan-{datetime.fromtimestamp(session.started).strftime('%Y%m%d-%H%M%S')}-{mode}.folded"
+        path = os.path.join(self.directory, name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            self._prune()
+        except OSError as e:
+            print(f"❌ Could not write profile {path}: {e}")
+            return None
+        self.last_profile = {'path': path, 'mode': mode, 'samples': session.samples,
+                             'duration': round(duration, 3), 'stacks': len(counts)}
+        print(f"🔬 Profile written to {path} ({session.samples} samples over {duration:.1f}s)")
+        return path
+
+    def _prune(self) -> None:
+        """Keep only the newest profiles"""
+        profiles = sorted((name for name in os.listdir(self.directory) if name.endswith('.folded')),
+                          key=lambda name: os.path.getmtime(os.path.join(self.directory, name)))
+        for name in profiles[:-self.keep] if self.keep > 0 else []:
+            os.remove(os.path.join(self.directory, name))
+
+
+def install_signal_handler(profiler: 'OnDemandProfiler', signum: int = getattr(signal, 'SIGUSR1', 0)) -> bool:
+    """`kill -USR1 <pid>` arms the profiler for the next cycle; call from the main thread"""
+    if not signum or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def handle(*_):
+        # Arm from a thread: the handler may interrupt code that holds the profiler lock
+        threading.Thread(target=_arm_quietly, args=(profiler,), daemon=True).start()
+
+    signal.signal(signum, handle)
+    return True
+
+
+def _arm_quietly(profiler: 'OnDemandProfiler') -> None:
+    try:
+        profiler.arm_next_cycle()
+    except RuntimeError as e:
+        print(f"⚠️ {e}")
+
+
+# Global profiler instance
+profiler = OnDemandProfiler()
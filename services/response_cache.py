@@ -0,0 +1,119 @@
+"""
+SignalSlice Response Cache
+Serializes API responses once per state version and answers revalidations with 304
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from flask import Response, request
+
+from config import API_CACHE_MAX_AGE
+from services.compression import compress, encoded_etag, negotiate_encoding
+
+
+class VersionedState(dict):
+    """
+    Dict that advances a version on every top-level write
+    Each key also gets its own version so responses built from a few keys survive unrelated writes
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+        self._key_versions: Dict[Hashable, int] = {}
+        # The scanner thread and request handlers write concurrently; a lost increment would keep stale bodies cached
+        self._version_lock = threading.Lock()
+
+    def _bump(self, key: Hashable) -> None:
+        with self._version_lock:
+            self.version += 1
+            self._key_versions[key] = self.version
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._bump(key)
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self._bump(key)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def touch(self, key: Hashable) -> None:
+        """Mark a key as changed after mutating its value in place"""
+        self._bump(key)
+
+    def key_version(self, *keys: Hashable) -> int:
+        """Newest version among the given keys"""
+        return max((self._key_versions.get(key, 0) for key in keys), default=0)
+
+
+class CachedResponse:
+    """One serialized response body, its strong ETag and its compressed variants"""
+
+    __slots__ = ('version', 'body', 'etag', '_encoded')
+
+    def __init__(self, version: Hashable, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """Body in the given content encoding, compressed at most once per version"""
+        if encoding is None:
+            return self.body
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+class ResponseCache:
+    """Per-endpoint cache of JSON bodies keyed by the state version they were built from"""
+
+    def __init__(self, max_age: int = API_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self._entries: Dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: Hashable, builder: Callable[[], Any]) -> CachedResponse:
+        """Cached body for key at version, building and serializing it only when the version moved"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            self.hits += 1
+            return entry
+
+        body = json.dumps(builder(), separators=(',', ':'), sort_keys=True, default=str).encode('utf-8')
+        entry = CachedResponse(version, body)
+        with self._lock:
+            self._entries[key] = entry
+            self.misses += 1
+        return entry
+
+    def respond(self, key: str, version: Hashable, builder: Callable[[], Any]) -> Response:
+        """JSON response with a strong ETag; a matching If-None-Match gets 304 Not Modified"""
+        entry = self.get(key, version, builder)
+        encoding = negotiate_encoding(len(entry.body))
+        response = Response(entry.encoded(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(encoded_etag(entry.etag, encoding))
+        # Shared caches may reuse the body briefly; after that everyone revalidates with the ETag
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, must-revalidate'
+        return response.make_conditional(request)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one cached endpoint, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
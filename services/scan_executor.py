@@ -0,0 +1,100 @@
+"""
+SignalSlice Scan Executor
+Runs every scan on one event loop thread, joining concurrent requests and reusing fresh results
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from config import SCAN_EXECUTOR_CONFIG
+
+# Name of the loop thread every scan runs on (the profiler samples it)
+THREAD_NAME = 'scan-executor'
+
+# Executor states
+IDLE = 'idle'
+RUNNING = 'running'
+
+# How a scan request was served
+STARTED = 'started'
+JOINED = 'joined'
+FRESH = 'fresh'
+
+
+class ScanExecutor:
+    """
+    Owns the scanner's event loop thread; the hourly schedule, API triggers and socket requests
+    all go through submit(). The idle -> running transition happens under one lock, so requests
+    racing in cannot start two scrapes: later ones join the future of the scan in flight.
+    A scan that completed within the freshness window is handed back instead of scraping again;
+    a cycle that returns None (it failed) is never reused.
+    """
+
+    def __init__(self, scan: Callable[[], Awaitable[Any]],
+                 freshness_window: float = SCAN_EXECUTOR_CONFIG['freshness_window']):
+        self.scan = scan
+        self.freshness_window = freshness_window
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._state = IDLE
+        self._inflight: Optional[concurrent.futures.Future] = None
+        self._last: Optional[concurrent.futures.Future] = None
+        self._completed_at = 0.0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def last_age(self) -> Optional[float]:
+        """Seconds since the last successful scan completed, or None if there was none"""
+        return None if self._last is None else time.monotonic() - self._completed_at
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread on first use; later calls return the same loop"""
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self._run_loop, name=THREAD_NAME, daemon=True).start()
+            return self.loop
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def spawn(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Run a long-lived coroutine (hourly schedule, live poller) on the scanner loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def submit(self, max_age: Optional[float] = None) -> Tuple[concurrent.futures.Future, str]:
+        """
+        Request a scan from any thread; returns its future and how the request was served:
+        STARTED a new scan, JOINED the one in flight, or FRESH with a result at most max_age seconds old
+        """
+        loop = self.start()
+        max_age = self.freshness_window if max_age is None else max_age
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight, JOINED
+            if self._last is not None and time.monotonic() - self._completed_at < max_age:
+                return self._last, FRESH
+            self._state = RUNNING
+            future = self._inflight = asyncio.run_coroutine_threadsafe(self.scan(), loop)
+        future.add_done_callback(self._finished)
+        return future, STARTED
+
+    async def run(self, max_age: Optional[float] = None) -> Any:
+        """submit() for coroutines already on the scanner loop; waits for the result"""
+        future, _ = self.submit(max_age)
+        # Shielded: cancelling one waiter (e.g. stopping the schedule) must not cancel a shared scan
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _finished(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            if self._inflight is future:
+                self._inflight = None
+                self._state = IDLE
+            if not future.cancelled() and future.exception() is None and future.result() is not None:
+                self._last = future
+                self._completed_at = time.monotonic()
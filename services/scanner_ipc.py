@@ -0,0 +1,262 @@
+"""
+SignalSlice Scanner IPC
+Newline-delimited JSON over a Unix socket between the scanner daemon and the web processes
+"""
+import json
+import os
+import queue
+import socket
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from config import SCANNER_IPC_CONFIG
+from services.metrics import emits_total
+
+Message = Dict[str, Any]
+
+
+def encode_message(message: Message) -> bytes:
+    """One message per line; datetimes and other non-JSON values go out as strings"""
+    return (json.dumps(message, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+
+
+class _ClientWriter:
+    """
+    Outbox of one web process: a bounded queue drained by its own thread
+    A web process that stops reading only stalls its own writer, never the scanner thread publishing
+    """
+
+    def __init__(self, client: socket.socket, max_pending: int, on_failed: Callable[[socket.socket], None]):
+        self.client = client
+        self.on_failed = on_failed
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_pending)
+        threading.Thread(target=self._run, name='scanner-ipc-writer', daemon=True).start()
+
+    def put(self, payload: bytes) -> bool:
+        """Queue one encoded message; False when the client is too far behind"""
+        try:
+            self._queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self) -> None:
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # the writer is stuck in sendall; closing the socket ends it
+
+    def _run(self) -> None:
+        while True:
+            payload = self._queue.get()
+            if payload is None:
+                return
+            try:
+                self.client.sendall(payload)
+            except OSError:
+                self.on_failed(self.client)
+                return
+
+
+class ScannerIpcServer:
+    """
+    Scanner side: accepts web processes on a Unix socket, fans state changes out to all of them
+    and hands their commands ('manual_scan', 'start_scanner', 'stop_scanner') to on_command
+    """
+
+    def __init__(self, path: str, on_command: Callable[[Message], None], snapshot: Callable[[], Dict[str, Any]],
+                 max_pending: int = SCANNER_IPC_CONFIG['max_pending']):
+        self.path = path
+        self.on_command = on_command
+        self.snapshot = snapshot
+        self.max_pending = max_pending
+        self._clients: Dict[socket.socket, _ClientWriter] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[socket.socket] = None
+
+    def start(self) -> None:
+        """Bind the socket (replacing a stale one) and accept clients in the background"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"🔌 Scanner IPC listening on {self.path}")
+
+    def _accept_loop(self) -> None:
+        while self._server is not None:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            writer = _ClientWriter(client, self.max_pending, self._drop)
+            # A new web process starts from the full current state
+            writer.put(encode_message({'type': 'state', 'state': self.snapshot()}))
+            with self._lock:
+                self._clients[client] = writer
+            threading.Thread(target=self._read_loop, args=(client,), daemon=True).start()
+
+    def _read_loop(self, client: socket.socket) -> None:
+        try:
+            with client.makefile('r', encoding='utf-8') as lines:
+                for line in lines:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    if message.get('type') == 'command':
+                        self.on_command(message)
+        except OSError:
+            pass
+        finally:
+            self._drop(client)
+
+    def _drop(self, client: socket.socket) -> None:
+        with self._lock:
+            writer = self._clients.pop(client, None)
+        if writer is not None:
+            writer.close()
+        try:
+            # Unblocks a writer stuck in sendall before the descriptor goes away
+            client.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            client.close()
+        except OSError:
+            pass
+
+    def publish(self, message: Message) -> int:
+        """Queue a message for every connected web process; returns how many accepted it"""
+        payload = encode_message(message)
+        with self._lock:
+            writers = list(self._clients.values())
+        queued = 0
+        for writer in writers:
+            if writer.put(payload):
+                queued += 1
+            else:
+                print(f"⚠️ Dropping a web process {self.max_pending} messages behind; it will reconnect and resync")
+                self._drop(writer.client)
+        return queued
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            self._drop(client)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class IpcEmitter:
+    """Drop-in for the Socket.IO emitter inside the daemon: every event carries the state it produced"""
+
+    def __init__(self, server: ScannerIpcServer):
+        self.server = server
+
+    def emit(self, event: str, data: Optional[Any] = None) -> None:
+        emits_total.inc(event=event)
+        self.server.publish({'type': 'event', 'event': event, 'data': data, 'state': self.server.snapshot()})
+
+    def publish_state(self) -> None:
+        """Push the current state without an event (e.g. after a command changed a flag)"""
+        self.server.publish({'type': 'state', 'state': self.server.snapshot()})
+
+
+class ScannerLink:
+    """
+    Web side: keeps a connection to the scanner daemon, reconnecting after daemon restarts,
+    and passes every message it publishes to on_message
+    """
+
+    def __init__(self, path: str, on_message: Callable[[Message], None],
+                 reconnect_delay: float = SCANNER_IPC_CONFIG['reconnect_delay']):
+        self.path = path
+        self.on_message = on_message
+        self.reconnect_delay = reconnect_delay
+        self._socket: Optional[socket.socket] = None
+        self._stopped = threading.Event()
+        self._connected = threading.Event()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+        return thread
+
+    def wait_connected(self, timeout: float) -> bool:
+        return self._connected.wait(timeout)
+
+    def _run(self) -> None:
+        announced_wait = False
+        while not self._stopped.is_set():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                if not announced_wait:
+                    print(f"⏳ Waiting for scanner daemon at {self.path}")
+                    announced_wait = True
+                self._stopped.wait(self.reconnect_delay)
+                continue
+
+            announced_wait = False
+            self._socket = sock
+            self._connected.set()
+            print(f"🔗 Connected to scanner daemon at {self.path}")
+            try:
+                with sock.makefile('r', encoding='utf-8') as lines:
+                    for line in lines:
+                        try:
+                            message = json.loads(line)
+                        except ValueError:
+                            continue
+                        try:
+                            self.on_message(message)
+                        except Exception as e:
+                            print(f"❌ Scanner message handling failed: {e}")
+            except OSError:
+                pass
+            finally:
+                self._connected.clear()
+                self._socket = None
+                sock.close()
+            if not self._stopped.is_set():
+                print("⚠️ Lost connection to scanner daemon; reconnecting")
+                self._stopped.wait(self.reconnect_delay)
+
+    def send_command(self, command: str, **params) -> bool:
+        """Ask the daemon to run a command; False when it is not reachable"""
+        sock = self._socket
+        if sock is None:
+            return False
+        try:
+            sock.sendall(encode_message(dict(params, type='command', command=command)))
+            return True
+        except OSError:
+            return False
+
+    def stop(self) -> None:
+        self._stopped.set()
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -3,32 +3,47 @@ SignalSlice Scanner Service
 Handles all scanner-related operations
 """
 import asyncio
-import threading
+import concurrent.futures
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from config import (
     TIMEZONE, SCANNER_INITIAL_DELAY, SCANNER_RETRY_DELAY, 
-    SCANNER_HOUR_BUFFER, INDEX_CONFIG
+    SCANNER_HOUR_BUFFER, INDEX_CONFIG, LIVE_POLL_CONFIG
 )
 from state_manager import state_manager
 from scraping.gmapsScrape import scrape_current_hour
 from script.anomalyDetect import check_current_anomalies
+from services.baseline_engine import baseline_engine
+from services.online_detector import online_detector
+from services.live_poller import LivePoller
+from services.emission_coalescer import EmissionCoalescer
+from services.state_log import StateLog
+from services.index_history import index_history
+from services.scan_executor import ScanExecutor
+from services.metrics import instrument_cycle
+from services.tracing import tracer
+from services.profiler import profiler
 
 
 class ScannerService:
     """Service for managing scanner operations"""
     
-    def __init__(self, socketio=None):
+    def __init__(self, socketio=None, emitter=None):
         self.socketio = socketio
-        self.scanner_loop = None
+        self.state_log = StateLog()
+        # Without Socket.IO (e.g. in the scanner daemon) a custom emitter can carry the updates
+        self.emitter = emitter or (EmissionCoalescer(socketio, state_log=self.state_log) if socketio else None)
+        # Every scan runs on the executor's loop thread, one at a time
+        self.executor = ScanExecutor(self.run_scanner_cycle)
         self.scanner_task = None
-        self.scanner_thread = None
+        self.live_poller = None
+        self.live_poller_task = None
     
     def emit_update(self, event: str, data: Any) -> None:
-        """Emit update via WebSocket if socketio is available"""
-        if self.socketio:
-            self.socketio.emit(event, data)
+        """Queue a batched WebSocket update if socketio is available"""
+        if self.emitter:
+            self.emitter.emit(event, data)
     
     def add_activity(self, activity_type: str, message: str, level: str = 'normal') -> None:
         """Add activity and emit update"""
@@ -40,19 +55,50 @@ class ScannerService:
         """Update pizza index and emit update"""
         data = state_manager.update_pizza_index(new_value, change_percent)
         self.emit_update('pizza_index_update', data)
+        self.record_index_history('pizza_index', new_value)
         print(f"DEBUG: Pizza index updated to {new_value:.2f}")
     
     def update_gay_bar_index(self, new_value: float, change_percent: float = 0) -> None:
         """Update gay bar index and emit update"""
         data = state_manager.update_gay_bar_index(new_value, change_percent)
         self.emit_update('gay_bar_index_update', data)
+        self.record_index_history('gay_bar_index', new_value)
         print(f"DEBUG: Gay bar index updated to {new_value:.2f}")
     
+    @staticmethod
+    def record_index_history(series: str, value: float) -> None:
+        """Persist an index update for the history API without letting storage errors interrupt a scan"""
+        try:
+            index_history.record(series, value)
+        except Exception as e:
+            print(f"ERROR writing index history: {e}")
+    
     def update_scan_stats(self) -> None:
         """Update scan statistics and emit update"""
         stats = state_manager.increment_scan_count()
         self.emit_update('scan_stats_update', stats)
     
+    def handle_streamed_reading(self, reading: Dict[str, Any]) -> None:
+        """Score a venue reading as soon as the scraper produces it and alert immediately"""
+        try:
+            anomaly = online_detector.observe_reading(reading)
+        except Exception as e:
+            print(f"ERROR in streaming detection: {e}")
+            return
+        if not anomaly:
+            return
+        
+        reasons = ', '.join(anomaly['reasons'])
+        message = f"{anomaly['restaurant_url']} at {anomaly['current']:.0f}% ({reasons})"
+        self.add_activity('ANOMALY', f'🚨 Streaming alert: {message}', 'critical')
+        self.emit_update('anomaly_detected', {
+            'title': 'STREAMING ALERT',
+            'message': message,
+            'timestamp': datetime.now(TIMEZONE).strftime('%H:%M:%S'),
+            'anomaly_count': state_manager.get('anomaly_count', 0),
+            'source': reading.get('source', 'stream')
+        })
+    
     @staticmethod
     def get_next_hour_start() -> float:
         """Calculate seconds until the next hour starts"""
@@ -135,8 +181,11 @@ class ScannerService:
             
             self.update_pizza_index(new_index, change_percent)
     
-    async def run_scanner_cycle(self) -> None:
-        """Run one complete scanner cycle"""
+    @instrument_cycle
+    @tracer.traced('scan_cycle')
+    @profiler.around_cycle
+    async def run_scanner_cycle(self) -> Optional[Dict[str, Any]]:
+        """Run one complete scanner cycle; returns a summary of the result (None on failure)"""
         try:
             state_manager.set_scanning_status(True)
             self.emit_update('scanning_start', {})
@@ -149,8 +198,11 @@ class ScannerService:
             self.add_activity('SCRAPE', f'📅 Looking for TODAY\'s ({current_time.strftime("%A")}) data at hour {current_time.hour}', 'normal')
             self.add_activity('SCRAPE', '🎯 Priority: LIVE data > Historical data > No data', 'normal')
             
+            scraped_data = []
+            scrape_failed = False
             try:
-                scraped_data = await scrape_current_hour()
+                with tracer.span('scrape'):
+                    scraped_data = await scrape_current_hour(on_reading=self.handle_streamed_reading)
                 print(f"DEBUG: Scraped {len(scraped_data)} data points")
                 
                 self.add_activity('SCRAPE', '✅ Current hour data saved successfully', 'success')
@@ -160,6 +212,7 @@ class ScannerService:
                 await self.process_scraped_data(scraped_data)
                 
             except Exception as e:
+                scrape_failed = True
                 self.add_activity('ERROR', f'❌ Scraping failed: {str(e)}', 'critical')
                 print(f"ERROR in scraping: {e}")
                 import traceback
@@ -172,15 +225,23 @@ class ScannerService:
             self.add_activity('ANALYZE', f'📅 Checking anomalies for {current_time.strftime("%A")} at {current_time.hour}:00', 'normal')
             
             # Run anomaly detection
-            anomalies_found = check_current_anomalies()
+            with tracer.span('anomaly_check', readings=len(scraped_data)):
+                anomalies_found = check_current_anomalies(scraped_data)
+            
+            # Fold this cycle's readings into the per-venue learned baselines
+            try:
+                baseline_engine.update_from_cycle(scraped_data)
+            except Exception as e:
+                print(f"ERROR in baseline learning: {e}")
             
             # Update statistics and handle anomalies
             self.update_scan_stats()
-            await self.handle_anomaly_detection(anomalies_found)
-            
-            # Complete scan
-            state_manager.set_scanning_status(False)
-            self.emit_update('scanning_complete', {})
+            with tracer.span('emit'):
+                await self.handle_anomaly_detection(anomalies_found)
+                
+                # Complete scan
+                state_manager.set_scanning_status(False)
+                self.emit_update('scanning_complete', {})
             
             completion_time = datetime.now(TIMEZONE)
             self.add_activity('SYSTEM', f'✅ Scan completed at {completion_time.strftime("%H:%M:%S EST")}', 'success')
@@ -189,12 +250,22 @@ class ScannerService:
             next_scan_seconds = self.get_next_hour_start()
             next_scan_time = datetime.now(TIMEZONE) + timedelta(seconds=next_scan_seconds)
             self.add_activity('SYSTEM', f'⏰ Next scan scheduled for {next_scan_time.strftime("%H:%M:%S EST")} ({next_scan_seconds/60:.0f} minutes)', 'normal')
+            if scrape_failed:
+                # Nothing was sampled: a failed cycle, never reused as a fresh manual scan
+                return None
+            return {
+                'pizza_index': state_manager.get('pizza_index'),
+                'gay_bar_index': state_manager.get('gay_bar_index'),
+                'anomaly_detected': bool(anomalies_found),
+                'completed_at': completion_time.isoformat()
+            }
             
         except Exception as e:
             state_manager.set_scanning_status(False)
             self.add_activity('ERROR', f'❌ Scanner error: {str(e)}', 'critical')
             self.emit_update('scanning_complete', {})
             print(f"Scanner error: {e}")
+            return None
     
     async def hourly_scanner(self) -> None:
         """Main scanner loop that runs hourly"""
@@ -202,8 +273,8 @@ class ScannerService:
         self.add_activity('INIT', '🛰️ SignalSlice integrated scanner starting...', 'normal')
         self.add_activity('INIT', '🔄 Running initial scan, then switching to hourly schedule', 'normal')
         
-        # Run initial scan
-        await self.run_scanner_cycle()
+        # Run initial scan; scheduled scans always sample anew (max_age=0) but join one already in flight
+        await self.executor.run(max_age=0)
         
         while state_manager.get('scanner_running', False):
             try:
@@ -220,7 +291,7 @@ class ScannerService:
                 # Check if scanner is still running
                 if state_manager.get('scanner_running', False):
                     self.add_activity('SYSTEM', 'Hourly scan interval reached - initiating new scan cycle', 'normal')
-                    await self.run_scanner_cycle()
+                    await self.executor.run(max_age=0)
                     
             except asyncio.CancelledError:
                 self.add_activity('SYSTEM', '🛑 Scanner stopped by user request', 'warning')
@@ -232,37 +303,27 @@ class ScannerService:
                 self.add_activity('SYSTEM', f'Waiting {SCANNER_RETRY_DELAY/60:.0f} minutes before retry to avoid rapid failures', 'warning')
                 await asyncio.sleep(SCANNER_RETRY_DELAY)
     
-    def start(self) -> threading.Thread:
-        """Start the scanner in a separate thread"""
-        def run_scanner_loop():
-            self.scanner_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.scanner_loop)
-            
-            state_manager.set_scanner_running(True)
-            self.scanner_task = self.scanner_loop.create_task(self.hourly_scanner())
-            
-            try:
-                self.scanner_loop.run_until_complete(self.scanner_task)
-            except Exception as e:
-                print(f"Scanner thread error: {e}")
-            finally:
-                self.scanner_loop.close()
-        
-        self.scanner_thread = threading.Thread(target=run_scanner_loop)
-        self.scanner_thread.daemon = True
-        self.scanner_thread.start()
-        return self.scanner_thread
+    def start(self) -> concurrent.futures.Future:
+        """Start the hourly schedule (and the live poller) on the scan executor's loop"""
+        state_manager.set_scanner_running(True)
+        self.scanner_task = self.executor.spawn(self.hourly_scanner())
+        if LIVE_POLL_CONFIG['enabled']:
+            self.live_poller = LivePoller(on_reading=self.handle_streamed_reading,
+                                          is_paused=lambda: state_manager.get('scanning', False))
+            self.live_poller_task = self.executor.spawn(self.live_poller.run())
+        return self.scanner_task
     
     def stop(self) -> None:
-        """Stop the scanner"""
+        """Stop the scanner; the executor loop keeps serving manual scans"""
         state_manager.set_scanner_running(False)
         
+        if self.live_poller:
+            self.live_poller.stop()
+        if self.live_poller_task and not self.live_poller_task.done():
+            self.live_poller_task.cancel()
         if self.scanner_task and not self.scanner_task.done():
             self.scanner_task.cancel()
-        
-        if self.scanner_loop:
-            self.scanner_loop.call_soon_threadsafe(self.scanner_loop.stop)
     
-    async def run_manual_scan(self) -> None:
-        """Run a manual scan cycle"""
-        await self.run_scanner_cycle()
\ No newline at end of file
+    def request_manual_scan(self) -> Tuple[concurrent.futures.Future, str]:
+        """Start a manual scan, join the one in flight or reuse a fresh one (see ScanExecutor.submit)"""
+        return self.executor.submit()
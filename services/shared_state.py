@@ -0,0 +1,330 @@
+"""
+SignalSlice Shared State
+Pluggable key/value + pub/sub backends so several web processes can serve dashboards from one scanner
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from config import SHARED_STATE_CONFIG
+from services.state_log import StateLog
+
+Handler = Callable[[Dict[str, Any]], None]
+
+UPDATES_CHANNEL = 'signalslice:updates'
+COMMANDS_CHANNEL = 'signalslice:commands'
+LEADER_LEASE = 'signalslice:leader'
+
+# Redis lease compare-and-set: KEYS[1] lease, ARGV[1] owner, ARGV[2] ttl seconds
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class MemoryBackend:
+    """In-process backend: the default for a single web worker"""
+
+    # A lease or message here is never seen by another process
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, str] = {}
+        self._leases: Dict[str, tuple] = {}
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._values.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._values[key] = value
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        for handler in list(self._handlers.get(channel, ())):
+            handler(message)
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel].append(handler)
+
+    def claim(self, name: str, owner: str, ttl: float) -> bool:
+        """Acquire or renew a lease; True while owner holds it"""
+        now = time.time()
+        with self._lock:
+            holder = self._leases.get(name)
+            if holder is None or holder[0] == owner or holder[1] <= now:
+                self._leases[name] = (owner, now + ttl)
+                return True
+            return False
+
+    def release(self, name: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+    def close(self) -> None:
+        self._handlers.clear()
+
+
+class SqliteBackend:
+    """
+    Redis-compatible stand-in for one host: a SQLite file shared by every web process
+    Subscribers poll a message table, so delivery latency is about one poll interval
+    """
+
+    shared = True
+
+    def __init__(self, path: str, poll_interval: float = SHARED_STATE_CONFIG['poll_interval'],
+                 retention: float = SHARED_STATE_CONFIG['message_retention']):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._listener: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._last_id = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS messages "
+                       "(id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, payload TEXT, created REAL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps this safe across threads and forked workers
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, value))
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT INTO messages (channel, payload, created) VALUES (?, ?, ?)",
+                       (channel, json.dumps(message, default=str), now))
+            db.execute("DELETE FROM messages WHERE created < ?", (now - self.retention,))
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel].append(handler)
+        if self._listener is None:
+            with self._connect() as db:
+                self._last_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0]
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def poll(self) -> int:
+        """Deliver messages published since the last poll; returns how many were delivered"""
+        with self._connect() as db:
+            rows = db.execute("SELECT id, channel, payload FROM messages WHERE id > ? ORDER BY id",
+                              (self._last_id,)).fetchall()
+        for message_id, channel, payload in rows:
+            self._last_id = message_id
+            for handler in list(self._handlers.get(channel, ())):
+                try:
+                    handler(json.loads(payload))
+                except Exception as e:
+                    print(f"❌ Shared state handler failed on {channel}: {e}")
+        return len(rows)
+
+    def _listen(self) -> None:
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                print(f"⚠️ Shared state poll failed: {e}")
+
+    def claim(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT owner, expires FROM leases WHERE name = ?", (name,)).fetchone()
+            held = row is None or row[0] == owner or row[1] <= now
+            if held:
+                db.execute("INSERT OR REPLACE INTO leases (name, owner, expires) VALUES (?, ?, ?)",
+                           (name, owner, now + ttl))
+            db.execute("COMMIT")
+        return held
+
+    def release(self, name: str, owner: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self) -> None:
+        self._stopped.set()
+
+
+class RedisBackend:
+    """Redis backend for web processes spread across hosts (needs the optional redis package)"""
+
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("redis:// state backends need the redis package (pip install redis)") from e
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        # Compare-and-set on the lease owner, run atomically on the server so a lease that expires
+        # and is taken by another node between the check and the write is never renewed or deleted
+        self._renew = self._client.register_script(RENEW_LEASE_SCRIPT)
+        self._release = self._client.register_script(RELEASE_LEASE_SCRIPT)
+        self._pubsub = None
+        self._listener = None
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._client.set(key, value)
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        self._client.publish(channel, json.dumps(message, default=str))
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        if self._pubsub is None:
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: lambda message: handler(json.loads(message['data']))})
+        if self._listener is None:
+            self._listener = self._pubsub.run_in_thread(sleep_time=SHARED_STATE_CONFIG['poll_interval'], daemon=True)
+
+    def claim(self, name: str, owner: str, ttl: float) -> bool:
+        ttl = max(1, int(ttl))
+        if self._client.set(name, owner, nx=True, ex=ttl):
+            return True
+        return bool(self._renew(keys=[name], args=[owner, ttl]))
+
+    def release(self, name: str, owner: str) -> None:
+        self._release(keys=[name], args=[owner])
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+def create_backend(url: Optional[str] = None):
+    """Backend for a URL: memory:// (default), sqlite:///path/to/file.db or redis://host:port/db"""
+    url = url or SHARED_STATE_CONFIG['url']
+    if url.startswith('memory://'):
+        return MemoryBackend()
+    if url.startswith('sqlite:///'):
+        return SqliteBackend(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported state backend URL: {url}")
+
+
+class StateReplicator:
+    """
+    Single-writer replication between web processes
+    The process holding the leader lease owns the state log and the scanner; it publishes every
+    flushed frame with a state snapshot. Followers mirror both and forward their own events and
+    scanner commands to the leader. With an unshared backend the process is always the leader.
+    on_promote runs whenever this process takes the lease, after the last published state is
+    imported, so the new leader can take over (or clear) the scanner that state describes.
+    """
+
+    def __init__(self, backend, state_log: StateLog, export_state: Callable[[], Dict[str, Any]],
+                 import_state: Callable[[Dict[str, Any]], None],
+                 on_command: Callable[[Dict[str, Any]], None],
+                 on_frame: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_promote: Optional[Callable[[], None]] = None,
+                 lease_ttl: float = SHARED_STATE_CONFIG['lease_ttl']):
+        self.backend = backend
+        self.state_log = state_log
+        self.export_state = export_state
+        self.import_state = import_state
+        self.on_command = on_command
+        self.on_frame = on_frame
+        self.on_promote = on_promote
+        self.lease_ttl = lease_ttl
+        self.node_id = uuid.uuid4().hex[:12]
+        self.is_leader = not backend.shared
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Claim leadership if it is free and keep renewing or re-trying in the background"""
+        if not self.backend.shared:
+            return
+        self.backend.subscribe(UPDATES_CHANNEL, self._handle_update)
+        self.backend.subscribe(COMMANDS_CHANNEL, self._handle_command)
+        self.renew()
+        threading.Thread(target=self._renew_loop, daemon=True).start()
+
+    def renew(self) -> bool:
+        """One lease round; a follower that becomes leader starts from the last published state"""
+        was_leader = self.is_leader
+        self.is_leader = self.backend.claim(LEADER_LEASE, self.node_id, self.lease_ttl)
+        if self.is_leader and not was_leader:
+            print(f"👑 Web process {self.node_id} is now the state leader")
+            stored = self.backend.get('signalslice:state')
+            if stored:
+                self.import_state(json.loads(stored))
+            if self.on_promote is not None:
+                self.on_promote()
+        return self.is_leader
+
+    def _renew_loop(self) -> None:
+        while not self._stopped.wait(self.lease_ttl / 3):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"⚠️ Leader lease renewal failed: {e}")
+                self.is_leader = False
+
+    def publish_frame(self, frame: Dict[str, Any]) -> None:
+        """Leader: share a flushed frame and the state it produced with the followers"""
+        if not (self.backend.shared and self.is_leader):
+            return
+        state = self.export_state()
+        self.backend.set('signalslice:state', json.dumps(state, default=str))
+        self.backend.publish(UPDATES_CHANNEL, {'origin': self.node_id, 'frame': frame, 'state': state})
+
+    def send_command(self, command: str, **params) -> bool:
+        """Follower: hand a command to the leader; False when this process should run it itself"""
+        if self.is_leader:
+            return False
+        self.backend.publish(COMMANDS_CHANNEL, dict(params, origin=self.node_id, command=command))
+        return True
+
+    def _handle_update(self, message: Dict[str, Any]) -> None:
+        if self.is_leader or message.get('origin') == self.node_id:
+            return
+        frame = message['frame']
+        self.state_log.replicate(frame.get('epoch'), frame.get('events', []))
+        self.import_state(message['state'])
+        if self.on_frame is not None:
+            self.on_frame(frame)
+
+    def _handle_command(self, message: Dict[str, Any]) -> None:
+        if self.is_leader and message.get('origin') != self.node_id:
+            self.on_command(message)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self.is_leader and self.backend.shared:
+            self.backend.release(LEADER_LEASE, self.node_id)
+        self.backend.close()
@@ -0,0 +1,68 @@
+"""
+SignalSlice Server-Sent Events
+Streams the dashboard state log to EventSource clients with heartbeats and Last-Event-ID resume
+"""
+import json
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from config import SSE_HEARTBEAT_INTERVAL, SSE_RETRY_MS
+from services.state_log import StateLog
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """One SSE frame; the JSON payload is a single line so it needs no continuation lines"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_last_event_id(last_event_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Split an 'epoch:seq' event id into its parts (None, None if absent or malformed)"""
+    if not last_event_id or ':' not in last_event_id:
+        return None, None
+    epoch, _, seq = last_event_id.partition(':')
+    return epoch, seq
+
+
+def event_stream(state_log: StateLog, snapshot: Callable[[], Dict[str, Any]], last_event_id: Optional[str] = None,
+                 heartbeat: float = SSE_HEARTBEAT_INTERVAL, max_frames: Optional[int] = None) -> Iterator[str]:
+    """
+    Generator of SSE frames: a snapshot or the missed events first, then live events as they are logged
+    Event ids are 'epoch:seq', so a reconnecting EventSource resumes through Last-Event-ID
+    max_frames bounds the stream (for tests); None streams until the client disconnects
+    """
+    def frames() -> Iterator[str]:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+
+        epoch, last_seq = parse_last_event_id(last_event_id)
+        resume = state_log.resume(epoch, last_seq, snapshot)
+        seq = resume['seq']
+        if resume['type'] == 'snapshot':
+            state = dict(resume['state'], epoch=resume['epoch'], seq=seq)
+            yield format_sse('initial_state', state, f"{state_log.epoch}:{seq}")
+        else:
+            for entry in resume['events']:
+                yield format_sse(entry['event'], entry['data'], f"{state_log.epoch}:{entry['seq']}")
+
+        while True:
+            events = state_log.wait_since(seq, heartbeat)
+            if events is None:
+                # Fell out of the log while blocked; start over from a snapshot
+                seq = state_log.seq
+                state = dict(snapshot(), epoch=state_log.epoch, seq=seq)
+                yield format_sse('initial_state', state, f"{state_log.epoch}:{seq}")
+            elif not events:
+                # Comment frame: keeps proxies from closing an idle connection
+                yield ": heartbeat\n\n"
+            else:
+                for entry in events:
+                    yield format_sse(entry['event'], entry['data'], f"{state_log.epoch}:{entry['seq']}")
+                seq = events[-1]['seq']
+
+    for count, frame in enumerate(frames(), 1):
+        yield frame
+        if max_frames is not None and count >= max_frames:
+            return
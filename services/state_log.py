@@ -0,0 +1,101 @@
+"""
+SignalSlice State Log
+Sequence-numbered log of dashboard events so reconnecting clients can catch up with deltas
+"""
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from config import STATE_LOG_CAPACITY
+
+
+class StateLog:
+    """
+    Bounded, append-only log of broadcast events
+    Every event gets the next sequence number; the epoch changes with each server process,
+    so sequence numbers from an earlier process are never mistaken for current ones
+    """
+
+    def __init__(self, capacity: int = STATE_LOG_CAPACITY):
+        self.capacity = capacity
+        self.epoch = uuid.uuid4().hex[:12]
+        self._entries: deque = deque(maxlen=capacity)
+        self._seq = 0
+        self._lock = threading.Lock()
+        # Streaming subscribers block on this until new events are appended
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the newest event (0 before any event)"""
+        return self._seq
+
+    def append(self, event: str, data: Any = None) -> int:
+        """Record an event; returns its sequence number"""
+        with self._lock:
+            self._seq += 1
+            self._entries.append({'seq': self._seq, 'event': event, 'data': data})
+            self._changed.notify_all()
+            return self._seq
+
+    def replicate(self, epoch: Optional[str], entries: List[Dict[str, Any]]) -> None:
+        """Mirror events logged by another process, adopting its epoch and sequence numbers"""
+        with self._lock:
+            if epoch and epoch != self.epoch:
+                self.epoch = epoch
+                self._entries.clear()
+                self._seq = 0
+            for entry in entries:
+                if entry.get('seq') is not None and entry['seq'] > self._seq:
+                    self._entries.append({'seq': entry['seq'], 'event': entry['event'], 'data': entry['data']})
+                    self._seq = entry['seq']
+            self._changed.notify_all()
+
+    def since(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events after seq, oldest first
+        Returns None when they can no longer be replayed (seq is older than the log or ahead of it)
+        """
+        with self._lock:
+            return self._since_locked(seq)
+
+    def _since_locked(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        if seq > self._seq:
+            return None
+        if seq == self._seq:
+            return []
+        oldest = self._entries[0]['seq'] if self._entries else self._seq + 1
+        if seq < oldest - 1:
+            return None
+        return [entry for entry in self._entries if entry['seq'] > seq]
+
+    def wait_since(self, seq: int, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Like since(), but blocks up to timeout seconds for an event after seq ([] on timeout)"""
+        with self._changed:
+            if self._seq == seq:
+                self._changed.wait(timeout)
+            return self._since_locked(seq)
+
+    def resume(self, epoch: Optional[str], last_seq: Any, snapshot: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Catch-up payload for a client that last saw (epoch, last_seq)
+        {'type': 'delta', 'events': [...]} when the missing events are still logged,
+        otherwise {'type': 'snapshot', 'state': snapshot()}; both carry the current epoch and seq
+        """
+        events = None
+        if epoch == self.epoch:
+            try:
+                events = self.since(int(last_seq))
+            except (TypeError, ValueError):
+                events = None
+
+        if events is not None:
+            seq = events[-1]['seq'] if events else int(last_seq)
+            return {'type': 'delta', 'epoch': self.epoch, 'seq': seq, 'events': events}
+        # Read seq before building the snapshot: events logged meanwhile are re-sent, never lost
+        seq = self._seq
+        return {'type': 'snapshot', 'epoch': self.epoch, 'seq': seq, 'state': snapshot()}
+
+    def __len__(self) -> int:
+        return len(self._entries)
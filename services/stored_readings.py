@@ -0,0 +1,94 @@
+"""
+SignalSlice Stored Readings
+Column arrays of the scan readings stored under data/, shared by the backtest and the baseline compiler
+"""
+import csv
+import glob
+import os
+from typing import List, Set, Tuple
+
+from services.baseline_service import WEEKDAY_INDEX, baseline_hour
+from services.batch_detector import LIVE_TEXT_FLAGS
+
+
+class ReplayReadings:
+    """Column arrays of replayed readings"""
+
+    def __init__(self):
+        self.venues: List[str] = []
+        self.dates: List[str] = []
+        self.weekdays: List[int] = []
+        self.hours: List[int] = []
+        self.current: List[float] = []
+        self.live_flags: List[bool] = []
+
+    def add(self, venue: str, timestamp: str, weekday: str, hour: int, busyness: str, value_text: str = "") -> bool:
+        """Add one reading; rows without a usable weekday or busyness are skipped (False)"""
+        weekday_idx = WEEKDAY_INDEX.get(weekday)
+        if weekday_idx is None or busyness in (None, "", "None"):
+            return False
+        try:
+            current = float(int(busyness))
+        except (TypeError, ValueError):
+            return False
+        self.venues.append(venue)
+        self.dates.append((timestamp or "")[:10])
+        self.weekdays.append(weekday_idx)
+        self.hours.append(hour)
+        self.current.append(current)
+        text = (value_text or "").lower()
+        self.live_flags.append(any(flag in text for flag in LIVE_TEXT_FLAGS))
+        return True
+
+    def __len__(self) -> int:
+        return len(self.current)
+
+    def split(self, cutoff: str) -> Tuple['ReplayReadings', 'ReplayReadings']:
+        """(readings dated before cutoff, readings from cutoff on); cutoff is YYYY-MM-DD"""
+        before, after = ReplayReadings(), ReplayReadings()
+        columns = ('venues', 'dates', 'weekdays', 'hours', 'current', 'live_flags')
+        for row in zip(*(getattr(self, column) for column in columns)):
+            target = before if row[1] < cutoff else after
+            for column, value in zip(columns, row):
+                getattr(target, column).append(value)
+        return before, after
+
+
+def load_readings(data_dir: str, source: str) -> ReplayReadings:
+    """
+    Load stored readings from data/
+    cycles:   one reading per venue per scan; a scan's current_hour_*.csv row wins over the
+              target-hour row of its scrape dump, which records the same reading
+    profiles: every weekday/hour row of every scrape dump
+    """
+    readings = ReplayReadings()
+    # (venue, scan date, weekday, baseline hour) of each cycle reading already loaded
+    scanned: Set[Tuple[str, str, str, int]] = set()
+
+    def add_cycle_reading(venue, timestamp, weekday, hour, busyness, value_text):
+        key = (venue, (timestamp or "")[:10], weekday, hour)
+        if key not in scanned and readings.add(venue, timestamp, weekday, hour, busyness, value_text):
+            scanned.add(key)
+
+    if source == "cycles":
+        for path in sorted(glob.glob(os.path.join(data_dir, "current_hour_*.csv"))):
+            with open(path, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if not row.get("hour_24"):
+                        continue
+                    add_cycle_reading(row["restaurant_url"], row.get("timestamp"), row.get("weekday"),
+                                      baseline_hour(row["hour_24"]), row.get("busyness_percent"), row.get("value"))
+
+    for path in sorted(glob.glob(os.path.join(data_dir, "all_scraped_data_*.csv"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if source == "cycles" and not (row.get("is_target_hour") == "True" and row.get("is_today_cycle") == "True"):
+                    continue
+                weekday = row.get("assigned_weekday") or row.get("target_weekday")
+                hour = row.get("display_hour") or row.get("hour_24")
+                if not hour:
+                    continue
+                add = add_cycle_reading if source == "cycles" else readings.add
+                add(row["restaurant_url"], row.get("scrape_timestamp"), weekday,
+                    baseline_hour(hour), row.get("busyness_percent"), row.get("raw_aria_label"))
+    return readings
@@ -0,0 +1,268 @@
+"""
+SignalSlice Tracing
+Lightweight spans for scan cycles, venues and scrape phases, exported as JSONL or OTLP/JSON
+"""
+import collections
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from config import TRACING_CONFIG
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('signalslice_span', default=None)
+
+
+def _new_id(length: int) -> str:
+    return os.urandom(length).hex()
+
+
+class Span:
+    """
+    One timed operation; spans of a scan cycle share its trace_id (the cycle id)
+    While a span is current, spans started in the same thread or task become its children
+    """
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'start', 'end',
+                 '_started', 'attributes', 'status', 'error', '_token')
+
+    def __init__(self, tracer: 'Tracer', name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self._token = _current_span.set(self)
+        if parent is None:
+            tracer._opened(self.trace_id)
+
+    @property
+    def duration(self) -> float:
+        """Seconds the span took (so far, while still open)"""
+        return (self.end - self.start) if self.end is not None else time.perf_counter() - self._started
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = 'error'
+        self.error = f"{type(error).__name__}: {error}"[:300]
+
+    def finish(self) -> None:
+        """End the span, restore its parent as current and hand it to the exporter"""
+        if self.end is not None:
+            return
+        self.end = self.start + (time.perf_counter() - self._started)
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Finished from another context; only clear it if it is still current here
+            if _current_span.get() is self:
+                _current_span.set(None)
+        self.tracer._finished(self)
+
+    def __enter__(self) -> 'Span':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.set_error(exc)
+        self.finish()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration': round(self.duration, 6),
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to a local file, rotated at max_bytes"""
+
+    def __init__(self, path: str = TRACING_CONFIG['file'], max_bytes: int = TRACING_CONFIG['max_file_bytes']):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = ''.join(json.dumps(span.to_dict(), separators=(',', ':'), default=str) + '\n' for span in spans)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+class OtlpExporter:
+    """
+    Posts spans as OTLP/JSON (resourceSpans) to a collector, e.g. http://localhost:4318/v1/traces
+    Sending happens on a background thread; spans are dropped, not queued forever, if it falls behind
+    """
+
+    def __init__(self, endpoint: str, service_name: str = TRACING_CONFIG['service_name'], timeout: float = 5):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=100)
+        self._sender: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    def encode(self, spans: List[Span]) -> Dict[str, Any]:
+        return {'resourceSpans': [{
+            'resource': {'attributes': [self._attribute('service.name', self.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': 'signalslice'},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(int(span.start * 1e9)),
+                    'endTimeUnixNano': str(int(span.end * 1e9)),
+                    'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+                    'status': {'code': 2, 'message': span.error} if span.status == 'error' else {'code': 1}
+                } for span in spans]
+            }]
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        if self._sender is None:
+            self._sender = threading.Thread(target=self._send_loop, name='otlp-exporter', daemon=True)
+            self._sender.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass
+
+    def _send_loop(self) -> None:
+        while True:
+            spans = self._queue.get()
+            body = json.dumps(self.encode(spans), default=str).encode('utf-8')
+            request = urllib.request.Request(self.endpoint, data=body, headers={'Content-Type': 'application/json'})
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except OSError as e:
+                print(f"⚠️ Trace export to {self.endpoint} failed: {e}")
+
+
+def create_exporter(target: Optional[str] = None):
+    """'jsonl' (default file), 'jsonl:<path>', an http(s) OTLP endpoint, or 'none'"""
+    target = TRACING_CONFIG['exporter'] if target is None else target
+    if not target or target == 'none':
+        return None
+    if target.startswith(('http://', 'https://')):
+        return OtlpExporter(target)
+    if target == 'jsonl':
+        return JsonlExporter()
+    if target.startswith('jsonl:'):
+        return JsonlExporter(target[len('jsonl:'):])
+    raise ValueError(f"Unknown trace exporter: {target}")
+
+
+class Tracer:
+    """
+    Creates spans and batches each trace until its root span ends, then exports it at once
+    The last few complete traces stay in memory for the slowest-spans view
+    """
+
+    def __init__(self, exporter=None, recent_traces: int = TRACING_CONFIG['recent_traces'],
+                 max_spans_per_trace: int = TRACING_CONFIG['max_spans_per_trace']):
+        self.exporter = exporter
+        self.max_spans_per_trace = max_spans_per_trace
+        self._open: Dict[str, List[Span]] = {}
+        self._recent: "collections.deque[List[Span]]" = collections.deque(maxlen=recent_traces)
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attributes) -> Span:
+        """Start a span as a child of the current one (or a new trace); use as a context manager or finish() it"""
+        return Span(self, name, _current_span.get(), attributes)
+
+    def root(self, name: str, **attributes) -> Span:
+        """Start a new trace regardless of the current span"""
+        return Span(self, name, None, attributes)
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    def traced(self, name: str, **attributes):
+        """Decorator for coroutines: the call runs inside a span that starts a new trace"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.root(name, **attributes):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _opened(self, trace_id: str) -> None:
+        with self._lock:
+            self._open[trace_id] = []
+
+    def _finished(self, span: Span) -> None:
+        with self._lock:
+            spans = self._open.get(span.trace_id)
+            if spans is None:
+                # A child that outlived its root: the trace was already exported
+                return
+            if len(spans) < self.max_spans_per_trace:
+                spans.append(span)
+            if span.parent_id is not None:
+                return
+            # Root finished: the trace is complete
+            del self._open[span.trace_id]
+            self._recent.append(spans)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                print(f"⚠️ Trace export failed: {e}")
+
+    def slowest(self, traces: int = 5, limit: int = 20, name: Optional[str] = None) -> Dict[str, Any]:
+        """The slowest spans across the last `traces` complete traces (optionally one span name)"""
+        with self._lock:
+            recent = list(self._recent)[-traces:] if traces > 0 else []
+        roots = [next((s for s in spans if s.parent_id is None), spans[-1]) for spans in recent]
+        candidates = [span for spans in recent for span in spans if name is None or span.name == name]
+        candidates.sort(key=lambda span: span.duration, reverse=True)
+        return {
+            'traces': [{'trace_id': root.trace_id, 'name': root.name, 'start': round(root.start, 3),
+                        'duration': round(root.duration, 3), 'spans': len(spans)}
+                       for root, spans in zip(roots, recent)],
+            'spans': [span.to_dict() for span in candidates[:limit]]
+        }
+
+
+# Global tracer instance
+tracer = Tracer(create_exporter())
@@ -0,0 +1,226 @@
+"""
+SignalSlice Venue Index
+Venue coordinates, a grid spatial index over them, and cluster-level anomaly scoring
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    VENUES_FILE, VENUE_GRID_CELL_DEGREES, CLUSTER_TARGETS, CLUSTER_CONFIG, TIMEZONE
+)
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# The place pin (!3d<lat>!4d<lng>) is preferred over the viewport centre (@<lat>,<lng>)
+COORDINATE_PATTERNS = (
+    re.compile(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)'),
+    re.compile(r'@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)'),
+)
+
+Cell = Tuple[int, int]
+
+
+def parse_coordinates(url: str) -> Optional[Tuple[float, float]]:
+    """Extract (lat, lng) from a resolved Google Maps URL"""
+    for pattern in COORDINATE_PATTERNS:
+        match = pattern.search(url or '')
+        if match:
+            lat, lng = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lng <= 180:
+                return lat, lng
+    return None
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distances from one point to arrays of points"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Uniform lat/lng grid; radius queries touch only the cells the circle overlaps"""
+
+    def __init__(self, venues: Sequence[str], lats: np.ndarray, lngs: np.ndarray,
+                 cell_degrees: float = VENUE_GRID_CELL_DEGREES):
+        self.venues = list(venues)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+
+        cells: Dict[Cell, List[int]] = {}
+        rows = np.floor(self.lats / cell_degrees).astype(np.int64)
+        cols = np.floor(self.lngs / cell_degrees).astype(np.int64)
+        for i, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells.setdefault(cell, []).append(i)
+        self._cells = {cell: np.asarray(members, dtype=np.intp) for cell, members in cells.items()}
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Indexes of venues within radius_km of a point, plus their distances"""
+        if not self._cells:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        # Longitude degrees shrink towards the poles; clamp so the span stays finite
+        lng_span = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        row_range = range(math.floor((lat - lat_span) / self.cell_degrees),
+                          math.floor((lat + lat_span) / self.cell_degrees) + 1)
+        col_range = range(math.floor((lng - lng_span) / self.cell_degrees),
+                          math.floor((lng + lng_span) / self.cell_degrees) + 1)
+
+        if len(row_range) * len(col_range) > len(self._cells):
+            # Huge radius: scanning occupied cells is cheaper than enumerating empty ones
+            candidates = [m for (r, c), m in self._cells.items() if r in row_range and c in col_range]
+        else:
+            candidates = [self._cells[(r, c)] for r in row_range for c in col_range if (r, c) in self._cells]
+        if not candidates:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        indexes = np.concatenate(candidates)
+        distances = haversine_km(lat, lng, self.lats[indexes], self.lngs[indexes])
+        within = distances <= radius_km
+        return indexes[within], distances[within]
+
+    def __len__(self) -> int:
+        return len(self.venues)
+
+
+class VenueRegistry:
+    """Venue coordinates captured while scraping, persisted to data/venues.json"""
+
+    def __init__(self, path: str = VENUES_FILE, cell_degrees: float = VENUE_GRID_CELL_DEGREES):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        self._venues: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._grid: Optional[GridIndex] = None
+        self.version = 0
+        if os.path.exists(path):
+            self.load()
+
+    def record(self, url: str, resolved_url: str, venue_type: Optional[str] = None) -> bool:
+        """Store a venue's coordinates from the URL its short link resolved to; returns True if they changed"""
+        coordinates = parse_coordinates(resolved_url)
+        if coordinates is None:
+            return False
+        lat, lng = coordinates
+        with self._lock:
+            existing = self._venues.get(url)
+            if existing and (existing['lat'], existing['lng']) == (lat, lng):
+                return False
+            self._venues[url] = {
+                'lat': lat,
+                'lng': lng,
+                'venue_type': venue_type or (existing or {}).get('venue_type'),
+                'updated_at': datetime.now(TIMEZONE).isoformat()
+            }
+            self._dirty = True
+            self._grid = None
+            self.version += 1
+        logger.info(f"📍 Located {url} at {lat:.5f}, {lng:.5f}")
+        return True
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Stored location of a venue, if known"""
+        return self._venues.get(url)
+
+    def grid(self) -> GridIndex:
+        """Spatial index over all located venues, rebuilt after coordinates change"""
+        with self._lock:
+            if self._grid is None:
+                venues = sorted(self._venues)
+                lats = np.fromiter((self._venues[v]['lat'] for v in venues), dtype=np.float64, count=len(venues))
+                lngs = np.fromiter((self._venues[v]['lng'] for v in venues), dtype=np.float64, count=len(venues))
+                self._grid = GridIndex(venues, lats, lngs, self.cell_degrees)
+            return self._grid
+
+    def save(self) -> None:
+        """Write coordinates to disk if anything changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'venues': self._venues}, indent=2)
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> None:
+        """Load coordinates from disk, replacing in-memory state"""
+        try:
+            with open(self.path, "r") as f:
+                venues = json.load(f).get('venues', {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not load venue locations from {self.path}: {e}")
+            return
+        with self._lock:
+            self._venues = {url: info for url, info in venues.items()
+                            if isinstance(info, dict) and 'lat' in info and 'lng' in info}
+            self._grid = None
+            self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._venues)
+
+
+def score_clusters(table: np.ndarray, registry: 'VenueRegistry',
+                   targets: Dict[str, Dict[str, float]] = CLUSTER_TARGETS,
+                   config: Dict[str, float] = CLUSTER_CONFIG) -> List[Dict[str, Any]]:
+    """
+    Aggregate a scored anomaly table (ANOMALY_TABLE_DTYPE) over the venues near each target
+    A cluster is flagged as a coordinated spike when enough of its venues are anomalous
+    together, or when their z-scores combine (Stouffer) above the threshold
+    """
+    grid = registry.grid()
+    if not len(grid) or not len(table):
+        return []
+    grid_rows = {venue: i for i, venue in enumerate(grid.venues)}
+    # Grid row for each table row; -1 for venues without coordinates
+    table_rows = np.fromiter((grid_rows.get(url, -1) for url in table['restaurant_url']),
+                             dtype=np.intp, count=len(table))
+    scorable = ~np.isnan(table['current']) & ~np.isnan(table['expected'])
+
+    clusters = []
+    for name, target in targets.items():
+        members, distances = grid.query_radius(target['lat'], target['lng'], target['radius_km'])
+        in_cluster = np.isin(table_rows, members) & scorable
+        scored = int(in_cluster.sum())
+        anomalous = int((in_cluster & table['is_anomaly']).sum())
+        zscores = table['zscore'][in_cluster & ~np.isnan(table['zscore'])]
+        combined_z = float(zscores.sum() / math.sqrt(len(zscores))) if len(zscores) else None
+        fraction = anomalous / scored if scored else 0.0
+
+        coordinated = (anomalous >= config['min_venues'] and fraction >= config['min_anomaly_fraction']) or \
+            (combined_z is not None and combined_z >= config['combined_z_threshold'])
+        clusters.append({
+            'target': name,
+            'venues_in_radius': int(len(members)),
+            'scored': scored,
+            'anomalous': anomalous,
+            'anomaly_fraction': round(fraction, 3),
+            'mean_diff': float(table['diff'][in_cluster].mean()) if scored else None,
+            'combined_z': combined_z,
+            'nearest_km': float(distances.min()) if len(distances) else None,
+            'coordinated': bool(coordinated)
+        })
+    return clusters
+
+
+# Global venue registry instance
+venue_registry = VenueRegistry()
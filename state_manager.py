@@ -2,42 +2,67 @@
 SignalSlice State Management Module
 Handles application state in a thread-safe manner
 """
+import itertools
+import queue
 import threading
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 from config import DASHBOARD_DEFAULTS, MAX_ACTIVITY_FEED_ITEMS, TIMEZONE
 
 
 class StateManager:
-    """Thread-safe state management for the SignalSlice application"""
+    """
+    Copy-on-write state management for the SignalSlice application
+    Writers serialize on a lock, build a new dict and publish it as an immutable snapshot with one
+    reference swap; readers just take the current snapshot, without locking or copying.
+    Observers are notified in order from a dispatcher thread, never inside the write lock.
+    """
     
     def __init__(self):
-        self._state = DASHBOARD_DEFAULTS.copy()
-        self._lock = threading.Lock()
+        initial = dict(DASHBOARD_DEFAULTS)
+        initial['activity_feed'] = tuple(initial.get('activity_feed', ()))
+        self._state: Mapping[str, Any] = MappingProxyType(initial)
+        self._write_lock = threading.Lock()
         self._observers = []
+        self._version_counter = itertools.count(1)
+        self._version = 0
+        self._notifications: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
     
-    def get_state(self) -> Dict[str, Any]:
-        """Get a copy of the current state"""
-        with self._lock:
-            return self._state.copy()
+    @property
+    def version(self) -> int:
+        """Advances on every state change; keys cached API responses"""
+        return self._version
+    
+    def get_state(self) -> Mapping[str, Any]:
+        """Get the current state as a read-only snapshot (copy it with dict() to modify)"""
+        return self._state
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get a specific state value"""
-        with self._lock:
-            return self._state.get(key, default)
+        return self._state.get(key, default)
+    
+    def _commit(self, changes: Dict[str, Any], notifications: List[Tuple[str, Any]]) -> None:
+        """Publish a new snapshot with changes applied; call with the write lock held"""
+        state = dict(self._state)
+        state.update(changes)
+        self._state = MappingProxyType(state)
+        # Every mutation commits, so this is where the state version advances
+        self._version = next(self._version_counter)
+        if self._observers:
+            for notification in notifications:
+                self._notifications.put(notification)
     
     def set(self, key: str, value: Any) -> None:
         """Set a specific state value"""
-        with self._lock:
-            self._state[key] = value
-            self._notify_observers(key, value)
+        with self._write_lock:
+            self._commit({key: value}, [(key, value)])
     
     def update(self, updates: Dict[str, Any]) -> None:
         """Update multiple state values at once"""
-        with self._lock:
-            self._state.update(updates)
-            for key, value in updates.items():
-                self._notify_observers(key, value)
+        with self._write_lock:
+            self._commit(updates, list(updates.items()))
     
     def add_activity(self, activity_type: str, message: str, level: str = 'normal') -> Dict[str, Any]:
         """Add an activity to the feed and return the activity item"""
@@ -50,98 +75,90 @@ class StateManager:
             'timestamp': timestamp
         }
         
-        with self._lock:
-            feed = self._state.get('activity_feed', [])
-            feed.insert(0, activity)
-            self._state['activity_feed'] = feed[:MAX_ACTIVITY_FEED_ITEMS]
-        
-        self._notify_observers('activity_feed', self._state['activity_feed'])
+        with self._write_lock:
+            # Tuples keep the feed inside a snapshot immutable
+            feed = ((activity,) + tuple(self._state.get('activity_feed', ())))[:MAX_ACTIVITY_FEED_ITEMS]
+            self._commit({'activity_feed': feed}, [('activity_feed', feed)])
         return activity
     
     def update_pizza_index(self, new_value: float, change_percent: float = 0) -> Dict[str, Any]:
         """Update pizza index and return the update data"""
-        with self._lock:
-            old_value = self._state.get('pizza_index', 0)
-            self._state['pizza_index'] = new_value
-            
+        with self._write_lock:
             data = {
                 'value': new_value,
                 'change': change_percent,
-                'old_value': old_value
+                'old_value': self._state.get('pizza_index', 0)
             }
-        
-        self._notify_observers('pizza_index', data)
+            self._commit({'pizza_index': new_value}, [('pizza_index', data)])
         return data
     
     def update_gay_bar_index(self, new_value: float, change_percent: float = 0) -> Dict[str, Any]:
         """Update gay bar index and return the update data"""
-        with self._lock:
-            old_value = self._state.get('gay_bar_index', 0)
-            self._state['gay_bar_index'] = new_value
-            
+        with self._write_lock:
             data = {
                 'value': new_value,
                 'change': change_percent,
-                'old_value': old_value
+                'old_value': self._state.get('gay_bar_index', 0)
             }
-        
-        self._notify_observers('gay_bar_index', data)
+            self._commit({'gay_bar_index': new_value}, [('gay_bar_index', data)])
         return data
     
     def increment_scan_count(self) -> Dict[str, Any]:
         """Increment scan count and update last scan time"""
-        with self._lock:
-            self._state['scan_count'] = self._state.get('scan_count', 0) + 1
-            self._state['last_scan_time'] = datetime.now(TIMEZONE)
-            
+        with self._write_lock:
+            scan_count = self._state.get('scan_count', 0) + 1
+            last_scan_time = datetime.now(TIMEZONE)
             stats = {
-                'scan_count': self._state['scan_count'],
-                'last_scan_time': self._state['last_scan_time'].strftime('%H:%M:%S')
+                'scan_count': scan_count,
+                'last_scan_time': last_scan_time.strftime('%H:%M:%S')
             }
-        
-        self._notify_observers('scan_stats', stats)
+            self._commit({'scan_count': scan_count, 'last_scan_time': last_scan_time}, [('scan_stats', stats)])
         return stats
     
     def increment_anomaly_count(self) -> int:
         """Increment anomaly count and return new count"""
-        with self._lock:
-            self._state['anomaly_count'] = self._state.get('anomaly_count', 0) + 1
-            count = self._state['anomaly_count']
-        
-        self._notify_observers('anomaly_count', count)
+        with self._write_lock:
+            count = self._state.get('anomaly_count', 0) + 1
+            self._commit({'anomaly_count': count}, [('anomaly_count', count)])
         return count
     
     def set_scanning_status(self, scanning: bool) -> None:
         """Set scanning status"""
-        with self._lock:
-            self._state['scanning'] = scanning
-        
-        self._notify_observers('scanning', scanning)
+        self.set('scanning', scanning)
     
     def set_scanner_running(self, running: bool) -> None:
         """Set scanner running status"""
-        with self._lock:
-            self._state['scanner_running'] = running
-        
-        self._notify_observers('scanner_running', running)
+        self.set('scanner_running', running)
     
     def register_observer(self, callback) -> None:
         """Register a callback to be notified of state changes"""
         self._observers.append(callback)
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+            self._dispatcher.start()
     
     def unregister_observer(self, callback) -> None:
         """Unregister a callback"""
         if callback in self._observers:
             self._observers.remove(callback)
     
-    def _notify_observers(self, key: str, value: Any) -> None:
-        """Notify all observers of a state change"""
-        for observer in self._observers:
+    def join_observers(self) -> None:
+        """Block until every queued notification has been delivered"""
+        self._notifications.join()
+    
+    def _dispatch_loop(self) -> None:
+        """Deliver queued notifications to observers, in commit order, outside the write lock"""
+        while True:
+            key, value = self._notifications.get()
             try:
-                observer(key, value)
-            except Exception as e:
-                print(f"Error notifying observer: {e}")
+                for observer in list(self._observers):
+                    try:
+                        observer(key, value)
+                    except Exception as e:
+                        print(f"Error notifying observer: {e}")
+            finally:
+                self._notifications.task_done()
 
 
 # Global state manager instance
-state_manager = StateManager()
\ No newline at end of file
+state_manager = StateManager()
@@ -3,6 +3,9 @@
  * Pentagon Pizza Index Monitoring System
  */
 
+// Socket.IO protocol version announced to the server (2 = batched 'event_batch' frames)
+const SOCKET_PROTOCOL_VERSION = 2;
+
 /**
  * SignalSlice Monitor Class
  * Main dashboard controller for real-time pizza surveillance
@@ -22,11 +25,20 @@ class SignalSliceMonitor {
         this.activeLocations = 127;
         this.lastActivityTimestamp = null;
         
+        // State log position, sent on reconnect so the server replays only missed events
+        this.stateEpoch = null;
+        this.lastSeq = null;
+        
         // MEMORY OPTIMIZATION: Improved throttling and limits
         this.lastActivityUpdate = 0;
         this.activityUpdateCooldown = 500; // Increased from 100ms to 500ms
         this.maxActivityItems = 10; // Reduced from 15 to 10
         this.maxChartPoints = 15; // Reduced from 20 to 15
+        this.chartThreshold = 5; // Pizza Index level drawn as the dashed threshold line
+        // Server-side history: the chart starts from downsampled stored points for this period
+        this.chartPeriod = '24h';
+        this.historyPoints = 300;
+        this.chartPeriodHours = { '1h': 1, '6h': 6, '24h': 24, '7d': 168 };
         
         // MEMORY: Use WeakMap for temporary data caching
         this.tempDataCache = new WeakMap();
@@ -67,10 +79,7 @@ class SignalSliceMonitor {
         this.initializeMap();
         this.setupEventListeners();
         
-        // Start HTTP polling immediately (fallback approach)
-        this.startHttpPolling();
-        
-        // Connect to backend after everything else is set up
+        // Connect to backend after everything else is set up (falls back to SSE, then polling)
         setTimeout(() => {
             this.connectToBackend();
         }, 500);
@@ -108,16 +117,38 @@ class SignalSliceMonitor {
                 transports: ['polling', 'websocket'],
                 upgrade: true,
                 timeout: 10000,
-                forceNew: true
+                forceNew: true,
+                // Spread reconnect waves (e.g. after a deploy) over up to 30s instead of 5s
+                reconnectionDelay: 1000,
+                reconnectionDelayMax: 30000,
+                randomizationFactor: 0.5,
+                // Protocol 2: the server sends coalesced 'event_batch' frames
+                query: this.buildSocketQuery()
+            });
+            
+            // Reconnects resume from the last sequence number instead of a full snapshot
+            this.socket.io.on('reconnect_attempt', () => {
+                this.socket.io.opts.query = this.buildSocketQuery();
             });
             
             // Handle connection events with stored references for cleanup
             const connectHandler = () => {
+                this.stopFallbackUpdates();
                 this.addActivityItem('CONNECT', 'Connected to real-time data stream', 'success');
             };
             
             const connectErrorHandler = (error) => {
                 console.error('SocketIO connection error:', error);
+                if (error && (error.message === 'rate_limited' || error.message === 'server_full')) {
+                    // Refused by admission control: the client does not retry on its own, so wait as told plus jitter
+                    const retryAfter = (error.data && error.data.retry_after) || 15;
+                    const delay = (retryAfter + Math.random() * retryAfter) * 1000;
+                    this.addActivityItem('WARNING', `Server busy - retrying in ${Math.round(delay / 1000)}s`, 'warning');
+                    setTimeout(() => {
+                        if (this.socket && !this.socket.connected) this.socket.connect();
+                    }, delay);
+                    return;
+                }
                 this.addActivityItem('ERROR', `Connection failed: ${error.message || error}`, 'critical');
             };
             
@@ -139,23 +170,12 @@ class SignalSliceMonitor {
             setTimeout(() => {
                 if (!this.socket.connected) {
                     this.addActivityItem('ERROR', 'Failed to connect to backend - check server status', 'critical');
+                    this.startEventStream();
                 }
             }, 5000);
             
             // Handle real-time updates from backend with stored references
-            const handlers = {
-                'initial_state': (data) => this.handleInitialState(data),
-                'activity_update': (activity) => this.handleActivityUpdate(activity),
-                'pizza_index_update': (data) => this.handlePizzaIndexUpdate(data),
-                'gay_bar_index_update': (data) => this.handleGayBarIndexUpdate(data),
-                'scan_stats_update': (stats) => this.handleScanStatsUpdate(stats),
-                'anomaly_detected': (anomaly) => this.handleAnomalyDetected(anomaly),
-                'scanning_start': () => this.showScanningAnimation(),
-                'scanning_complete': () => {
-                    this.hideScanningAnimation();
-                    this.updateLastScanTime();
-                }
-            };
+            const handlers = this.buildEventHandlers();
             
             // Store and attach all handlers
             Object.entries(handlers).forEach(([event, handler]) => {
@@ -164,8 +184,125 @@ class SignalSliceMonitor {
             });
               } catch (error) {
             console.error('Failed to connect to backend:', error);
-            this.addActivityItem('ERROR', 'Failed to connect to backend - falling back to polling', 'warning');
+            this.addActivityItem('ERROR', 'Failed to connect to backend - falling back to event stream', 'warning');
+            this.startEventStream();
+        }
+    }
+    
+    buildEventHandlers() {
+        // One handler per server event, shared by the Socket.IO connection and the SSE fallback
+        const handlers = {
+            'initial_state': (data) => this.handleInitialState(data),
+            'activity_update': (activity) => this.handleActivityUpdate(activity),
+            'pizza_index_update': (data) => this.handlePizzaIndexUpdate(data),
+            'gay_bar_index_update': (data) => this.handleGayBarIndexUpdate(data),
+            'scan_stats_update': (stats) => this.handleScanStatsUpdate(stats),
+            'anomaly_detected': (anomaly) => this.handleAnomalyDetected(anomaly),
+            'scanning_start': () => this.showScanningAnimation(),
+            'scanning_complete': () => {
+                this.hideScanningAnimation();
+                this.updateLastScanTime();
+            },
+            // Reply to our own manual_scan when it did not start a new scrape
+            'scan_status': (status) => {
+                if (status.status === 'joined') {
+                    this.addActivityItem('MANUAL', 'Scan already in progress - results will follow', 'normal');
+                } else if (status.status === 'fresh') {
+                    this.addActivityItem('MANUAL', `Latest scan is only ${Math.round(status.age)}s old - showing its results`, 'normal');
+                }
+            }
+        };
+        
+        // Batched frames and resume deltas replay their events, in order, through the same handlers.
+        // Activity items skip the live-event throttle: lastSeq moves past them, so a dropped item
+        // would never be sent again. Consecutive items are added to the feed in one DOM pass.
+        const replayEvents = (events) => {
+            let activities = [];
+            const flushActivities = () => {
+                if (activities.length) this.addActivityItemsToFeed(activities);
+                activities = [];
+            };
+            events.forEach(({ event, data, seq }) => {
+                // Skip events already reflected in the snapshot or a previous frame
+                if (seq != null && this.lastSeq != null && seq <= this.lastSeq) return;
+                if (event === 'activity_update') {
+                    activities.push(data);
+                } else {
+                    flushActivities();
+                    const handler = handlers[event];
+                    if (handler && event !== 'event_batch' && event !== 'state_resume') handler(data);
+                }
+                if (seq != null) this.lastSeq = seq;
+            });
+            flushActivities();
+        };
+        handlers['event_batch'] = (batch) => {
+            if (!batch || !Array.isArray(batch.events)) return;
+            if (batch.epoch && this.stateEpoch && batch.epoch !== this.stateEpoch) return;
+            replayEvents(batch.events);
+        };
+        handlers['state_resume'] = (resume) => {
+            if (!resume || !Array.isArray(resume.events)) return;
+            this.stateEpoch = resume.epoch;
+            // Every missed event is applied (activity items unthrottled) before lastSeq moves to the log head
+            replayEvents(resume.events);
+            this.lastSeq = resume.seq;
+        };
+        return handlers;
+    }
+    
+    startEventStream() {
+        // Fallback when WebSockets are unavailable: one long-lived SSE connection instead of polling
+        if (this.eventSource) return;
+        if (typeof EventSource === 'undefined') {
             this.startHttpPolling();
+            return;
+        }
+        
+        let url = '/api/stream';
+        if (this.stateEpoch && this.lastSeq != null) {
+            url += `?last_event_id=${encodeURIComponent(`${this.stateEpoch}:${this.lastSeq}`)}`;
+        }
+        this.eventSource = new EventSource(url);
+        this.addActivityItem('FALLBACK', 'Using server-sent events for updates', 'warning');
+        
+        const handlers = this.buildEventHandlers();
+        Object.entries(handlers).forEach(([event, handler]) => {
+            this.eventSource.addEventListener(event, (message) => {
+                // Event ids are "epoch:seq"; skip anything the dashboard has already applied
+                const [epoch, seqText] = (message.lastEventId || '').split(':');
+                const seq = seqText ? parseInt(seqText, 10) : null;
+                if (event !== 'initial_state' && seq != null && epoch === this.stateEpoch &&
+                    this.lastSeq != null && seq <= this.lastSeq) return;
+                handler(JSON.parse(message.data));
+                if (seq != null) {
+                    this.stateEpoch = epoch;
+                    this.lastSeq = seq;
+                }
+            });
+        });
+        
+        this.eventSource.onerror = () => {
+            // EventSource retries on its own; only a closed stream needs the polling fallback
+            if (this.eventSource && this.eventSource.readyState === EventSource.CLOSED) {
+                this.stopEventStream();
+                this.startHttpPolling();
+            }
+        };
+    }
+    
+    stopEventStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+    
+    stopFallbackUpdates() {
+        this.stopEventStream();
+        if (this.httpPollingInterval) {
+            clearInterval(this.httpPollingInterval);
+            this.httpPollingInterval = null;
         }
     }
     
@@ -226,7 +363,27 @@ class SignalSliceMonitor {
         }
     }
     
+    buildSocketQuery() {
+        const query = { protocol: SOCKET_PROTOCOL_VERSION };
+        if (this.stateEpoch && this.lastSeq != null) {
+            query.epoch = this.stateEpoch;
+            query.last_seq = this.lastSeq;
+        }
+        return query;
+    }
+    
     handleInitialState(data) {
+        // A snapshot after a previous sync replaces the feed instead of appending to it
+        const isResync = this.lastSeq != null;
+        if (data.epoch) {
+            this.stateEpoch = data.epoch;
+            this.lastSeq = data.seq;
+        }
+        if (isResync) {
+            const activityList = document.getElementById('activity-feed');
+            if (activityList) activityList.innerHTML = '';
+        }
+        
         // Update dashboard with real initial state
         this.pizzaIndex = data.pizza_index;
         this.gayBarIndex = data.gay_bar_index || 6.58;
@@ -292,11 +449,16 @@ class SignalSliceMonitor {
         
         // Clean up chart data if it exists
         if (this.chartData) {
-            if (this.chartData.timestamps.length > this.maxChartPoints) {
-                const excess = this.chartData.timestamps.length - this.maxChartPoints;
+            if (this.chartData.timestamps.length > this.chartData.maxPoints) {
+                const excess = this.chartData.timestamps.length - this.chartData.maxPoints;
                 this.chartData.timestamps.splice(0, excess);
                 this.chartData.values.splice(0, excess);
                 this.chartData.anomalies.splice(0, excess);
+                if (this.chart) {
+                    this.chart.data.labels.splice(0, excess);
+                    this.chart.data.datasets[0].data.splice(0, excess);
+                    this.chart.data.datasets[1].data.splice(0, excess);
+                }
             }
         }
         // Clean up DOM elements if activity feed has too many children
@@ -419,6 +581,61 @@ class SignalSliceMonitor {
             return;
         }
         
+        const activityElement = this.createActivityElement(activity);
+        
+        // PERFORMANCE: Simplified DOM insertion without complex animations
+        activityList.insertBefore(activityElement, activityList.firstChild);
+        
+        // Simple fade-in if animation requested
+        if (animate) {
+            activityElement.style.opacity = '0.5';
+            setTimeout(() => {
+                activityElement.style.opacity = '1';
+            }, 50);
+        }
+        this.trimActivityFeed(activityList, [activity]);
+    }
+    
+    addActivityItemsToFeed(activities) {
+        // Oldest first, as they were emitted; built off-DOM and inserted with a single operation
+        const activityList = document.getElementById('activity-feed');
+        if (!activityList || !activities.length) {
+            return;
+        }
+        // A long resume delta replaces the whole feed; only build the items that will stay
+        activities = activities.slice(-this.maxActivityItems);
+        const fragment = document.createDocumentFragment();
+        activities.forEach(activity => {
+            fragment.insertBefore(this.createActivityElement(activity), fragment.firstChild);
+        });
+        activityList.insertBefore(fragment, activityList.firstChild);
+        this.trimActivityFeed(activityList, activities);
+    }
+    
+    trimActivityFeed(activityList, added) {
+        // MEMORY OPTIMIZATION: Keep only limited items and clean up efficiently
+        while (activityList.children.length > this.maxActivityItems) {
+            const lastChild = activityList.lastChild;
+            if (lastChild) {
+                // Remove immediately without animation to save memory
+                lastChild.parentNode.removeChild(lastChild);
+            }
+        }
+        
+        // MEMORY: Store in activity data array with strict limits
+        added.forEach(activity => this.activityData.unshift(activity));
+        if (this.activityData.length > this.maxActivityItems) {
+            // Use splice instead of slice to modify in-place
+            this.activityData.splice(this.maxActivityItems);
+        }
+        
+        // Auto-scroll to top if user is near top
+        if (activityList.scrollTop < 50) {
+            activityList.scrollTop = 0;
+        }
+    }
+    
+    createActivityElement(activity) {
         const activityElement = document.createElement('div');
         activityElement.className = `activity-item activity-${activity.level}`;
         
@@ -525,37 +742,7 @@ class SignalSliceMonitor {
           if (borderStyle) {
             activityElement.style.cssText += borderStyle;
         }
-        
-        // PERFORMANCE: Simplified DOM insertion without complex animations
-        activityList.insertBefore(activityElement, activityList.firstChild);
-        
-        // Simple fade-in if animation requested
-        if (animate) {
-            activityElement.style.opacity = '0.5';
-            setTimeout(() => {
-                activityElement.style.opacity = '1';
-            }, 50);
-        }
-          // MEMORY OPTIMIZATION: Keep only limited items and clean up efficiently
-        while (activityList.children.length > this.maxActivityItems) {
-            const lastChild = activityList.lastChild;
-            if (lastChild) {
-                // Remove immediately without animation to save memory
-                lastChild.parentNode.removeChild(lastChild);
-            }
-        }
-        
-        // MEMORY: Store in activity data array with strict limits
-        this.activityData.unshift(activity);
-        if (this.activityData.length > this.maxActivityItems) {
-            // Use splice instead of slice to modify in-place
-            this.activityData.splice(this.maxActivityItems);
-        }
-        
-        // Auto-scroll to top if user is near top
-        if (activityList.scrollTop < 50) {
-            activityList.scrollTop = 0;
-        }
+        return activityElement;
     }
     
     updateLastScanTime() {
@@ -806,6 +993,15 @@ class SignalSliceMonitor {
                     pointBackgroundColor: '#3b82f6',
                     pointBorderColor: '#2563eb',
                     pointHoverRadius: 5
+                }, {
+                    // Threshold line: one point per Pizza Index point, kept the same length
+                    label: 'Threshold',
+                    data: [this.chartThreshold],
+                    borderColor: '#ef4444',
+                    borderDash: [5, 5],
+                    borderWidth: 1,
+                    fill: false,
+                    pointRadius: 0
                 }]
             },
             options: {
@@ -839,6 +1035,40 @@ class SignalSliceMonitor {
                 }
             }
         });
+        
+        this.loadIndexHistory(this.chartPeriod);
+    }
+    
+    async loadIndexHistory(period) {
+        // Replace the chart with stored history; live updates keep appending after it
+        const hours = this.chartPeriodHours[period] || 24;
+        const from = Math.floor(Date.now() / 1000) - hours * 3600;
+        try {
+            const response = await fetch(`/api/index_history?from=${from}&points=${this.historyPoints}`);
+            if (!response.ok || !this.chart) return;
+            const history = await response.json();
+            const points = (history.series && history.series.pizza_index && history.series.pizza_index.points) || [];
+            if (points.length === 0) return;
+            
+            const timestamps = points.map(([ts]) => new Date(ts * 1000));
+            const values = points.map(([, value]) => value);
+            this.chartData.timestamps = timestamps;
+            this.chartData.values = values;
+            this.chartData.anomalies = values.map(() => false);
+            // Room for the history plus the usual window of live points
+            this.chartData.maxPoints = points.length + this.maxChartPoints;
+            
+            this.chart.data.labels = timestamps.map(time => hours > 24
+                ? `${time.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })} ${this.formatTimeLabel(time)}`
+                : this.formatTimeLabel(time));
+            this.chart.data.datasets[0].data = values.slice();
+            this.chart.data.datasets[0].pointRadius = points.length > 60 ? 0 : 3;
+            // The threshold line spans the whole loaded history, whatever the point count
+            this.chart.data.datasets[1].data = values.map(() => this.chartThreshold);
+            this.chart.update('none');
+        } catch (error) {
+            console.error('Failed to load index history:', error);
+        }
     }
       formatTimeLabel(timestamp) {
         return timestamp.toLocaleTimeString('en-US', { 
@@ -860,6 +1090,7 @@ class SignalSliceMonitor {
         // Update chart data
         this.chart.data.labels.push(timeLabel);
         this.chart.data.datasets[0].data.push(newValue);
+        this.chart.data.datasets[1].data.push(this.chartThreshold);
         
         // MEMORY OPTIMIZATION: Keep only the last maxPoints with efficient cleanup
         if (this.chartData.timestamps.length > this.chartData.maxPoints) {
@@ -870,6 +1101,7 @@ class SignalSliceMonitor {
             this.chartData.anomalies.splice(0, removeCount);
             this.chart.data.labels.splice(0, removeCount);
             this.chart.data.datasets[0].data.splice(0, removeCount);
+            this.chart.data.datasets[1].data.splice(0, removeCount);
         }
         
         // PERFORMANCE: Reduced chart update animation
@@ -893,32 +1125,6 @@ class SignalSliceMonitor {
         }
     }
     
-    generateTimeLabels(count) {
-        const labels = [];
-        const now = new Date();
-        
-        for (let i = count - 1; i >= 0; i--) {
-            const time = new Date(now.getTime() - i * 60000);
-            labels.push(time.toLocaleTimeString('en-US', { 
-                hour12: false, 
-                hour: '2-digit', 
-                minute: '2-digit' 
-            }));
-        }
-        
-        return labels;
-    }
-    generateChartData(count) {
-        const data = [];
-        const baseValue = 3.42; // Start near current index
-        for (let i = 0; i < count; i++) {
-            let value = baseValue + (Math.random() - 0.5) * 2;
-            if (i > count - 4 && Math.random() > 0.7) value += Math.random() * 3; // Recent activity
-            data.push(Math.max(0, value));
-        }
-        return data;
-    }
-    
       initializeMap() {
         const mapElement = document.getElementById('surveillance-map');
         if (!mapElement) {
@@ -1126,25 +1332,8 @@ class SignalSliceMonitor {
     }
     updateChartPeriod(period) {
         if (!this.chart) return;
-        let labelCount, dataCount;
-        switch (period) {
-            case '1h':
-                labelCount = dataCount = 60;
-                break;
-            case '6h':
-                labelCount = dataCount = 72;
-                break;
-            case '24h':
-                labelCount = dataCount = 96;
-                break;
-            default:
-                labelCount = dataCount = 20;
-        }
-        
-        this.chart.data.labels = this.generateTimeLabels(labelCount);
-        this.chart.data.datasets[0].data = this.generateChartData(dataCount);
-        this.chart.data.datasets[1].data = Array(dataCount).fill(5);
-        this.chart.update();
+        this.chartPeriod = period;
+        this.loadIndexHistory(period);
     }
     
     
@@ -1355,6 +1544,7 @@ class SignalSliceMonitor {
         if (this.httpPollingInterval) {
             clearInterval(this.httpPollingInterval);
         }
+        this.stopEventStream();
         
         // Destroy chart
         if (this.chart) {
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the baseline service and learned baseline engine
+"""
+
+import json
+import os
+import statistics
+import tempfile
+from services.baseline_service import BaselineService
+from services.baseline_engine import BaselineEngine
+from services.baseline_artifact import BaselineArtifactStore
+
+
+def test_baseline_service_hot_reload():
+    """Baseline lookups should pick up a rewritten file"""
+    print("\n=== Testing Baseline Service Reload ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline.json")
+        with open(path, "w") as f:
+            json.dump({"Monday": {"12": 55, "24": 5}}, f)
+
+        service = BaselineService(path, check_interval=0)
+        assert service.expected("any", "Monday", 12) == 55.0
+        assert service.expected("any", "Monday", "24") == 5.0
+        assert service.expected("any", "Tuesday", 12) is None
+
+        with open(path, "w") as f:
+            json.dump({"Monday": {"12": 60},
+                       "venues": {"https://maps.app.goo.gl/a": {"Monday": {"12": 80}}}}, f)
+        os.utime(path, ns=(1, 1))
+
+        assert service.expected("https://maps.app.goo.gl/b", "Monday", 12) == 60.0
+        assert service.expected("https://maps.app.goo.gl/a", "Monday", 12) == 80.0
+        print("✅ Baseline reloaded after file change")
+
+
+def test_engine_running_statistics():
+    """Learned slots should track mean, variance and quantiles"""
+    print("\n=== Testing Baseline Engine Statistics ===")
+    values = [20, 25, 30, 35, 40, 45, 50]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = BaselineEngine(os.path.join(tmp, "stats.bin"), min_samples=3)
+        readings = [{"restaurant_url": "https://maps.app.goo.gl/a", "weekday": "Friday",
+                     "hour_24": 0, "busyness_percent": v} for v in values]
+        readings.append({"restaurant_url": "https://maps.app.goo.gl/a", "weekday": "Friday",
+                         "hour_24": 0, "busyness_percent": None})
+
+        assert engine.observe_batch(readings) == len(values)
+        slot = engine.stats("https://maps.app.goo.gl/a", "Friday", 24)
+        assert slot.count == len(values)
+        assert abs(slot.mean - statistics.mean(values)) < 1e-9
+        assert abs(slot.variance - statistics.variance(values)) < 1e-9
+        assert 30 <= slot.quantile(0.5) <= 40
+        assert engine.expected("https://maps.app.goo.gl/a", "Friday", 24) == slot.mean
+        assert engine.expected("https://maps.app.goo.gl/a", "Friday", 23) is None
+        print(f"✅ mean={slot.mean:.1f} std={slot.std:.1f} p50≈{slot.quantile(0.5):.1f}")
+
+
+def test_engine_persistence_round_trip():
+    """Saved statistics should load back unchanged"""
+    print("\n=== Testing Baseline Engine Persistence ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stats.bin")
+        engine = BaselineEngine(path, min_samples=1)
+        for v in (10, 20, 30):
+            engine.observe("https://maps.app.goo.gl/a", "Monday", 12, v)
+        engine.observe("https://maps.app.goo.gl/b", "Sunday", 24, 70)
+        engine.save()
+
+        reloaded = BaselineEngine(path, min_samples=1)
+        assert len(reloaded) == 2
+        slot = reloaded.stats("https://maps.app.goo.gl/a", "Monday", 12)
+        original = engine.stats("https://maps.app.goo.gl/a", "Monday", 12)
+        assert (slot.count, slot.mean, slot.m2) == (original.count, original.mean, original.m2)
+        assert list(slot.histogram) == list(original.histogram)
+        assert reloaded.expected("https://maps.app.goo.gl/b", "Sunday", 24) == 70.0
+        print(f"✅ {len(reloaded)} slots persisted in {os.path.getsize(path)} bytes")
+
+
+def test_compiled_artifact_feeds_detector():
+    """Compiled median/MAD baselines should round-trip through the artifact into the baseline matrix"""
+    print("\n=== Testing Compiled Baseline Artifact ===")
+    from script.compile_baselines import compile_baselines, group_by_venue
+    from services.baseline_artifact import write_artifact
+    from services.batch_detector import BatchAnomalyDetector, SOURCE_COMPILED, SOURCE_GLOBAL
+
+    url = "https://maps.app.goo.gl/a"
+    values = [20, 22, 24, 26, 90]
+    grouped = group_by_venue([url] * 6, [5] * 5 + [1], [12] * 5 + [9], values + [50])
+    venues, data = compile_baselines(grouped, workers=2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "artifact.bin")
+        write_artifact(path, venues, data)
+        store = BaselineArtifactStore(path, check_interval=0)
+        artifact = store.current()
+        slot = artifact.lookup(url, "Friday", 12)
+        assert slot['median'] == statistics.median(values) and slot['count'] == 5
+        assert slot['mad'] == 2.0
+        assert artifact.lookup(url, "Monday", 9)['count'] == 1
+        assert artifact.lookup(url, "Sunday", 9) is None
+
+        baseline_path = os.path.join(tmp, "baseline.json")
+        with open(baseline_path, "w") as f:
+            json.dump({"Friday": {"12": 60}}, f)
+        engine = BaselineEngine(os.path.join(tmp, "stats.bin"), min_samples=4)
+        detector = BatchAnomalyDetector(BaselineService(baseline_path, check_interval=0), engine, store)
+        matrix = detector.baseline_matrix([url, "https://maps.app.goo.gl/b"])
+        assert matrix.mean[0, 5, 12] == 24.0 and matrix.source[0, 5, 12] == SOURCE_COMPILED
+        assert not matrix.learned[0, 5, 12]  # compiled from history, not the running baselines
+        assert abs(matrix.std[0, 5, 12] - 2.0 * 1.4826) < 1e-4
+        assert matrix.mean[1, 5, 12] == 60.0 and matrix.source[1, 5, 12] == SOURCE_GLOBAL
+    print(f"✅ Artifact median={slot['median']}, MAD={slot['mad']}")
+
+
+def main():
+    """Run all baseline tests"""
+    print("🧪 Running SignalSlice Baseline Tests")
+    print("=" * 50)
+
+    test_baseline_service_hot_reload()
+    test_engine_running_statistics()
+    test_engine_persistence_round_trip()
+    test_compiled_artifact_feeds_detector()
+
+    print("\n✅ All baseline tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,762 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for real-time dashboard delivery
+"""
+
+from flask import Flask, request
+from flask_socketio import SocketIO, join_room
+from services.emission_coalescer import EmissionCoalescer, protocol_room
+from services.state_log import StateLog
+from services.sse_stream import event_stream
+from services.shared_state import SqliteBackend, StateReplicator
+from services.scanner_ipc import ScannerIpcServer, IpcEmitter, ScannerLink
+from services.index_history import IndexHistoryStore, lttb
+from services.connection_tracker import ConnectionTracker, RATE_LIMITED, SERVER_FULL
+from services.scan_executor import ScanExecutor, STARTED, JOINED, FRESH, IDLE, RUNNING
+
+
+def _make_socket_app():
+    """Minimal Flask-SocketIO app that places clients by announced protocol"""
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading')
+
+    @socketio.on('connect')
+    def handle_connect():
+        join_room(protocol_room(request.args.get('protocol')))
+
+    return app, socketio
+
+
+def test_coalescer_batches_in_order():
+    """Batched clients get one ordered frame; legacy clients get the same events individually"""
+    print("\n=== Testing Emission Coalescer ===")
+    app, socketio = _make_socket_app()
+    coalescer = EmissionCoalescer(socketio, window=60)
+    batched = socketio.test_client(app, query_string='protocol=2')
+    legacy = socketio.test_client(app)
+
+    coalescer.emit('scanning_start')
+    coalescer.emit('activity_update', {'message': 'one'})
+    coalescer.emit('pizza_index_update', {'value': 4.0, 'change': 5.0})
+    coalescer.emit('activity_update', {'message': 'two'})
+    coalescer.emit('pizza_index_update', {'value': 4.0, 'change': 0})
+    coalescer.emit('gay_bar_index_update', {'value': 6.0, 'change': 1.0})
+    coalescer.emit('gay_bar_index_update', {'value': 5.5, 'change': -8.0})
+    assert coalescer.flush() == 5
+
+    frames = batched.get_received()
+    assert [frame['name'] for frame in frames] == ['event_batch']
+    batch = frames[0]['args'][0]
+    assert batch['v'] == 2
+    assert [e['event'] for e in batch['events']] == [
+        'scanning_start', 'activity_update', 'pizza_index_update', 'activity_update', 'gay_bar_index_update']
+    assert batch['events'][2]['data']['change'] == 5.0
+    assert batch['events'][4]['data']['value'] == 5.5
+
+    legacy_events = legacy.get_received()
+    assert [frame['name'] for frame in legacy_events] == [e['event'] for e in batch['events']]
+    assert coalescer.flush() == 0
+    print(f"✅ {coalescer.events_sent} events in {coalescer.frames_sent} frame")
+
+
+def test_state_log_deltas_and_snapshots():
+    """The log should replay missed events while they are retained and fall back to snapshots"""
+    print("\n=== Testing State Log ===")
+    log = StateLog(capacity=3)
+    for i in range(5):
+        log.append('activity_update', {'message': str(i)})
+
+    assert [e['seq'] for e in log.since(3)] == [4, 5]
+    assert log.since(5) == [] and log.since(1) is None and log.since(9) is None
+
+    snapshot = lambda: {'pizza_index': 3.0}
+    delta = log.resume(log.epoch, "2", snapshot)
+    assert delta['type'] == 'delta' and [e['seq'] for e in delta['events']] == [3, 4, 5]
+    assert log.resume(log.epoch, "5", snapshot) == {'type': 'delta', 'epoch': log.epoch, 'seq': 5, 'events': []}
+    assert log.resume(log.epoch, "1", snapshot)['type'] == 'snapshot'
+    assert log.resume("old-process", "5", snapshot)['type'] == 'snapshot'
+    assert log.resume(None, None, snapshot) == {'type': 'snapshot', 'epoch': log.epoch, 'seq': 5, 'state': {'pizza_index': 3.0}}
+    print(f"✅ Log keeps {len(log)} events up to seq {log.seq}")
+
+
+def test_reconnect_resumes_from_last_seq():
+    """A reconnecting dashboard should get only the events it missed"""
+    print("\n=== Testing Reconnect Resume ===")
+    import app as dashboard
+
+    first = dashboard.socketio.test_client(dashboard.app, query_string='protocol=2')
+    initial = next(f['args'][0] for f in first.get_received() if f['name'] == 'initial_state')
+    epoch, seq = initial['epoch'], initial['seq']
+    first.disconnect()
+
+    dashboard.add_activity_item('SYSTEM', 'missed while offline', 'normal')
+    dashboard.emission_coalescer.flush()
+
+    resumed = dashboard.socketio.test_client(dashboard.app, query_string=f'protocol=2&epoch={epoch}&last_seq={seq}')
+    frames = resumed.get_received()
+    resume = next(f['args'][0] for f in frames if f['name'] == 'state_resume')
+    assert not any(f['name'] == 'initial_state' for f in frames)
+    assert resume['events'][0]['seq'] == seq + 1
+    assert any(e['data']['message'] == 'missed while offline' for e in resume['events'])
+
+    stale = dashboard.socketio.test_client(dashboard.app, query_string='protocol=2&epoch=old-process&last_seq=1')
+    assert any(f['name'] == 'initial_state' for f in stale.get_received())
+    resumed.disconnect()
+    stale.disconnect()
+    print(f"✅ Resumed with {len(resume['events'])} events after seq {seq}")
+
+
+def test_api_responses_revalidate_with_etags():
+    """Polled endpoints should answer 304 until the state they depend on changes"""
+    print("\n=== Testing API Response Cache ===")
+    import app as dashboard
+    client = dashboard.app.test_client()
+
+    status = client.get('/api/status')
+    feed = client.get('/api/activity_feed')
+    assert status.status_code == 200 and status.headers['ETag'].startswith('"')
+    assert 'must-revalidate' in status.headers['Cache-Control']
+    assert client.get('/api/status', headers={'If-None-Match': status.headers['ETag']}).status_code == 304
+
+    dashboard.dashboard_state['scanning'] = not dashboard.dashboard_state['scanning']
+    changed = client.get('/api/status', headers={'If-None-Match': status.headers['ETag']})
+    assert changed.status_code == 200 and changed.headers['ETag'] != status.headers['ETag']
+    assert changed.get_json()['scanning'] == dashboard.dashboard_state['scanning']
+    # The feed does not depend on the scanning flag
+    assert client.get('/api/activity_feed', headers={'If-None-Match': feed.headers['ETag']}).status_code == 304
+
+    dashboard.add_activity_item('SYSTEM', 'feed changed', 'normal')
+    refreshed = client.get('/api/activity_feed', headers={'If-None-Match': feed.headers['ETag']})
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()['activity_feed'][0]['message'] == 'feed changed'
+    dashboard.dashboard_state['scanning'] = False
+
+    # Concurrent writers must each advance the version
+    import threading
+    from services.response_cache import VersionedState
+    state = VersionedState()
+    writers = [threading.Thread(target=lambda i=i: [state.__setitem__(i, n) for n in range(2000)]) for i in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert state.version == 8000 and state.key_version(0, 1, 2, 3) == 8000
+    print(f"✅ Cache hits={dashboard.api_cache.hits}, misses={dashboard.api_cache.misses}")
+
+
+def test_event_stream_snapshot_resume_and_heartbeat():
+    """SSE clients should get a snapshot, or only missed events when they send Last-Event-ID"""
+    print("\n=== Testing Server-Sent Events Stream ===")
+    log = StateLog(capacity=10)
+    snapshot = lambda: {'pizza_index': 3.0}
+    log.append('activity_update', {'message': 'one'})
+
+    fresh = list(event_stream(log, snapshot, heartbeat=0.01, max_frames=3))
+    assert fresh[0].startswith('retry: ')
+    assert fresh[1].startswith(f'id: {log.epoch}:1\nevent: initial_state\n')
+    assert '"pizza_index":3.0' in fresh[1]
+    assert fresh[2] == ': heartbeat\n\n'
+
+    log.append('activity_update', {'message': 'two'})
+    log.append('scanning_start')
+    resumed = list(event_stream(log, snapshot, last_event_id=f'{log.epoch}:1', heartbeat=0.01, max_frames=3))
+    assert resumed[1] == f'id: {log.epoch}:2\nevent: activity_update\ndata: {{"message":"two"}}\n\n'
+    assert resumed[2] == f'id: {log.epoch}:3\nevent: scanning_start\ndata: null\n\n'
+
+    stale = list(event_stream(log, snapshot, last_event_id='old-process:2', heartbeat=0.01, max_frames=2))
+    assert 'event: initial_state' in stale[1]
+
+    import app as dashboard
+    response = dashboard.app.test_client().get('/api/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    response.close()
+    print(f"✅ Resumed stream replayed {len(resumed) - 1} events")
+
+
+def test_followers_mirror_the_leader():
+    """A follower process should mirror the leader's log and state and forward its commands"""
+    print("\n=== Testing Shared State Replication ===")
+    import os
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), 'shared.db')
+    nodes, promotions = [], []
+    for name in ('leader', 'follower'):
+        state, commands, log = {'pizza_index': 0.0}, [], StateLog()
+        backend = SqliteBackend(path, poll_interval=60)
+        replicator = StateReplicator(backend, log, export_state=lambda state=state: dict(state),
+                                     import_state=state.update, on_command=commands.append,
+                                     on_promote=lambda name=name, state=state: promotions.append((name, dict(state))))
+        replicator.start()
+        nodes.append((replicator, backend, log, state, commands))
+    (leader, leader_db, leader_log, leader_state, leader_commands), \
+        (follower, follower_db, follower_log, follower_state, _) = nodes
+    assert leader.is_leader and not follower.is_leader
+    assert promotions == [('leader', {'pizza_index': 0.0})]
+
+    leader_state['pizza_index'] = 4.2
+    seq = leader_log.append('pizza_index_update', {'value': 4.2})
+    leader.publish_frame({'epoch': leader_log.epoch, 'seq': seq,
+                          'events': [{'event': 'pizza_index_update', 'data': {'value': 4.2}, 'seq': seq}]})
+    assert follower_db.poll() == 1
+    assert follower_state['pizza_index'] == 4.2
+    assert (follower_log.epoch, follower_log.seq) == (leader_log.epoch, seq)
+
+    assert follower.send_command('manual_scan') and not leader.send_command('manual_scan')
+    leader_db.poll()
+    assert [c['command'] for c in leader_commands] == ['manual_scan']
+
+    # Leadership moves once the old leader lets its lease go
+    leader.stop()
+    assert follower.renew() and follower.is_leader
+    # The new leader is told after importing the last published state, so it can take over the scanner
+    assert promotions[1:] == [('follower', {'pizza_index': 4.2})]
+    follower.stop()
+
+    # A promoted dashboard process does not inherit a scan it is not running
+    import app as dashboard
+    saved = {key: dashboard.dashboard_state[key] for key in ('scanning', 'scanner_running')}
+    dashboard.dashboard_state.update(scanning=True, scanner_running=False)
+    try:
+        dashboard.handle_promotion()
+        assert dashboard.dashboard_state['scanning'] is False
+    finally:
+        dashboard.dashboard_state.update(saved)
+    print(f"✅ Follower mirrored seq {follower_log.seq} and took over leadership")
+
+
+def test_scanner_daemon_ipc():
+    """The web side should get the daemon's state and events, and the daemon the web's commands"""
+    print("\n=== Testing Scanner Daemon IPC ===")
+    import os
+    import tempfile
+    import threading
+    state = {'pizza_index': 3.0, 'scanning': False}
+    commands, messages = [], []
+    command_received, event_received = threading.Event(), threading.Event()
+
+    def on_command(message):
+        commands.append(message['command'])
+        command_received.set()
+
+    def on_message(message):
+        messages.append(message)
+        if message['type'] == 'event':
+            event_received.set()
+
+    server = ScannerIpcServer(os.path.join(tempfile.mkdtemp(), 'scanner.sock'),
+                              on_command=on_command, snapshot=lambda: dict(state))
+    link = ScannerLink(server.path, on_message=on_message, reconnect_delay=0.05)
+    assert not link.send_command('manual_scan')
+    server.start()
+    link.start()
+    assert link.wait_connected(5)
+
+    assert link.send_command('manual_scan') and command_received.wait(5)
+    assert commands == ['manual_scan']
+
+    state['pizza_index'] = 4.5
+    IpcEmitter(server).emit('pizza_index_update', {'value': 4.5})
+    assert event_received.wait(5)
+    assert messages[0] == {'type': 'state', 'state': {'pizza_index': 3.0, 'scanning': False}}
+    assert messages[-1]['event'] == 'pizza_index_update' and messages[-1]['state']['pizza_index'] == 4.5
+
+    # A web process that stops reading is dropped instead of blocking the publishing scanner thread
+    import socket
+    import time
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(server.path)
+    deadline = time.time() + 5
+    while server.client_count < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    list(server._clients.values())[-1]._queue.maxsize = 4  # the stalled client's outbox
+    started = time.time()
+    for _ in range(200):
+        IpcEmitter(server).emit('activity_update', {'message': 'x' * 10000})
+    assert time.time() - started < 5 and server.client_count == 1
+    stalled.close()
+
+    link.stop()
+    server.stop()
+    print(f"✅ Relayed {len(messages)} messages and {len(commands)} command")
+
+
+def test_state_manager_snapshots_are_immutable():
+    """Readers get stable snapshots; observers run after the write, off the writer's lock"""
+    print("\n=== Testing Copy-on-write State ===")
+    import threading
+    from state_manager import StateManager
+    manager = StateManager()
+    before = manager.get_state()
+    seen = []
+
+    def observer(key, value):
+        # Would deadlock if called while the writer still held its lock
+        seen.append((key, value, manager.get(key if key != 'scan_stats' else 'scan_count')))
+
+    manager.register_observer(observer)
+    manager.update_pizza_index(5.0, 10.0)
+    manager.add_activity('SCAN', 'snapshot test')
+    manager.increment_scan_count()
+    manager.join_observers()
+
+    assert before['pizza_index'] != 5.0 and manager.get('pizza_index') == 5.0
+    assert manager.get_state() is not before and manager.version == 3
+    assert manager.get('activity_feed')[0]['message'] == 'snapshot test'
+    try:
+        manager.get_state()['pizza_index'] = 1.0
+        assert False, "snapshots should be read-only"
+    except TypeError:
+        pass
+    assert [key for key, _, _ in seen] == ['pizza_index', 'activity_feed', 'scan_stats']
+    assert seen[0][1] == {'value': 5.0, 'change': 10.0, 'old_value': before['pizza_index']}
+
+    writers = [threading.Thread(target=lambda: [manager.increment_anomaly_count() for _ in range(200)])
+               for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert manager.get('anomaly_count') == 800
+    print(f"✅ {manager.version} versions published, {len(seen)} notifications delivered")
+
+
+def test_index_history_downsamples_long_ranges():
+    """History queries should read pre-aggregated buckets and keep spikes through LTTB"""
+    print("\n=== Testing Index History ===")
+    import os
+    import tempfile
+    series = [(float(t), 5.0) for t in range(1000)]
+    series[500] = (500.0, 9.5)
+    sampled = lttb(series, 50)
+    assert len(sampled) == 50 and sampled[0] == series[0] and sampled[-1] == series[-1]
+    assert (500.0, 9.5) in sampled
+
+    store = IndexHistoryStore(os.path.join(tempfile.mkdtemp(), 'history.db'))
+    end = 1_700_000_000.0
+    for step in range(3 * 24 * 12):  # three days of five-minute updates
+        timestamp = end - step * 300
+        store.record('pizza_index', 9.0 if step == 100 else 4.0, timestamp)
+
+    recent, resolution = store.query('pizza_index', end - 3600, end, 100)
+    assert resolution == 0 and len(recent) == 13
+    day, resolution = store.query('pizza_index', end - 86400, end, 50)
+    assert resolution == 900 and len(day) == 50
+    assert max(value for _, value in day) > 4.0
+    week = store.history(end - 7 * 86400, end, 100)
+    assert week['pizza_index']['resolution'] == 3600 and len(week['pizza_index']['points']) == 73
+    assert week['gay_bar_index']['points'] == []
+
+    import app as dashboard
+    client = dashboard.app.test_client()
+    assert client.get('/api/index_history?points=1').status_code == 400
+    assert client.get('/api/index_history?from=2024-01-02&to=2024-01-01').status_code == 400
+    ok = client.get('/api/index_history?points=50').get_json()
+    assert set(ok['series']) == {'pizza_index', 'gay_bar_index'}
+    print(f"✅ 24h at {len(day)} points from 900s buckets; 7d from hourly buckets")
+
+
+def test_responses_are_compressed_when_accepted():
+    """Large JSON responses should be gzip-encoded per client, with an ETag per encoding"""
+    print("\n=== Testing Response Compression ===")
+    import gzip
+    import json
+    import app as dashboard
+    client = dashboard.app.test_client()
+    for i in range(10):
+        dashboard.add_activity_item('SYSTEM', f'🍕 compression test item {i} with a long message', 'normal')
+
+    plain = client.get('/api/status')
+    encoded = client.get('/api/status', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert encoded.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in encoded.headers['Vary']
+    assert json.loads(gzip.decompress(encoded.data)) == plain.get_json()
+    assert len(encoded.data) < len(plain.data)
+    assert encoded.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    revalidated = client.get('/api/status', headers={'Accept-Encoding': 'gzip', 'If-None-Match': encoded.headers['ETag']})
+    assert revalidated.status_code == 304
+
+    page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert page.headers['Content-Encoding'] == 'gzip' and b'socket.io.js' in gzip.decompress(page.data)
+    print(f"✅ /api/status {len(plain.data)} → {len(encoded.data)} bytes gzip")
+
+
+def test_asset_build_fingerprints_and_precompresses():
+    """Built assets get content-hashed names, .gz variants and a manifest the templates resolve"""
+    print("\n=== Testing Asset Pipeline ===")
+    import gzip
+    import os
+    import tempfile
+    from flask import Flask
+    from script.build_assets import build_assets, minify_js
+    from services.assets import AssetManifest
+
+    assert minify_js("  const url = 'http://x'; // keep\n\n  // drop\n  let a = 1; // drop\n") == \
+        "const url = 'http://x'; // keep\nlet a = 1;\n"
+
+    static_dir = tempfile.mkdtemp()
+    with open(os.path.join(static_dir, 'script.js'), 'w') as f:
+        f.write("// header\nfunction hello() {\n    return 'hi'; // greet\n}\n")
+    with open(os.path.join(static_dir, 'style.css'), 'w') as f:
+        f.write("/* theme */\nbody {\n    color: red;\n}\n")
+    manifest = build_assets(static_dir)
+    assert manifest['script.js'].startswith('dist/script.') and manifest['style.css'].endswith('.css')
+    dist_path = os.path.join(static_dir, manifest['style.css'])
+    assert open(dist_path).read() == 'body{color: red}'
+    assert gzip.decompress(open(dist_path + '.gz', 'rb').read()) == b'body{color: red}'
+
+    app = Flask(__name__, static_folder=static_dir, static_url_path='/static')
+    assets = AssetManifest(static_dir)
+    with app.test_request_context():
+        assert assets.url('script.js') == '/static/' + manifest['script.js']
+        assert assets.url('listener.js') == '/static/listener.js'
+    print(f"✅ Built {sorted(manifest.values())}")
+
+
+def test_connection_admission_and_rollup():
+    """Connects are counted, not broadcast; the client cap and per-IP rate are enforced"""
+    print("\n=== Testing Connection Admission ===")
+    tracker = ConnectionTracker(max_clients=3, connects_per_minute=60, burst=2)
+    assert tracker.admit('a', '10.0.0.1') == (None, 0.0)
+    assert tracker.admit('b', '10.0.0.1') == (None, 0.0)
+    reason, retry_after = tracker.admit('c', '10.0.0.1')
+    assert reason == RATE_LIMITED and 0 < retry_after <= 1
+    assert tracker.admit('d', '10.0.0.2')[0] is None
+    assert tracker.admit('e', '10.0.0.3')[0] == SERVER_FULL
+    tracker.release('a')
+    assert tracker.rollup() == {'clients': 2, 'connected': 3, 'disconnected': 1, 'rejected': 2, 'peak': 3}
+    assert tracker.rollup() is None
+
+    # X-Real-IP only identifies the client when a trusted proxy sent it
+    from validation import client_address
+    assert client_address('203.0.113.7', '10.9.9.9', trusted_proxies=()) == '203.0.113.7'
+    assert client_address('127.0.0.1', '10.9.9.9', trusted_proxies=('127.0.0.1',)) == '10.9.9.9'
+    assert client_address('10.0.5.2', '10.9.9.9', trusted_proxies=('10.0.5.0/24',)) == '10.9.9.9'
+    assert client_address('203.0.113.7', '10.9.9.9', trusted_proxies=('127.0.0.1',)) == '203.0.113.7'
+
+    import app as dashboard
+    original = dashboard.connection_tracker
+    dashboard.connection_tracker = ConnectionTracker(max_clients=1, connects_per_minute=60, burst=5)
+    try:
+        dashboard.emission_coalescer.flush()
+        watcher = dashboard.socketio.test_client(dashboard.app, query_string='protocol=2')
+        refused = dashboard.socketio.test_client(dashboard.app, query_string='protocol=2')
+        assert watcher.is_connected() and not refused.is_connected()
+        assert dashboard.app.test_client().get('/api/stream').status_code == 503
+        dashboard.emission_coalescer.flush()
+        frames = watcher.get_received()
+        activity = [e['data'] for f in frames if f['name'] == 'event_batch' for e in f['args'][0]['events']
+                    if e['event'] == 'activity_update']
+        assert not any(a['type'] == 'CONNECT' for a in activity)
+        watcher.disconnect()
+        assert dashboard.connection_tracker.count == 0
+    finally:
+        dashboard.connection_tracker = original
+
+    # The refactored app admits SSE streams the same way and releases them when they end
+    import app_refactored
+    original = app_refactored.connection_tracker
+    app_refactored.connection_tracker = ConnectionTracker(max_clients=1, connects_per_minute=60, burst=5)
+    try:
+        client = app_refactored.app.test_client()
+        stream = client.get('/api/stream', buffered=False)
+        assert stream.status_code == 200 and app_refactored.connection_tracker.count == 1
+        assert client.get('/api/stream').status_code == 503
+        next(iter(stream.response))
+        stream.close()
+        assert app_refactored.connection_tracker.count == 0
+    finally:
+        app_refactored.connection_tracker = original
+    print("✅ Connects rate limited and capped without per-connect broadcasts")
+
+
+def test_scan_executor_joins_and_reuses_scans():
+    """Concurrent scan requests share one scrape; a fresh result is reused instead of scraping again"""
+    import asyncio
+    import threading
+    print("\n=== Testing Scan Executor ===")
+    release = threading.Event()
+    runs = []
+
+    async def scan():
+        runs.append(threading.current_thread().name)
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        return {'run': len(runs)}
+
+    executor = ScanExecutor(scan, freshness_window=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(executor.submit())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(served for _, served in results) == [JOINED] * 7 + [STARTED]
+    assert len({id(future) for future, _ in results}) == 1 and executor.state == RUNNING
+    release.set()
+    assert results[0][0].result(5) == {'run': 1} and executor.state == IDLE
+
+    future, served = executor.submit()
+    assert served == FRESH and future.result() == {'run': 1}
+    future, served = executor.submit(max_age=0)
+    assert served == STARTED and future.result(5) == {'run': 2}
+    assert runs == ['scan-executor', 'scan-executor']
+
+    # A cycle whose scrape failed is a failed cycle: never reused as a fresh result
+    import services.scanner_service as scanner_module
+
+    class Emitter:
+        def emit(self, event, data=None):
+            pass
+
+    async def failing_scrape(on_reading=None):
+        raise TimeoutError("browser did not start")
+
+    original_scrape = scanner_module.scrape_current_hour
+    scanner_module.scrape_current_hour = failing_scrape
+    try:
+        service = scanner_module.ScannerService(emitter=Emitter())
+        future, served = service.request_manual_scan()
+        assert served == STARTED and future.result(30) is None
+        future, served = service.request_manual_scan()
+        assert served == STARTED and future.result(30) is None
+    finally:
+        scanner_module.scrape_current_hour = original_scrape
+    print("✅ 8 concurrent requests ran one scan; a fresh result was reused")
+
+
+def test_metrics_registry_renders_prometheus_text():
+    """Counters, gauges and histograms render in the Prometheus text format, including at /metrics"""
+    import asyncio
+    from services.metrics import MetricsRegistry, instrument_cycle, cycles_total, cycle_seconds
+    print("\n=== Testing Metrics Registry ===")
+    registry = MetricsRegistry(namespace='test')
+    loads = registry.histogram('page_load_seconds', 'Page load', ['venue'], buckets=(0.1, 1))
+    errors = registry.counter('errors_total', 'Errors', ['stage'])
+    clients = registry.gauge('clients', 'Clients')
+    for value in (0.05, 0.5, 3):
+        loads.observe(value, venue='a"b')
+    errors.inc(stage='live')
+    errors.inc(2, stage='live')
+    clients.set(4)
+    clients.dec()
+    assert registry.counter('errors_total', 'Errors', ['stage']) is errors
+
+    text = registry.render()
+    assert '# TYPE test_page_load_seconds histogram' in text
+    assert 'test_page_load_seconds_bucket{venue="a\\"b",le="0.1"} 1' in text
+    assert 'test_page_load_seconds_bucket{venue="a\\"b",le="1"} 2' in text
+    assert 'test_page_load_seconds_bucket{venue="a\\"b",le="+Inf"} 3' in text
+    assert 'test_page_load_seconds_count{venue="a\\"b"} 3' in text
+    assert 'test_errors_total{stage="live"} 3' in text and 'test_clients 3' in text
+
+    @instrument_cycle
+    async def cycle():
+        return {'anomaly_detected': False}
+    before, timed_before = cycles_total.value(outcome='ok'), cycle_seconds.count()
+    asyncio.run(cycle())
+    assert cycles_total.value(outcome='ok') == before + 1 and cycle_seconds.count() == timed_before + 1
+
+    import app as dashboard
+    response = dashboard.app.test_client().get('/metrics')
+    assert response.status_code == 200 and response.content_type.startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    assert 'signalslice_scan_cycles_total{outcome="ok"}' in body and 'signalslice_emits_total{event=' in body
+    print("✅ Metrics rendered in Prometheus text format")
+
+
+def test_trace_spans_nest_per_cycle_and_export():
+    """Phase spans nest under their venue and cycle; finished cycles export as JSONL and feed the slowest view"""
+    import asyncio
+    import json
+    import os
+    import tempfile
+    from services.tracing import Tracer, JsonlExporter, OtlpExporter
+    print("\n=== Testing Trace Spans ===")
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    tracer = Tracer(JsonlExporter(path), recent_traces=2)
+
+    @tracer.traced('scan_cycle')
+    async def cycle(venues):
+        for venue, delay in venues:
+            with tracer.span('venue', venue=venue):
+                with tracer.span('goto'):
+                    await asyncio.sleep(delay)
+                phase = tracer.span('live_check')
+                phase.finish()
+        with tracer.span('emit'):
+            pass
+
+    async def two_cycles():
+        # Concurrent cycles must not adopt each other's spans
+        await asyncio.gather(cycle([('a', 0.03), ('b', 0.001)]), cycle([('c', 0.001)]))
+    asyncio.run(two_cycles())
+
+    with open(path) as f:
+        spans = [json.loads(line) for line in f]
+    traces = {}
+    for span in spans:
+        traces.setdefault(span['trace_id'], []).append(span)
+    assert len(traces) == 2 and sorted(len(t) for t in traces.values()) == [5, 8]
+    for trace in traces.values():
+        by_id = {span['span_id']: span for span in trace}
+        root = next(span for span in trace if span['parent_id'] is None)
+        assert root['name'] == 'scan_cycle' and root is trace[-1]
+        for span in trace:
+            if span['name'] in ('goto', 'live_check'):
+                assert by_id[span['parent_id']]['name'] == 'venue'
+            elif span['name'] in ('venue', 'emit'):
+                assert span['parent_id'] == root['span_id']
+
+    view = tracer.slowest(traces=2, limit=3, name='goto')
+    assert len(view['traces']) == 2 and view['spans'][0]['attributes'] == {}
+    assert view['spans'][0]['duration'] >= 0.03 and len(view['spans']) == 3
+    all_spans = {span['span_id']: span for span in spans}
+    assert all_spans[view['spans'][0]['parent_id']]['attributes'] == {'venue': 'a'}
+
+    with tracer.root('failing') as failing:
+        pass
+    failing.set_error(ValueError('boom'))
+    otlp = OtlpExporter('http://127.0.0.1:4318/v1/traces').encode([failing])
+    encoded = otlp['resourceSpans'][0]['scopeSpans'][0]['spans'][0]
+    assert encoded['name'] == 'failing' and encoded['status'] == {'code': 2, 'message': 'ValueError: boom'}
+
+    # A child finishing after its root is dropped instead of opening a trace that never closes
+    import contextvars
+
+    def finish_out_of_order():
+        root = tracer.root('short_lived')
+        straggler = tracer.span('straggler')
+        root.finish()
+        straggler.finish()
+    contextvars.copy_context().run(finish_out_of_order)
+    assert tracer._open == {} and tracer.current() is None
+
+    import app as dashboard
+    client = dashboard.app.test_client()
+    assert client.get('/api/traces/slowest?traces=2&limit=5').status_code == 200
+    assert client.get('/api/traces/slowest?limit=0').status_code == 400
+    print("✅ Spans nested per cycle, exported as JSONL and ranked by duration")
+
+
+def test_on_demand_profiler_writes_folded_stacks():
+    """An armed profiler records the next cycle; a window samples a running thread; old profiles are pruned"""
+    import asyncio
+    import os
+    import tempfile
+    import threading
+    import time
+    from services.profiler import OnDemandProfiler, IDLE, ARMED
+    from validation import is_admin_request
+    print("\n=== Testing On-demand Profiler ===")
+    directory = tempfile.mkdtemp()
+    profiler = OnDemandProfiler(directory, interval=0.005, keep=1)
+
+    def busy_scrape(seconds):
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            sum(range(1000))
+
+    @profiler.around_cycle
+    async def cycle():
+        busy_scrape(0.2)
+        return {'ok': True}
+
+    asyncio.run(cycle())
+    assert profiler.state == IDLE and profiler.last_profile is None  # not armed: nothing recorded
+    assert profiler.arm_next_cycle()['state'] == ARMED
+    assert asyncio.run(cycle()) == {'ok': True} and profiler.state == IDLE
+    profile = profiler.last_profile
+    assert profile['mode'] == 'cycle' and profile['samples'] > 5
+    with open(profile['path']) as f:
+        lines = f.read().splitlines()
+    assert any('test_realtime.py:busy_scrape' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+    stop = threading.Event()
+    worker = threading.Thread(target=lambda: [busy_scrape(0.01) for _ in iter(stop.is_set, True)])
+    worker.start()
+    try:
+        time.sleep(1.1)  # profiles are named by the second they start
+        profiler.start_window(0.2, thread_id=worker.ident)
+        try:
+            profiler.arm_next_cycle()
+            assert False, "a second session must be refused"
+        except RuntimeError:
+            pass
+        deadline = time.time() + 5
+        while profiler.state != IDLE and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        worker.join()
+    assert profiler.last_profile['mode'] == 'window' and profiler.last_profile['samples'] > 5
+    assert os.listdir(directory) == [os.path.basename(profiler.last_profile['path'])]
+
+    # Without a token: refused unless a trusted proxy vouches for a loopback client
+    assert not is_admin_request(None, '127.0.0.1', admin_token=None, trusted_proxies=())
+    assert not is_admin_request(None, '203.0.113.7', '127.0.0.1', admin_token=None, trusted_proxies=('127.0.0.1',))
+    assert not is_admin_request(None, '127.0.0.1', '203.0.113.7', admin_token=None, trusted_proxies=('127.0.0.1',))
+    assert is_admin_request(None, '127.0.0.1', '127.0.0.1', admin_token=None, trusted_proxies=('127.0.0.1',))
+    assert is_admin_request('s3cret', '203.0.113.7', admin_token='s3cret')
+    assert not is_admin_request('guess', '127.0.0.1', admin_token='s3cret')
+
+    # Under eventlet green threads nothing could be sampled, so in-process sessions are refused
+    import sys
+    import types
+    sys.modules['eventlet.patcher'] = types.SimpleNamespace(is_monkey_patched=lambda module: module == 'thread')
+    try:
+        for start in (profiler.arm_next_cycle, lambda: profiler.start_window(0.1, thread_id=threading.get_ident())):
+            try:
+                start()
+                assert False, "profiling must be refused under eventlet"
+            except RuntimeError as e:
+                assert 'eventlet' in str(e)
+        assert profiler.state == IDLE
+    finally:
+        del sys.modules['eventlet.patcher']
+
+    import functools
+    import app as dashboard
+    client = dashboard.app.test_client()
+    assert client.get('/api/admin/profile').status_code == 403  # no token, no trusted proxy
+    assert client.get('/api/admin/profile', headers={'X-Real-IP': '127.0.0.1'}).status_code == 403
+    authorize = dashboard.is_admin_request
+    dashboard.is_admin_request = functools.partial(authorize, admin_token='s3cret')
+    try:
+        admin = {'X-Admin-Token': 's3cret'}
+        assert client.get('/api/admin/profile', headers=admin).status_code == 200
+        assert client.post('/api/admin/profile?mode=bogus', headers=admin).status_code == 400
+        assert client.get('/api/admin/profile', environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 403
+    finally:
+        dashboard.is_admin_request = authorize
+    print("✅ Profiles written as folded stacks, one session at a time, admin-only")
+
+
+def main():
+    """Run all real-time tests"""
+    print("🧪 Running SignalSlice Real-time Tests")
+    print("=" * 50)
+
+    test_coalescer_batches_in_order()
+    test_state_log_deltas_and_snapshots()
+    test_reconnect_resumes_from_last_seq()
+    test_api_responses_revalidate_with_etags()
+    test_event_stream_snapshot_resume_and_heartbeat()
+    test_followers_mirror_the_leader()
+    test_scanner_daemon_ipc()
+    test_state_manager_snapshots_are_immutable()
+    test_index_history_downsamples_long_ranges()
+    test_responses_are_compressed_when_accepted()
+    test_asset_build_fingerprints_and_precompresses()
+    test_connection_admission_and_rollup()
+    test_scan_executor_joins_and_reuses_scans()
+    test_metrics_registry_renders_prometheus_text()
+    test_trace_spans_nest_per_cycle_and_export()
+    test_on_demand_profiler_writes_folded_stacks()
+
+    print("\n✅ All real-time tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the compact scraped row table
+"""
+
+import csv
+import io
+import os
+import tempfile
+from scraping.records import ScrapedRowTable, SCRAPED_DATA_FIELDNAMES
+
+
+def _sample_rows():
+    """Build rows shaped like the scraper's per-element entries"""
+    rows = []
+    for i, hour in enumerate([6, 7, 0, 1]):
+        rows.append({
+            "scrape_timestamp": "2025-06-27T15:57:11.019415-04:00",
+            "restaurant_url": "https://maps.app.goo.gl/test",
+            "element_index": i,
+            "hour_24": hour,
+            "display_hour": 24 if hour == 0 else hour,
+            "meridiem": "AM",
+            "busyness_percent": None if i == 3 else 10 * i,
+            "raw_aria_label": f"{10 * i}% busy at {hour} AM.",
+            "is_target_hour": i == 1,
+            "target_weekday": "Friday",
+        })
+    return rows
+
+
+def test_round_trip_matches_dict_writer():
+    """Table output should match csv.DictWriter with padded fields"""
+    print("\n=== Testing Scraped Row Table Round Trip ===")
+    rows = _sample_rows()
+
+    expected = io.StringIO()
+    writer = csv.DictWriter(expected, fieldnames=SCRAPED_DATA_FIELDNAMES)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({field: row.get(field) for field in SCRAPED_DATA_FIELDNAMES})
+
+    table = ScrapedRowTable()
+    table.extend(rows)
+    assert len(table) == len(rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rows.csv")
+        written = table.write_csv(path)
+        with open(path, newline='', encoding="utf-8") as f:
+            actual = f.read()
+
+    assert written == len(rows)
+    assert actual == expected.getvalue()
+    print(f"✅ {written} rows written identically to DictWriter output")
+
+
+def test_string_columns_are_shared():
+    """Repeated strings should be stored once per column"""
+    print("\n=== Testing Dictionary Encoding ===")
+    table = ScrapedRowTable()
+    table.extend(_sample_rows() * 50)
+
+    assert len(table._dictionaries["restaurant_url"]) == 1
+    assert len(table._dictionaries["raw_aria_label"]) == 4
+    assert table.column("target_weekday") == ["Friday"] * 200
+    assert table.column("assigned_weekday") == [None] * 200
+    print("✅ Repeated strings dictionary-encoded")
+
+
+def main():
+    """Run all record table tests"""
+    print("🧪 Running SignalSlice Record Table Tests")
+    print("=" * 50)
+
+    test_round_trip_matches_dict_writer()
+    test_string_columns_are_shared()
+
+    print("\n✅ All record table tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,14 @@ Data validation module for SignalSlice
 Provides comprehensive validation for scraped data and API inputs
 """
 
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
 from datetime import datetime
+import hmac
+import ipaddress
 import re
 
+from config import INDEX_HISTORY_CONFIG, TRACING_CONFIG, PROFILER_CONFIG, ADMIN_TOKEN, TRUSTED_PROXIES
+
 # Valid ranges and constants
 VALID_WEEKDAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
 VALID_HOURS_24 = list(range(0, 25))  # 0-24 (24 represents midnight of previous day)
@@ -118,6 +122,21 @@ def validate_timestamp(value: str) -> str:
     except (ValueError, AttributeError):
         raise ValidationError("timestamp", value, "Invalid ISO timestamp format")
 
+def validate_epoch_or_iso(value: Union[str, float, int], field_name: str) -> float:
+    """Parse a time given as Unix seconds or an ISO timestamp into Unix seconds"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = None
+    if seconds is not None:
+        if seconds != seconds or seconds in (float('inf'), float('-inf')):
+            raise ValidationError(field_name, value, "Must be a finite number")
+        return seconds
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        raise ValidationError(field_name, value, "Must be Unix seconds or an ISO timestamp")
+
 def validate_scraped_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Validate a scraped data record
@@ -188,6 +207,52 @@ def validate_api_input(endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
         # No input validation needed
         pass
     
+    elif endpoint == '/api/index_history':
+        now = datetime.now().timestamp()
+        end = validate_epoch_or_iso(data['to'], 'to') if data.get('to') else now
+        start = (validate_epoch_or_iso(data['from'], 'from') if data.get('from')
+                 else end - INDEX_HISTORY_CONFIG['default_range_hours'] * 3600)
+        if start >= end:
+            raise ValidationError("from", data.get('from'), "Must be earlier than 'to'")
+        if end - start > INDEX_HISTORY_CONFIG['max_range_days'] * 86400:
+            raise ValidationError("from", data.get('from'), f"Range is limited to {INDEX_HISTORY_CONFIG['max_range_days']} days")
+        try:
+            points = int(data.get('points') or INDEX_HISTORY_CONFIG['default_points'])
+        except (TypeError, ValueError):
+            raise ValidationError("points", data.get('points'), "Must be an integer")
+        if not 3 <= points <= INDEX_HISTORY_CONFIG['max_points']:
+            raise ValidationError("points", points, f"Must be between 3 and {INDEX_HISTORY_CONFIG['max_points']}")
+        validated = {'from': start, 'to': end, 'points': points}
+    
+    elif endpoint == '/api/traces/slowest':
+        bounds = {
+            'traces': (TRACING_CONFIG['default_view_traces'], TRACING_CONFIG['recent_traces']),
+            'limit': (TRACING_CONFIG['default_view_limit'], 500)
+        }
+        for field, (default, maximum) in bounds.items():
+            try:
+                value = int(data.get(field) or default)
+            except (TypeError, ValueError):
+                raise ValidationError(field, data.get(field), "Must be an integer")
+            if not 1 <= value <= maximum:
+                raise ValidationError(field, value, f"Must be between 1 and {maximum}")
+            validated[field] = value
+        validated['name'] = sanitize_string(data['name'], 50) if data.get('name') else None
+    
+    elif endpoint == '/api/admin/profile':
+        mode = data.get('mode') or 'cycle'
+        if mode not in ('cycle', 'window'):
+            raise ValidationError("mode", mode, "Must be 'cycle' or 'window'")
+        validated['mode'] = mode
+        if mode == 'window':
+            try:
+                seconds = int(data.get('seconds') or PROFILER_CONFIG['default_window'])
+            except (TypeError, ValueError):
+                raise ValidationError("seconds", data.get('seconds'), "Must be an integer")
+            if not 1 <= seconds <= PROFILER_CONFIG['max_window']:
+                raise ValidationError("seconds", seconds, f"Must be between 1 and {PROFILER_CONFIG['max_window']}")
+            validated['seconds'] = seconds
+    
     # Add more endpoint validations as needed
     
     return validated
@@ -251,6 +316,41 @@ def sanitize_string(value: str, max_length: int = 1000) -> str:
     
     return value.strip()
 
+def client_address(remote_addr: Optional[str], real_ip: Optional[str],
+                   trusted_proxies: Tuple[str, ...] = TRUSTED_PROXIES) -> str:
+    """
+    Address of the client behind a request: X-Real-IP (real_ip) only counts when the direct
+    peer is a trusted proxy, since any client can send that header
+    """
+    if real_ip and is_trusted_proxy(remote_addr, trusted_proxies):
+        return real_ip.strip()
+    return remote_addr or 'unknown'
+
+def is_trusted_proxy(remote_addr: Optional[str], trusted_proxies: Tuple[str, ...] = TRUSTED_PROXIES) -> bool:
+    """Whether the direct peer is one of the configured reverse proxies"""
+    try:
+        address = ipaddress.ip_address(remote_addr or '')
+        return any(address in ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies)
+    except ValueError:
+        return False
+
+def is_admin_request(token: Optional[str], remote_addr: Optional[str], real_ip: Optional[str] = None,
+                     admin_token: Optional[str] = ADMIN_TOKEN,
+                     trusted_proxies: Tuple[str, ...] = TRUSTED_PROXIES) -> bool:
+    """
+    Authorize /api/admin/* calls: with ADMIN_TOKEN set the caller must present it; without one
+    only loopback clients reached through a trusted proxy are allowed, and with neither configured
+    every call is refused (the bare dev server listens on all interfaces)
+    """
+    if admin_token:
+        return bool(token) and hmac.compare_digest(token.encode('utf-8'), admin_token.encode('utf-8'))
+    if not trusted_proxies:
+        return False
+    try:
+        return ipaddress.ip_address(client_address(remote_addr, real_ip, trusted_proxies)).is_loopback
+    except ValueError:
+        return False
+
 def validate_activity_item(activity_type: str, message: str, level: str) -> Dict[str, str]:
     """
     Validate activity feed item